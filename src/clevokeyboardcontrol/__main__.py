@@ -4,6 +4,6 @@
 
 
 if __name__ == '__main__':
-    from .main import main
+    from .cli import main
 
     main()
@@ -18,6 +18,8 @@
 
 
 import os
+import errno
+import threading
 import logging
 
 from enum import Enum, unique, auto
@@ -76,15 +78,278 @@ class FilePath(Enum):
         return None
 
 
+COLOR_PATHS = frozenset( [ FilePath.COLOR_LEFT_PATH, FilePath.COLOR_CENTER_PATH, FilePath.COLOR_RIGHT_PATH ] )
+
+
+## order of writing attributes preventing flickering -- LEDs are turned on at the end
+STORE_ORDER = [ FilePath.MODE_PATH,
+                FilePath.COLOR_LEFT_PATH, FilePath.COLOR_CENTER_PATH, FilePath.COLOR_RIGHT_PATH,
+                FilePath.BRIGHTNESS_PATH,
+                FilePath.STATE_PATH ]
+
+
+def parseAttribute(fileType: FilePath, value):
+    """Convert attribute's string value to integer. Colors are hex strings."""
+    if fileType in COLOR_PATHS:
+        return int( str(value), 16 )
+    return int( value )
+
+
+def isSameValue(fileType: FilePath, value1, value2):
+    """Compare attribute's values. Values that cannot be parsed are considered different."""
+    if value1 is None or value2 is None:
+        return False
+    try:
+        return parseAttribute( fileType, value1 ) == parseAttribute( fileType, value2 )
+    except ValueError:
+        return False
+
+
+class DriverState():
+    """
+    Immutable snapshot of driver's state.
+
+    All fields are packed into single integer, so comparison and hashing
+    are cheap and serialization to bytes is direct. Colors are packed RGB
+    integers (0xRRGGBB).
+    """
+
+    __slots__ = ( '_key', )
+
+    ## size of packed state in bytes
+    BYTES_SIZE = 12
+
+    ## bit offsets of fields in packed key
+    _FIELDS = { FilePath.COLOR_RIGHT_PATH:  ( 0, 0xFFFFFF ),
+                FilePath.COLOR_CENTER_PATH: ( 24, 0xFFFFFF ),
+                FilePath.COLOR_LEFT_PATH:   ( 48, 0xFFFFFF ),
+                FilePath.MODE_PATH:         ( 72, 0xFF ),
+                FilePath.BRIGHTNESS_PATH:   ( 80, 0xFF ),
+                FilePath.STATE_PATH:        ( 88, 0x01 ) }
+
+    def __init__(self, state: bool = False, brightness: int = 0, mode: Mode = Mode.Custom,
+                 colorLeft: int = 0, colorCenter: int = 0, colorRight: int = 0):
+        key = int( bool(state) ) << 88
+        key |= ( min( max( brightness, 0 ), 255 ) ) << 80
+        key |= ( Mode( mode ).value & 0xFF ) << 72
+        key |= ( colorLeft & 0xFFFFFF ) << 48
+        key |= ( colorCenter & 0xFFFFFF ) << 24
+        key |= ( colorRight & 0xFFFFFF )
+        object.__setattr__( self, '_key', key )
+
+    def __setattr__(self, name, value):
+        raise AttributeError( "DriverState is immutable" )
+
+    @property
+    def state(self) -> bool:
+        return bool( self.getValue( FilePath.STATE_PATH ) )
+
+    @property
+    def brightness(self) -> int:
+        return self.getValue( FilePath.BRIGHTNESS_PATH )
+
+    @property
+    def mode(self) -> Mode:
+        return Mode( self.getValue( FilePath.MODE_PATH ) )
+
+    @property
+    def colorLeft(self) -> int:
+        return self.getValue( FilePath.COLOR_LEFT_PATH )
+
+    @property
+    def colorCenter(self) -> int:
+        return self.getValue( FilePath.COLOR_CENTER_PATH )
+
+    @property
+    def colorRight(self) -> int:
+        return self.getValue( FilePath.COLOR_RIGHT_PATH )
+
+    def getValue(self, fileType: FilePath) -> int:
+        """Return integer value of attribute."""
+        offset, mask = self._FIELDS[ fileType ]
+        return ( self._key >> offset ) & mask
+
+    def getString(self, fileType: FilePath) -> str:
+        """Return value of attribute in driver's format."""
+        value = self.getValue( fileType )
+        if fileType in COLOR_PATHS:
+            return hex( value )
+        return str( value )
+
+    def replace(self, fileType: FilePath, value: int):
+        """Return copy of state with changed attribute."""
+        offset, mask = self._FIELDS[ fileType ]
+        key = self._key & ~( mask << offset )
+        key |= ( value & mask ) << offset
+        return DriverState.fromKey( key )
+
+    def diff(self, other) -> list:
+        """Return list of attributes differing between states."""
+        if self._key == other._key:
+            return []
+        return [ fileType for fileType in FilePath if self.getValue( fileType ) != other.getValue( fileType ) ]
+
+    def toBytes(self) -> bytes:
+        return self._key.to_bytes( self.BYTES_SIZE, 'little' )
+
+    @classmethod
+    def fromBytes(cls, data: bytes):
+        return cls.fromKey( int.from_bytes( data, 'little' ) )
+
+    @classmethod
+    def fromKey(cls, key: int):
+        ret = cls.__new__( cls )
+        object.__setattr__( ret, '_key', key )
+        return ret
+
+    def toDict(self) -> dict:
+        """Convert to dict of driver's strings: FilePath name -> value."""
+        return { fileType.name: self.getString( fileType ) for fileType in FilePath }
+
+    @classmethod
+    def fromDict(cls, stateDict: dict):
+        """Create state from dict of driver's strings. Raises KeyError if any attribute is missing."""
+        key = 0
+        for fileType in FilePath:
+            offset, mask = cls._FIELDS[ fileType ]
+            value = parseAttribute( fileType, stateDict[ fileType.name ] )
+            key |= ( value & mask ) << offset
+        return cls.fromKey( key )
+
+    def saveSettings(self, settings):
+        """Store state in current group of QSettings object."""
+        for fileType in FilePath:
+            settings.setValue( fileType.name, self.getString( fileType ) )
+
+    @classmethod
+    def loadSettings(cls, settings):
+        """Load state from current group of QSettings object. Returns None if state is not stored."""
+        stateDict = dict()
+        for fileType in FilePath:
+            value = settings.value( fileType.name, "", type=str )
+            if len(value) < 1:
+                return None
+            stateDict[ fileType.name ] = value
+        try:
+            return cls.fromDict( stateDict )
+        except ValueError:
+            _LOGGER.warning( "invalid driver state: %r", stateDict )
+            return None
+
+    def __eq__(self, other):
+        if not isinstance( other, DriverState ):
+            return NotImplemented
+        return self._key == other._key
+
+    def __hash__(self):
+        return hash( self._key )
+
+    def __repr__(self):
+        return "DriverState(state=%s, brightness=%s, mode=%s, colors=[%06x, %06x, %06x])" % (
+            self.state, self.brightness, self.mode.name, self.colorLeft, self.colorCenter, self.colorRight )
+
+
+class ShadowCache():
+    """
+    Last known values of driver's attributes.
+
+    Write-through cache: values are updated on each read and write, so reads
+    can be served without accessing driver and writes not changing anything
+    can be skipped. Cache has to be invalidated when attributes are changed
+    externally.
+    """
+
+    def __init__(self):
+        self.values = dict()                        ## FilePath -> str
+        self.lock = threading.Lock()
+        self.cacheHits = 0
+        self.elidedWrites = 0
+
+    def get(self, fileType: FilePath):
+        with self.lock:
+            value = self.values.get( fileType )
+            if value is not None:
+                self.cacheHits += 1
+            return value
+
+    def set(self, fileType: FilePath, value: str):
+        with self.lock:
+            self.values[ fileType ] = value
+
+    def isStored(self, fileType: FilePath, value: str):
+        """Check if attribute already holds given value. Counts elided writes."""
+        with self.lock:
+            currValue = self.values.get( fileType )
+            if isSameValue( fileType, currValue, value ) is False:
+                return False
+            self.elidedWrites += 1
+            return True
+
+    def invalidate(self, fileType: FilePath = None):
+        with self.lock:
+            if fileType is None:
+                self.values.clear()
+            else:
+                self.values.pop( fileType, None )
+
+
 class ClevoDriver(metaclass=abc.ABCMeta):
 
     def __init__(self):
-        pass
+        self.shadowCache = None
+        self.storeListener = None
 
     @abc.abstractmethod
     def getDriverRootDirectory(self):
         raise NotImplementedError('You need to define this method in derived class!')
 
+    def getFilePath(self, fileType: FilePath):
+        """Return path of attribute's file or None if attribute is not backed by file."""
+        return None
+
+    def findFileType(self, filePath: str):
+        """Return attribute related to given file or None if not found."""
+        for fileType in FilePath:
+            if self.getFilePath( fileType ) == filePath:
+                return fileType
+        return None
+
+    def updateAttribute(self, fileType: FilePath, value: str) -> int:
+        """
+        Handle change of attribute made externally.
+
+        Updates cached value and returns value converted to integer,
+        so attribute does not have to be read again.
+        """
+        value = value.strip()
+        if fileType in COLOR_PATHS:
+            value = self._filterColor( value )
+        intValue = parseAttribute( fileType, value )
+        if self.shadowCache is not None:
+            self.shadowCache.set( fileType, value )
+        return intValue
+
+    def setStoreListener(self, listener):
+        """Set function 'listener(fileType, value)' called before value is written to driver."""
+        self.storeListener = listener
+
+    def setShadowCacheEnabled(self, enabled: bool):
+        """
+        Enable caching of attributes values (ShadowCache).
+
+        Enable only when external changes of driver are watched and
+        reported by 'invalidateCache()'.
+        """
+        if enabled is False:
+            self.shadowCache = None
+        elif self.shadowCache is None:
+            self.shadowCache = ShadowCache()
+
+    def invalidateCache(self, fileType: FilePath = None):
+        """Invalidate cached value of given attribute or all attributes if 'fileType' is None."""
+        if self.shadowCache is not None:
+            self.shadowCache.invalidate( fileType )
+
     def getState(self):
         """Says if LED powered on."""
         value = int( self.readString(FilePath.STATE_PATH) )
@@ -168,30 +433,68 @@ class ClevoDriver(metaclass=abc.ABCMeta):
         else:
             raise ValueError("unhandled value: " + str(panel))
 
-    def readDriverState(self):
+    def readDriverState(self) -> DriverState:
         _LOGGER.debug("reading driver's state")
-        ret = dict()
+        stateDict = dict()
         for key in FilePath:
-            val = self.readString( key )
-            keyStr = key.name
-            ret[ keyStr ] = val
-        return ret
-
-    def setDriverState(self, stateDict: dict):
-        _LOGGER.debug("setting driver's state: %r", stateDict)
-        for key in stateDict:
-            val = stateDict[ key ]
-            keyEnum = FilePath.findByName( key )
-            self.storeString( keyEnum, val )
+            stateDict[ key.name ] = self.readString( key )
+        return DriverState.fromDict( stateDict )
+
+    def setDriverState(self, state: DriverState, reconcile=False, currentState: DriverState = None):
+        """
+        Write state to driver.
+
+        In reconcile mode current state of driver is read and only differing
+        attributes are written. Attributes are written in order preventing
+        flickering: colors are set before turning LEDs on and after turning
+        LEDs off. 'currentState' can pass state just read by caller, so
+        driver is not read again.
+
+        Returns dict of written attributes: FilePath -> (old value, new value).
+        Old value is None if reconcile mode is disabled.
+        """
+        _LOGGER.debug("setting driver's state (reconcile: %s): %r", reconcile, state)
+        if state is None:
+            return dict()
+
+        currState = None
+        changed = list( FilePath )
+        if reconcile:
+            currState = currentState
+            if currState is None:
+                ## hardware could be changed e.g. during suspend
+                self.invalidateCache()
+                currState = self.readDriverState()
+            changed = currState.diff( state )
+
+        report = dict()
+        for fileType in self._getStoreOrder( state, changed ):
+            self.storeString( fileType, state.getString( fileType ) )
+            oldVal = None
+            if currState is not None:
+                oldVal = currState.getValue( fileType )
+            report[ fileType ] = ( oldVal, state.getValue( fileType ) )
+
+        _LOGGER.debug("driver's state changes: %r", report)
+        return report
+
+    def _getStoreOrder(self, state: DriverState, changed):
+        if state.state is False:
+            ## turn off LEDs first
+            return sorted( changed, key=lambda item: STORE_ORDER.index( item ) if item != FilePath.STATE_PATH else -1 )
+        return sorted( changed, key=STORE_ORDER.index )
 
     def readString(self, fileType: FilePath):
+        cache = self.shadowCache
+        if cache is not None:
+            val = cache.get( fileType )
+            if val is not None:
+                return val
         val = self._read( fileType )
-        if fileType == fileType.COLOR_LEFT_PATH:
-            return self._filterColor( val )
-        if fileType == fileType.COLOR_CENTER_PATH:
-            return self._filterColor( val )
-        if fileType == fileType.COLOR_RIGHT_PATH:
-            return self._filterColor( val )
+        if fileType in COLOR_PATHS:
+            val = self._filterColor( val )
+        if cache is not None:
+            cache.set( fileType, val )
         return val
 
     def _filterColor(self, value: str):
@@ -200,7 +503,23 @@ class ClevoDriver(metaclass=abc.ABCMeta):
         return "0x" + value
 
     def storeString(self, fileType: FilePath, value: str):
-        self._store( fileType, value )
+        cache = self.shadowCache
+        value = str( value )
+        if cache is not None and cache.isStored( fileType, value ):
+            _LOGGER.debug("skipping write to %s: value already set", fileType.name)
+            return
+        if self.storeListener is not None:
+            self.storeListener( fileType, value )
+        if cache is None:
+            self._store( fileType, value )
+            return
+        try:
+            self._store( fileType, value )
+        except BaseException:
+            ## state of attribute is unknown
+            cache.invalidate( fileType )
+            raise
+        cache.set( fileType, value )
 
     @abc.abstractmethod
     def _read(self, fileType: FilePath):
@@ -211,6 +530,88 @@ class ClevoDriver(metaclass=abc.ABCMeta):
         raise NotImplementedError('You need to define this method in derived class!')
 
 
+class FileDescriptorPool():
+    """
+    Cache of opened files.
+
+    Keeps single descriptor per file and accesses content by positional
+    read/write, so each operation costs single syscall. Descriptor is
+    transparently reopened when it becomes invalid (e.g. driver module
+    was reloaded).
+    """
+
+    ## errors meaning that descriptor has to be reopened
+    REOPEN_ERRORS = ( errno.ENODEV, errno.EBADF )
+
+    ## sysfs attributes are not bigger than single page
+    BUFFER_SIZE = 4096
+
+    def __init__(self):
+        self.descriptors = dict()                       ## path -> ( fd, flags )
+        self.buffer = memoryview( bytearray( self.BUFFER_SIZE ) )
+        self.lock = threading.Lock()
+
+    def read(self, path) -> str:
+        with self.lock:
+            fd = self._getDescriptor( path, os.O_RDONLY )
+            try:
+                size = os.preadv( fd, [ self.buffer ], 0 )
+            except OSError as exc:
+                if exc.errno not in self.REOPEN_ERRORS:
+                    raise
+                _LOGGER.debug( "reopening file %s: %s", path, exc )
+                self._close( path )
+                fd = self._getDescriptor( path, os.O_RDONLY )
+                size = os.preadv( fd, [ self.buffer ], 0 )
+            return str( self.buffer[ :size ], 'UTF-8' )
+
+    def write(self, path, data: bytes):
+        with self.lock:
+            fd = self._getDescriptor( path, os.O_WRONLY )
+            try:
+                os.pwrite( fd, data, 0 )
+            except OSError as exc:
+                if exc.errno not in self.REOPEN_ERRORS:
+                    raise
+                _LOGGER.debug( "reopening file %s: %s", path, exc )
+                self._close( path )
+                fd = self._getDescriptor( path, os.O_WRONLY )
+                os.pwrite( fd, data, 0 )
+
+    def close(self):
+        with self.lock:
+            for path in list( self.descriptors.keys() ):
+                self._close( path )
+
+    def _getDescriptor(self, path, access):
+        item = self.descriptors.get( path )
+        if item is not None:
+            fd, flags = item
+            if flags == os.O_RDWR or flags == access:
+                return fd
+            ## cached descriptor does not allow requested access
+            self._close( path )
+        try:
+            flags = os.O_RDWR
+            fd = os.open( path, flags | os.O_CLOEXEC )
+        except PermissionError:
+            ## user is not allowed to read and write the file -- opening with requested access only
+            flags = access
+            fd = os.open( path, flags | os.O_CLOEXEC )
+        self.descriptors[ path ] = ( fd, flags )
+        return fd
+
+    def _close(self, path):
+        item = self.descriptors.pop( path, None )
+        if item is None:
+            return
+        try:
+            os.close( item[0] )
+        except OSError:
+            ## descriptor already invalid
+            pass
+
+
 class TuxedoDriver( ClevoDriver ):
 
     DRIVERFS_PATH       = '/sys/devices/platform/tuxedo_keyboard'
@@ -231,14 +632,34 @@ class TuxedoDriver( ClevoDriver ):
         FilePath.COLOR_RIGHT_PATH:  COLOR_RIGHT_PATH
     }
 
-    def __init__(self):
+    def __init__(self, cachedIO=False):
+        """
+        Constructor.
+
+        'cachedIO' enables keeping files opened between consecutive
+        reads and writes (FileDescriptorPool).
+        """
         super().__init__()
+        self.filePool = None
+        if cachedIO:
+            self.filePool = FileDescriptorPool()
 
     def getDriverRootDirectory(self):
         return self.DRIVERFS_PATH
 
+    def close(self):
+        """Release opened files."""
+        if self.filePool is not None:
+            self.filePool.close()
+
     def _read(self, fileType: FilePath):
         filePath = self._getFile( fileType )
+        if self.filePool is not None:
+            try:
+                return self.filePool.read( filePath ).rstrip()
+            except Exception:
+                _LOGGER.error("unable to read data for file[%s]", filePath)
+                raise
         file = None
         try:
             file = open( filePath, "r")
@@ -255,12 +676,19 @@ class TuxedoDriver( ClevoDriver ):
 
     def _store(self, fileType: FilePath, value: str):
         filePath = self._getFile( fileType )
+        dataStr = str(value)
+        dataStr = dataStr.rstrip()
+        data = bytes( dataStr + "\n", 'UTF-8' )
+        if self.filePool is not None:
+            try:
+                self.filePool.write( filePath, data )
+            except PermissionError:
+                _LOGGER.error("unable to store data[%s] for file[%s]", value, filePath)
+                raise
+            return
         fd = None
         try:
             fd = os.open( filePath, os.O_WRONLY)
-            dataStr = str(value)
-            dataStr = dataStr.rstrip()
-            data = bytes( dataStr + "\n", 'UTF-8' )
             os.write(fd, data )
         except PermissionError:
             _LOGGER.error("unable to store data[%s] for file[%s]", value, filePath)
@@ -269,5 +697,8 @@ class TuxedoDriver( ClevoDriver ):
             if fd is not None:
                 os.close(fd)
 
-    def _getFile(self, fileType: FilePath):
+    def getFilePath(self, fileType: FilePath):
         return self.filePaths[ fileType ]
+
+    def _getFile(self, fileType: FilePath):
+        return self.getFilePath( fileType )
@@ -0,0 +1,379 @@
+#     ClevoKeyboardControl. Control of keyboard backlights.
+#
+#     Copyright (C) 2018  Arkadiusz Netczuk <dev.arnet@gmail.com>
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+Command line entry point.
+
+Dispatches subcommands without importing Qt. Without subcommand GUI
+application is started.
+
+One-shot subcommands ('set', 'get', 'restore', 'profile') import only
+driver and settings modules, so they are cheap enough to be called from
+hotkey daemons and system sleep hooks. 'logs' prints application's logs
+(including compressed rotated files).
+"""
+
+import sys
+
+
+## subcommands handled by 'runCommand()'
+COMMANDS = ( "set", "get", "restore", "profile", "logs" )
+
+## interval of checking for new content of log file in follow mode
+FOLLOW_INTERVAL = 0.5
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv and argv[0] == "daemon":
+        from .daemon import main as daemonMain
+        sys.exit( daemonMain( argv[1:] ) )
+    if argv and argv[0] in COMMANDS:
+        sys.exit( runCommand( argv ) )
+
+    ## GUI application
+    from .main import main as guiMain
+    sys.argv = sys.argv[:1] + list( argv )
+    guiMain()
+
+
+def runCommand(argv, driver=None, output=None):
+    """Execute one-shot subcommand. Returns exit code."""
+    import logging
+    from .clevoio import TuxedoDriver
+    from .settings import IniSettings
+
+    args = createParser().parse_args( argv )
+    if args.debug:
+        logging.basicConfig( stream=sys.stderr, level=logging.DEBUG )
+    else:
+        ## errors are reported by exit code and message
+        logging.root.addHandler( logging.NullHandler() )
+    if output is None:
+        output = sys.stdout
+    if driver is None:
+        driver = TuxedoDriver()
+    settings = IniSettings( args.settings )
+    try:
+        return args.handler( args, driver, settings, output )
+    except BrokenPipeError:
+        ## output closed (e.g. piped to 'head')
+        return 0
+    except OSError as exc:
+        print( "unable to access driver: %s" % exc, file=sys.stderr )
+        return 1
+
+
+def createParser():
+    import argparse
+
+    ## options common for all subcommands
+    commonParser = argparse.ArgumentParser( add_help=False )
+    commonParser.add_argument( '--settings', action='store', default=None, help='Path to settings file' )
+    commonParser.add_argument( '--debug', action='store_true', help='Enable debug logs' )
+
+    parser = argparse.ArgumentParser( prog="clevokbdctl", description='Clevo Keyboard Control' )
+    subparsers = parser.add_subparsers( dest="command", required=True )
+
+    setParser = subparsers.add_parser( "set", parents=[ commonParser ], help="Change state of keyboard" )
+    setParser.add_argument( '--state', type=parseSwitch, default=None, help='Turn LEDs on or off' )
+    setParser.add_argument( '--brightness', type=int, default=None, help='Brightness in range [0, 255]' )
+    setParser.add_argument( '--mode', type=parseMode, default=None, help='Mode name or number' )
+    setParser.add_argument( '--color-left', type=parseColor, default=None, help='Color in RRGGBB format' )
+    setParser.add_argument( '--color-center', type=parseColor, default=None, help='Color in RRGGBB format' )
+    setParser.add_argument( '--color-right', type=parseColor, default=None, help='Color in RRGGBB format' )
+    setParser.add_argument( '--save', action='store_true', help='Store resulting state in settings file' )
+    setParser.set_defaults( handler=setCommand )
+
+    getParser = subparsers.add_parser( "get", parents=[ commonParser ], help="Print state of keyboard" )
+    getParser.add_argument( '--json', action='store_true', help='Print state in JSON format' )
+    getParser.set_defaults( handler=getCommand )
+
+    restoreParser = subparsers.add_parser( "restore", parents=[ commonParser ], help="Restore state stored in settings file" )
+    restoreParser.set_defaults( handler=restoreCommand )
+
+    profileParser = subparsers.add_parser( "profile", help="Manage lighting profiles" )
+    profileSubparsers = profileParser.add_subparsers( dest="action", required=True )
+    listParser = profileSubparsers.add_parser( "list", parents=[ commonParser ], help="Print names of profiles" )
+    listParser.set_defaults( handler=profileListCommand )
+    applyParser = profileSubparsers.add_parser( "apply", parents=[ commonParser ], help="Switch keyboard to profile" )
+    applyParser.add_argument( 'name', help='Name of profile' )
+    applyParser.add_argument( '--save', action='store_true', help='Store resulting state in settings file' )
+    applyParser.set_defaults( handler=profileApplyCommand )
+    nextParser = profileSubparsers.add_parser( "next", parents=[ commonParser ], help="Switch keyboard to next profile" )
+    nextParser.add_argument( '--save', action='store_true', help='Store resulting state in settings file' )
+    nextParser.set_defaults( handler=profileNextCommand )
+    storeParser = profileSubparsers.add_parser( "store", parents=[ commonParser ], help="Store state of keyboard as profile" )
+    storeParser.add_argument( 'name', help='Name of profile' )
+    storeParser.set_defaults( handler=profileStoreCommand )
+    removeParser = profileSubparsers.add_parser( "remove", parents=[ commonParser ], help="Remove profile" )
+    removeParser.add_argument( 'name', help='Name of profile' )
+    removeParser.set_defaults( handler=profileRemoveCommand )
+
+    logsParser = subparsers.add_parser( "logs", parents=[ commonParser ], help="Print application's logs" )
+    logsParser.add_argument( '-f', '--follow', action='store_true', help='Wait for new records' )
+    logsParser.add_argument( '--file', action='store', default=None, help='Path to log file' )
+    logsParser.set_defaults( handler=logsCommand )
+    return parser
+
+
+## =====================================================
+
+
+def setCommand(args, driver, settings, output):
+    from .clevoio import FilePath
+    from .settings import saveDriverState
+
+    brightness = args.brightness
+    if brightness is not None:
+        brightness = min( max( brightness, 0 ), 255 )
+    changes = { FilePath.STATE_PATH: args.state,
+                FilePath.BRIGHTNESS_PATH: brightness,
+                FilePath.MODE_PATH: args.mode,
+                FilePath.COLOR_LEFT_PATH: args.color_left,
+                FilePath.COLOR_CENTER_PATH: args.color_center,
+                FilePath.COLOR_RIGHT_PATH: args.color_right }
+
+    currentState = driver.readDriverState()
+    state = currentState
+    for fileType, value in changes.items():
+        if value is not None:
+            state = state.replace( fileType, int( value ) )
+    driver.setDriverState( state, reconcile=True, currentState=currentState )
+
+    if args.save:
+        saveDriverState( settings, state )
+        settings.sync()
+    return 0
+
+
+def getCommand(args, driver, _, output):
+    state = driver.readDriverState()
+    values = { "state": state.state,
+               "brightness": state.brightness,
+               "mode": state.mode.name,
+               "colorLeft": "%06x" % state.colorLeft,
+               "colorCenter": "%06x" % state.colorCenter,
+               "colorRight": "%06x" % state.colorRight }
+    if args.json:
+        import json
+        output.write( json.dumps( values ) + "\n" )
+        return 0
+    values[ "state" ] = "on" if state.state else "off"
+    for key, value in values.items():
+        output.write( "%s: %s\n" % ( key, value ) )
+    return 0
+
+
+def restoreCommand(_, driver, settings, output):
+    from .settings import loadDriverState
+
+    state = loadDriverState( settings )
+    if state is None:
+        print( "driver state not stored in %s" % settings.fileName(), file=sys.stderr )
+        return 1
+    driver.setDriverState( state, reconcile=True )
+    return 0
+
+
+def profileListCommand(_, driver, settings, output):
+    from .settings import loadProfiles, findProfile
+
+    profiles = loadProfiles( settings )
+    try:
+        current = findProfile( profiles, driver.readDriverState() )
+    except OSError:
+        ## driver not available
+        current = None
+    for name in sorted( profiles ):
+        prefix = "* " if name == current else "  "
+        output.write( prefix + name + "\n" )
+    return 0
+
+
+def profileApplyCommand(args, driver, settings, output):
+    from .settings import loadProfiles
+
+    profiles = loadProfiles( settings )
+    state = profiles.get( args.name )
+    if state is None:
+        print( "profile not found: %s" % args.name, file=sys.stderr )
+        return 1
+    return _applyProfile( args, driver, settings, state )
+
+
+def profileNextCommand(args, driver, settings, output):
+    from .settings import loadProfiles, findProfile
+
+    profiles = loadProfiles( settings )
+    if not profiles:
+        print( "no profiles stored in %s" % settings.fileName(), file=sys.stderr )
+        return 1
+    names = sorted( profiles )
+    currentState = driver.readDriverState()
+    current = findProfile( profiles, currentState )
+    nextIndex = 0
+    if current is not None:
+        nextIndex = ( names.index( current ) + 1 ) % len( names )
+    name = names[ nextIndex ]
+    output.write( name + "\n" )
+    return _applyProfile( args, driver, settings, profiles[ name ], currentState )
+
+
+def _applyProfile(args, driver, settings, state, currentState=None):
+    from .settings import saveDriverState
+
+    ## write only attributes differing from hardware state
+    driver.setDriverState( state, reconcile=True, currentState=currentState )
+    if args.save:
+        saveDriverState( settings, state )
+        settings.sync()
+    return 0
+
+
+def profileStoreCommand(args, driver, settings, output):
+    from .settings import isValidProfileName, saveProfile
+
+    if isValidProfileName( args.name ) is False:
+        print( "invalid profile name: %s (allowed letters, digits, '_' and '-')" % args.name, file=sys.stderr )
+        return 1
+    saveProfile( settings, args.name, driver.readDriverState() )
+    settings.sync()
+    return 0
+
+
+def profileRemoveCommand(args, _, settings, output):
+    from .settings import loadProfiles, removeProfile
+
+    if args.name not in loadProfiles( settings ):
+        print( "profile not found: %s" % args.name, file=sys.stderr )
+        return 1
+    removeProfile( settings, args.name )
+    settings.sync()
+    return 0
+
+
+def logsCommand(args, _, __, output):
+    try:
+        return _printLogs( args, output )
+    except BrokenPipeError:
+        raise
+    except OSError as exc:
+        print( "unable to read logs: %s" % exc, file=sys.stderr )
+        return 1
+
+
+def _printLogs(args, output):
+    import os
+    import gzip
+    import time
+    import shutil
+    from . import logger
+
+    logFile = args.file
+    if logFile is None:
+        logFile = os.path.join( logger.getLoggingDirectory(), "log.txt" )
+
+    for segment in logger.listLogSegments( logFile ):
+        openFunction = gzip.open if segment.endswith( ".gz" ) else open
+        try:
+            with openFunction( segment, "rt", encoding="utf-8", errors="replace" ) as segmentFile:
+                shutil.copyfileobj( segmentFile, output )
+        except FileNotFoundError:
+            ## removed by rotation in the meantime
+            continue
+
+    if os.path.exists( logFile ) is False and args.follow is False:
+        return 0
+
+    logStream = None
+    try:
+        while True:
+            if logStream is None and os.path.exists( logFile ):
+                logStream = open( logFile, "r", encoding="utf-8", errors="replace" )
+            if logStream is not None:
+                shutil.copyfileobj( logStream, output )
+            if args.follow is False:
+                return 0
+            output.flush()
+            time.sleep( FOLLOW_INTERVAL )
+            if logStream is not None and _isRotated( logFile, logStream ):
+                ## print rest of rotated file and continue with new one
+                shutil.copyfileobj( logStream, output )
+                logStream.close()
+                logStream = None
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        if logStream is not None:
+            logStream.close()
+
+
+def _isRotated(logFile, logStream):
+    import os
+
+    try:
+        fileStat = os.stat( logFile )
+    except FileNotFoundError:
+        return True
+    return fileStat.st_ino != os.fstat( logStream.fileno() ).st_ino
+
+
+## =====================================================
+
+
+def parseSwitch(value: str):
+    value = value.lower()
+    if value in ( "on", "1", "true" ):
+        return True
+    if value in ( "off", "0", "false" ):
+        return False
+    import argparse
+    raise argparse.ArgumentTypeError( "invalid state: %s" % value )
+
+
+def parseMode(value: str):
+    from .clevoio import Mode
+
+    for mode in Mode:
+        if mode.name.lower() == value.lower() or str( mode.value ) == value:
+            return mode.value
+    import argparse
+    raise argparse.ArgumentTypeError( "invalid mode: %s (allowed: %s)" % ( value, ", ".join( mode.name for mode in Mode ) ) )
+
+
+def parseColor(value: str):
+    """Parse color in 'RRGGBB', '#RRGGBB' or '0xRRGGBB' format."""
+    hexValue = value
+    if hexValue.startswith( "#" ):
+        hexValue = hexValue[1:]
+    elif hexValue.lower().startswith( "0x" ):
+        hexValue = hexValue[2:]
+    try:
+        color = int( hexValue, 16 )
+    except ValueError:
+        color = -1
+    if len( hexValue ) != 6 or color < 0:
+        import argparse
+        raise argparse.ArgumentTypeError( "invalid color: %s" % value )
+    return color
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+#     ClevoKeyboardControl. Control of keyboard backlights.
+#
+#     Copyright (C) 2018  Arkadiusz Netczuk <dev.arnet@gmail.com>
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+Headless daemon.
+
+Restores keyboard state on start and after resume from suspend and turns
+LEDs off while screen saver is active. Uses the same settings file as GUI
+application. Module does not import Qt.
+"""
+
+import sys
+import os
+import logging
+import signal
+import select
+import threading
+import argparse
+
+from .clevoio import TuxedoDriver
+from .settings import IniSettings, loadDriverState
+from .suspend import SuspendDetector, SleepListener
+from .screensaverwatcher import ScreenSaverWatcher
+from .sysfswatchdog import WatchService
+
+
+_LOGGER = logging.getLogger(__name__)
+
+
+## group of GUI's settings widget
+SETTINGS_GROUP = "settingsWidget"
+
+
+class DaemonConfig():
+    """Options of daemon read from settings file."""
+
+    def __init__(self, settings: IniSettings):
+        settings.beginGroup( SETTINGS_GROUP )
+        self.restoreStart = settings.value( "restoreStart", True, type=bool )
+        self.restoreSuspend = settings.value( "restoreSuspend", True, type=bool )
+        self.turnLEDOffOnScreenSaver = settings.value( "turnLEDOffOnScreenSaver", True, type=bool )
+        settings.endGroup()
+
+        self.driverState = loadDriverState( settings )
+
+
+class Daemon():
+    """
+    Event loop of daemon.
+
+    Main thread sleeps in 'poll()' on descriptors of signals, logind's bus
+    connection and suspend timer, so daemon does not use CPU while idle.
+    Screen saver watcher runs in it's own thread.
+    """
+
+    def __init__(self, driver, settings: IniSettings = None):
+        self.driver = driver
+        self.settings = settings
+        if self.settings is None:
+            self.settings = IniSettings()
+        self.driverLock = threading.Lock()
+        self.sleepListener = None
+        self.suspendDetector = None
+        self.screenSaverWatcher = None
+        self.stopped = False
+        self._wakeRead, self._wakeWrite = os.pipe()
+        os.set_blocking( self._wakeRead, False )
+        os.set_blocking( self._wakeWrite, False )
+
+    def loadConfig(self):
+        self.settings.reload()
+        return DaemonConfig( self.settings )
+
+    def restoreDriver(self):
+        """Write state stored in settings to driver."""
+        config = self.loadConfig()
+        if config.driverState is None:
+            _LOGGER.info( "no driver state stored in %s", self.settings.fileName() )
+            return
+        _LOGGER.info( "restoring driver state: %s", config.driverState )
+        try:
+            with self.driverLock:
+                self.driver.setDriverState( config.driverState, reconcile=True )
+        except OSError:
+            _LOGGER.exception( "unable to restore driver state" )
+
+    def turnLED(self, enabled):
+        try:
+            with self.driverLock:
+                self.driver.setState( enabled )
+        except OSError:
+            _LOGGER.exception( "unable to change LED state" )
+
+    def stop(self):
+        """Request stop of loop. Can be called from any thread or signal handler."""
+        self.stopped = True
+        try:
+            os.write( self._wakeWrite, b"\0" )
+        except OSError:
+            pass
+
+    def run(self):
+        config = self.loadConfig()
+        if config.restoreStart:
+            self.restoreDriver()
+
+        poller = select.poll()
+        poller.register( self._wakeRead, select.POLLIN )
+
+        if config.restoreSuspend:
+            self._startSuspendDetection( poller )
+
+        if config.turnLEDOffOnScreenSaver:
+            try:
+                self.screenSaverWatcher = ScreenSaverWatcher()
+                self.screenSaverWatcher.setCallback( self._screenSaverActivated )
+            except OSError as exc:
+                _LOGGER.warning( "unable to watch screen saver: %s", exc )
+
+        _LOGGER.info( "daemon started" )
+        try:
+            while self.stopped is False:
+                for fd, _ in poller.poll():
+                    self._handleEvent( poller, fd )
+        finally:
+            self._close()
+        _LOGGER.info( "daemon stopped" )
+
+    ## =====================================================
+
+    def _startSuspendDetection(self, poller):
+        self.sleepListener = SleepListener()
+        self.sleepListener.setCallback( self.restoreDriver )
+        if self.sleepListener.connect():
+            poller.register( self.sleepListener.fileno(), select.POLLIN )
+            return
+        self.sleepListener = None
+        self._startSuspendTimer( poller )
+
+    def _startSuspendTimer(self, poller):
+        ## fallback -- logind not available
+        self.suspendDetector = SuspendDetector()
+        self.suspendDetector.setCallback( lambda _: self.restoreDriver() )
+        if self.suspendDetector.start():
+            poller.register( self.suspendDetector.fileno(), select.POLLIN )
+        else:
+            _LOGGER.warning( "unable to detect resume from suspend" )
+            self.suspendDetector = None
+
+    def _handleEvent(self, poller, fd):
+        if fd == self._wakeRead:
+            try:
+                while os.read( self._wakeRead, 64 ):
+                    pass
+            except BlockingIOError:
+                pass
+            return
+        if self.sleepListener is not None and fd == self.sleepListener.fileno():
+            if self.sleepListener.handleMessages() is False:
+                poller.unregister( fd )
+                self.sleepListener = None
+                self._startSuspendTimer( poller )
+            return
+        if self.suspendDetector is not None and fd == self.suspendDetector.fileno():
+            self.suspendDetector.handleTimer()
+
+    def _screenSaverActivated(self, active):
+        ## called from watcher's thread
+        _LOGGER.info( "screen saver activation: %s", active )
+        self.turnLED( not active )
+
+    def _close(self):
+        if self.screenSaverWatcher is not None:
+            self.screenSaverWatcher.stop()
+        if self.sleepListener is not None:
+            self.sleepListener.close()
+        if self.suspendDetector is not None:
+            self.suspendDetector.stop()
+        WatchService.shutdownInstance( timeout=5.0 )
+        os.close( self._wakeRead )
+        os.close( self._wakeWrite )
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser( prog="clevokbdctl daemon", description='Clevo Keyboard Control daemon' )
+    parser.add_argument( '--settings', action='store', default=None, help='Path to settings file' )
+    parser.add_argument( '--debug', action='store_true', help='Enable debug logs' )
+    parsed = parser.parse_args( args )
+
+    logging.basicConfig( stream=sys.stdout, level=logging.DEBUG if parsed.debug else logging.INFO,
+                         format='%(asctime)s %(levelname)-8s %(name)s %(message)s' )
+
+    driver = TuxedoDriver( cachedIO=True )
+    daemon = Daemon( driver, IniSettings( parsed.settings ) )
+
+    def stopHandler( signum, frame ):
+        daemon.stop()
+
+    signal.signal( signal.SIGTERM, stopHandler )
+    signal.signal( signal.SIGINT, stopHandler )
+    try:
+        daemon.run()
+    finally:
+        driver.close()
+    return 0
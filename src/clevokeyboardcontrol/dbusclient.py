@@ -0,0 +1,489 @@
+#     ClevoKeyboardControl. Control of keyboard backlights.
+#
+#     Copyright (C) 2018  Arkadiusz Netczuk <dev.arnet@gmail.com>
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+Minimal D-Bus client.
+
+Implements wire protocol just enough to subscribe and receive signals
+without any external dependency and without event loop -- connection's
+descriptor can be polled by any thread.
+"""
+
+import logging
+import os
+import socket
+import struct
+import re
+
+
+_LOGGER = logging.getLogger(__name__)
+
+
+## message types
+METHOD_CALL   = 1
+METHOD_RETURN = 2
+ERROR         = 3
+SIGNAL        = 4
+
+FLAG_NO_REPLY_EXPECTED = 0x1
+
+## header fields
+HEADER_PATH         = 1
+HEADER_INTERFACE    = 2
+HEADER_MEMBER       = 3
+HEADER_ERROR_NAME   = 4
+HEADER_REPLY_SERIAL = 5
+HEADER_DESTINATION  = 6
+HEADER_SENDER       = 7
+HEADER_SIGNATURE    = 8
+
+BUS_NAME      = "org.freedesktop.DBus"
+BUS_PATH      = "/org/freedesktop/DBus"
+BUS_INTERFACE = "org.freedesktop.DBus"
+
+SYSTEM_BUS_DEFAULT_ADDRESS = "unix:path=/var/run/dbus/system_bus_socket"
+
+## max length of message allowed by specification (128MiB)
+MAX_MESSAGE_LENGTH = 134217728
+
+## errors raised while reading malformed or truncated data
+PARSE_ERRORS = ( struct.error, IndexError, KeyError, TypeError, ValueError, UnicodeDecodeError, RecursionError )
+
+## fixed size types: type code -> ( struct format, size )
+BASIC_TYPES = { "y": ( "B", 1 ), "b": ( "I", 4 ), "n": ( "h", 2 ), "q": ( "H", 2 ),
+                "i": ( "i", 4 ), "u": ( "I", 4 ), "x": ( "q", 8 ), "t": ( "Q", 8 ),
+                "d": ( "d", 8 ), "h": ( "I", 4 ) }
+
+ALIGNMENT = { "s": 4, "o": 4, "g": 1, "v": 1, "a": 4, "(": 8, "{": 8 }
+ALIGNMENT.update( { code: item[1] for code, item in BASIC_TYPES.items() } )
+
+
+class DBusError(Exception):
+    pass
+
+
+def sessionBusAddress():
+    """Return address of session bus or None if not known."""
+    address = os.environ.get( "DBUS_SESSION_BUS_ADDRESS" )
+    if address:
+        return address
+    runtimeDir = os.environ.get( "XDG_RUNTIME_DIR" )
+    if runtimeDir is None:
+        return None
+    busPath = os.path.join( runtimeDir, "bus" )
+    if os.path.exists( busPath ) is False:
+        return None
+    return "unix:path=" + busPath
+
+
+def systemBusAddress():
+    address = os.environ.get( "DBUS_SYSTEM_BUS_ADDRESS" )
+    if address:
+        return address
+    return SYSTEM_BUS_DEFAULT_ADDRESS
+
+
+def parseAddress(address):
+    """Return socket address of first supported transport of bus address."""
+    for entry in address.split( ";" ):
+        transport, _, params = entry.partition( ":" )
+        if transport != "unix":
+            continue
+        keys = dict( item.split( "=", 1 ) for item in params.split( "," ) if "=" in item )
+        if "path" in keys:
+            return unescapeValue( keys["path"] )
+        if "abstract" in keys:
+            return "\0" + unescapeValue( keys["abstract"] )
+    raise DBusError( "unsupported bus address: %s" % address )
+
+
+def unescapeValue(value):
+    """Decode '%xx' escapes of address value."""
+    return re.sub( "%([0-9a-fA-F]{2})", lambda match: chr( int( match.group(1), 16 ) ), value )
+
+
+def encodePathElement(value):
+    """Escape string to be valid element of object path (like sd_bus_path_encode())."""
+    if not value:
+        return "_"
+    ret = ""
+    for index, char in enumerate( value ):
+        if char.isascii() and char.isalnum() and not ( index == 0 and char.isdigit() ):
+            ret += char
+        else:
+            ret += "_%02x" % ord( char )
+    return ret
+
+
+def splitSignature(signature):
+    """Split signature to list of single complete types."""
+    ret = []
+    index = 0
+    while index < len( signature ):
+        end = _typeEnd( signature, index )
+        ret.append( signature[ index:end ] )
+        index = end
+    return ret
+
+
+def _typeEnd(signature, index):
+    code = signature[ index ]
+    if code == "a":
+        return _typeEnd( signature, index + 1 )
+    if code in "({":
+        closing = ")" if code == "(" else "}"
+        index += 1
+        while signature[ index ] != closing:
+            index = _typeEnd( signature, index )
+        return index + 1
+    return index + 1
+
+
+class Marshaller():
+    """Serializer of values to wire format."""
+
+    def __init__(self, endian="<"):
+        self.endian = endian
+        self.data = bytearray()
+
+    def align(self, size):
+        self.data.extend( b"\0" * ( -len( self.data ) % size ) )
+
+    def putValues(self, signature, values):
+        for typeCode, value in zip( splitSignature( signature ), values ):
+            self.putValue( typeCode, value )
+
+    def putValue(self, typeCode, value):
+        code = typeCode[0]
+        if code in BASIC_TYPES:
+            valueFormat, size = BASIC_TYPES[ code ]
+            self.align( size )
+            self.data.extend( struct.pack( self.endian + valueFormat, int( value ) if code == "b" else value ) )
+        elif code in "so":
+            encoded = value.encode()
+            self.align( 4 )
+            self.data.extend( struct.pack( self.endian + "I", len( encoded ) ) )
+            self.data.extend( encoded + b"\0" )
+        elif code == "g":
+            encoded = value.encode()
+            self.data.append( len( encoded ) )
+            self.data.extend( encoded + b"\0" )
+        elif code == "v":
+            ## value is pair: ( signature, value )
+            self.putValue( "g", value[0] )
+            self.putValue( value[0], value[1] )
+        elif code == "a":
+            elementType = typeCode[1:]
+            self.align( 4 )
+            lengthPos = len( self.data )
+            self.data.extend( b"\0\0\0\0" )
+            self.align( ALIGNMENT[ elementType[0] ] )
+            start = len( self.data )
+            items = value.items() if elementType[0] == "{" else value
+            for item in items:
+                self.putValue( elementType, item )
+            struct.pack_into( self.endian + "I", self.data, lengthPos, len( self.data ) - start )
+        elif code in "({":
+            self.align( 8 )
+            self.putValues( typeCode[1:-1], value )
+        else:
+            raise DBusError( "unsupported type: %s" % typeCode )
+
+
+class Unmarshaller():
+    """Deserializer of values from wire format."""
+
+    def __init__(self, data: bytes, endian="<", offset=0):
+        self.data = data
+        self.endian = endian
+        self.offset = offset
+
+    def align(self, size):
+        self.offset += -self.offset % size
+
+    def getValues(self, signature):
+        """Read values of given signature. Raises DBusError if data is malformed or truncated."""
+        try:
+            return [ self._getValue( typeCode ) for typeCode in splitSignature( signature ) ]
+        except PARSE_ERRORS as exc:
+            raise DBusError( "malformed values of signature %r at offset %s: %s" % ( signature, self.offset, exc ) ) from exc
+
+    def getValue(self, typeCode):
+        """Read value of given type. Raises DBusError if data is malformed or truncated."""
+        try:
+            return self._getValue( typeCode )
+        except PARSE_ERRORS as exc:
+            raise DBusError( "malformed value of type %r at offset %s: %s" % ( typeCode, self.offset, exc ) ) from exc
+
+    def _getValue(self, typeCode):
+        code = typeCode[0]
+        if code in BASIC_TYPES:
+            valueFormat, size = BASIC_TYPES[ code ]
+            self.align( size )
+            value = struct.unpack_from( self.endian + valueFormat, self.data, self.offset )[0]
+            self.offset += size
+            if code == "b":
+                return bool( value )
+            return value
+        if code in "so":
+            length = self._getValue( "u" )
+            return self._getString( length )
+        if code == "g":
+            length = self.data[ self.offset ]
+            self.offset += 1
+            return self._getString( length )
+        if code == "v":
+            signature = self._getValue( "g" )
+            return self._getValue( signature )
+        if code == "a":
+            elementType = typeCode[1:]
+            length = self._getValue( "u" )
+            self.align( ALIGNMENT[ elementType[0] ] )
+            end = self.offset + length
+            items = []
+            while self.offset < end:
+                itemStart = self.offset
+                items.append( self._getValue( elementType ) )
+                if self.offset == itemStart:
+                    raise DBusError( "empty element of array: %s" % typeCode )
+            if elementType[0] == "{":
+                return dict( items )
+            return items
+        if code in "({":
+            self.align( 8 )
+            return tuple( self._getValue( item ) for item in splitSignature( typeCode[1:-1] ) )
+        raise DBusError( "unsupported type: %s" % typeCode )
+
+    def _getString(self, length):
+        if self.offset + length >= len( self.data ) or self.data[ self.offset + length ] != 0:
+            raise DBusError( "string exceeds data or is not terminated" )
+        value = self.data[ self.offset:self.offset + length ].decode( errors="replace" )
+        self.offset += length + 1
+        return value
+
+
+class DBusMessage():
+
+    def __init__(self, messageType, serial, fields=None, body=None, flags=0):
+        self.messageType = messageType
+        self.serial = serial
+        self.fields = fields if fields is not None else dict()
+        self.body = body if body is not None else []
+        self.flags = flags
+
+    @property
+    def path(self):
+        return self.fields.get( HEADER_PATH )
+
+    @property
+    def interface(self):
+        return self.fields.get( HEADER_INTERFACE )
+
+    @property
+    def member(self):
+        return self.fields.get( HEADER_MEMBER )
+
+    @property
+    def errorName(self):
+        return self.fields.get( HEADER_ERROR_NAME )
+
+    @property
+    def replySerial(self):
+        return self.fields.get( HEADER_REPLY_SERIAL )
+
+    @property
+    def signature(self):
+        return self.fields.get( HEADER_SIGNATURE, "" )
+
+    def __repr__(self):
+        return "<DBusMessage type=%s path=%s member=%s.%s body=%r>" % ( self.messageType, self.path,
+                                                                        self.interface, self.member, self.body )
+
+
+## signatures of header fields
+HEADER_SIGNATURES = { HEADER_PATH: "o", HEADER_INTERFACE: "s", HEADER_MEMBER: "s", HEADER_ERROR_NAME: "s",
+                      HEADER_REPLY_SERIAL: "u", HEADER_DESTINATION: "s", HEADER_SENDER: "s",
+                      HEADER_SIGNATURE: "g" }
+
+
+def buildMessage(messageType, serial, fields, signature="", body=(), flags=0):
+    """Return bytes of message. 'fields' is dict: header field code -> value."""
+    bodyData = Marshaller()
+    bodyData.putValues( signature, body )
+    fields = dict( fields )
+    if signature:
+        fields[ HEADER_SIGNATURE ] = signature
+    headerFields = [ ( code, ( HEADER_SIGNATURES[ code ], value ) ) for code, value in sorted( fields.items() ) ]
+    message = Marshaller()
+    message.data.extend( struct.pack( "<cBBBII", b"l", messageType, flags, 1, len( bodyData.data ), serial ) )
+    message.putValue( "a(yv)", headerFields )
+    message.align( 8 )
+    message.data.extend( bodyData.data )
+    return bytes( message.data )
+
+
+def messageLength(data: bytes):
+    """
+    Return length of message at beginning of data or 0 if header is incomplete.
+
+    Raises DBusError if header is invalid, so stream cannot be continued.
+    """
+    if len( data ) < 16:
+        return 0
+    endian = _getEndian( data )
+    bodyLength, _, fieldsLength = struct.unpack_from( endian + "III", data, 4 )
+    headerEnd = 16 + fieldsLength
+    headerEnd += -headerEnd % 8
+    totalLength = headerEnd + bodyLength
+    if totalLength > MAX_MESSAGE_LENGTH:
+        raise DBusError( "message too long: %s" % totalLength )
+    return totalLength
+
+
+def parseMessage(data: bytes):
+    """
+    Parse message from beginning of data. Return ( message, length ) or ( None, 0 ) if data is incomplete.
+
+    Raises DBusError if message is malformed.
+    """
+    totalLength = messageLength( data )
+    if totalLength == 0 or len( data ) < totalLength:
+        return ( None, 0 )
+    endian = _getEndian( data )
+    messageType, flags, _, _, serial, fieldsLength = struct.unpack_from( endian + "BBBIII", data, 1 )
+    data = bytes( data[ :totalLength ] )
+    reader = Unmarshaller( data, endian, 12 )
+    fields = dict( reader.getValue( "a(yv)" ) )
+    reader.offset = 16 + fieldsLength
+    reader.align( 8 )
+    signature = fields.get( HEADER_SIGNATURE, "" )
+    if isinstance( signature, str ) is False:
+        raise DBusError( "invalid signature: %r" % signature )
+    body = reader.getValues( signature )
+    return ( DBusMessage( messageType, serial, fields, body, flags ), totalLength )
+
+
+def _getEndian(data: bytes):
+    marker = data[0:1]
+    if marker == b"l":
+        return "<"
+    if marker == b"B":
+        return ">"
+    raise DBusError( "invalid endianness marker: %r" % marker )
+
+
+class DBusConnection():
+    """
+    Connection to message bus.
+
+    Calls are asynchronous: methods return serial of sent message and
+    replies are received by 'readMessages()' as any other message.
+    """
+
+    ## max size of single read
+    READ_SIZE = 65536
+
+    def __init__(self, address):
+        self.address = address
+        self.socket = None
+        self.serial = 0
+        self.buffer = bytearray()
+        self.helloSerial = None
+        self.uniqueName = None
+
+    def connect(self, timeout=5.0):
+        """Connect and authenticate. Raises OSError or DBusError on failure."""
+        sock = socket.socket( socket.AF_UNIX, socket.SOCK_STREAM )
+        try:
+            sock.settimeout( timeout )
+            sock.connect( parseAddress( self.address ) )
+            uid = str( os.getuid() ).encode().hex()
+            sock.sendall( b"\0AUTH EXTERNAL " + uid.encode() + b"\r\n" )
+            reply = self._readLine( sock )
+            if reply.startswith( b"OK" ) is False:
+                raise DBusError( "authentication failed: %r" % reply )
+            sock.sendall( b"BEGIN\r\n" )
+        except BaseException:
+            sock.close()
+            raise
+        self.socket = sock
+        self.helloSerial = self.callMethod( BUS_NAME, BUS_PATH, BUS_INTERFACE, "Hello" )
+
+    def fileno(self):
+        return self.socket.fileno()
+
+    def close(self):
+        if self.socket is not None:
+            self.socket.close()
+            self.socket = None
+
+    def callMethod(self, destination, path, interface, member, signature="", body=()):
+        fields = { HEADER_PATH: path, HEADER_INTERFACE: interface, HEADER_MEMBER: member,
+                   HEADER_DESTINATION: destination }
+        return self._send( METHOD_CALL, fields, signature, body )
+
+    def addMatch(self, rule):
+        return self.callMethod( BUS_NAME, BUS_PATH, BUS_INTERFACE, "AddMatch", "s", [ rule ] )
+
+    def emitSignal(self, path, interface, member, signature="", body=()):
+        fields = { HEADER_PATH: path, HEADER_INTERFACE: interface, HEADER_MEMBER: member }
+        return self._send( SIGNAL, fields, signature, body, FLAG_NO_REPLY_EXPECTED )
+
+    def readMessages(self):
+        """
+        Read available data and return list of complete messages.
+
+        Malformed messages are skipped. Raises EOFError if connection is closed
+        and DBusError if stream cannot be continued (invalid header).
+        """
+        data = self.socket.recv( self.READ_SIZE )
+        if not data:
+            raise EOFError( "connection closed by bus" )
+        self.buffer.extend( data )
+        messages = []
+        while True:
+            length = messageLength( self.buffer )
+            if length == 0 or len( self.buffer ) < length:
+                break
+            try:
+                message, length = parseMessage( self.buffer )
+            except DBusError as exc:
+                ## length of message is known, so stream can be continued
+                _LOGGER.warning( "skipping malformed message: %s", exc )
+                del self.buffer[ :length ]
+                continue
+            del self.buffer[ :length ]
+            if message.replySerial == self.helloSerial and message.messageType == METHOD_RETURN:
+                self.uniqueName = message.body[0]
+            messages.append( message )
+        return messages
+
+    def _send(self, messageType, fields, signature, body, flags=0):
+        self.serial += 1
+        self.socket.sendall( buildMessage( messageType, self.serial, fields, signature, body, flags ) )
+        return self.serial
+
+    @staticmethod
+    def _readLine(sock):
+        line = b""
+        while line.endswith( b"\r\n" ) is False:
+            data = sock.recv( 1 )
+            if not data:
+                raise DBusError( "connection closed during authentication" )
+            line += data
+        return line
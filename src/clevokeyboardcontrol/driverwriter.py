@@ -0,0 +1,132 @@
+#     ClevoKeyboardControl. Control of keyboard backlights.
+#
+#     Copyright (C) 2018  Arkadiusz Netczuk <dev.arnet@gmail.com>
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+import logging
+import threading
+import time
+
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class DriverWriter():
+    """
+    Background writer of driver's attributes.
+
+    Write requests are queued per attribute and only the newest request is
+    executed ("latest value wins"), intermediate values are dropped. Batches
+    are executed not more often than once per frame, so each attribute is
+    written at most once per frame. Callback is called once the queue
+    settles (no new requests arrived during the frame).
+    """
+
+    ## 60Hz
+    DEFAULT_FRAME_INTERVAL = 1.0 / 60
+
+    def __init__(self, threadName=None, frameInterval=None):
+        self.frameInterval = frameInterval
+        if self.frameInterval is None:
+            self.frameInterval = self.DEFAULT_FRAME_INTERVAL
+        self.callback = None                        ## called with set of written keys
+        self.errorCallback = None                   ## called with raised exception
+        self.pending = dict()                       ## key -> ( function, args )
+        self.condition = threading.Condition()
+        self.stopped = False
+        self.thread = threading.Thread( target=self._run, name=threadName, daemon=True )
+
+    def setCallback(self, callback):
+        self.callback = callback
+
+    def setErrorCallback(self, callback):
+        self.errorCallback = callback
+
+    def start(self):
+        self.thread.start()
+
+    def submit(self, key, function, *args):
+        """Queue call of function. Replaces previous not executed request with the same key."""
+        with self.condition:
+            self.pending[ key ] = ( function, args )
+            self.condition.notify()
+
+    def replace(self, key, function, *args):
+        """
+        Queue call of function dropping all not executed requests.
+
+        Used for writes superseding single attributes' changes (e.g. whole
+        driver's state), so older requests cannot overwrite them. Request
+        is executed after batch currently being written.
+        """
+        with self.condition:
+            self.pending = { key: ( function, args ) }
+            self.condition.notify()
+
+    def stop(self, timeout=None):
+        """Stop the thread. Pending requests are executed before stop."""
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        if self.thread.is_alive():
+            self.thread.join( timeout )
+
+    def _run(self):
+        written = set()
+        while True:
+            with self.condition:
+                if not written:
+                    while not self.pending and not self.stopped:
+                        self.condition.wait()
+                batch = self.pending
+                self.pending = dict()
+                stopped = self.stopped
+
+            if not batch:
+                ## queue settled
+                if written:
+                    self._notify( written )
+                    written = set()
+                if stopped:
+                    return
+                continue
+
+            frameStart = time.monotonic()
+            self._execute( batch )
+            written.update( batch.keys() )
+            if stopped is False:
+                delay = self.frameInterval - ( time.monotonic() - frameStart )
+                if delay > 0.0:
+                    time.sleep( delay )
+
+    def _execute(self, batch):
+        for key, request in batch.items():
+            function, args = request
+            try:
+                function( *args )
+            except Exception as exc:           # pylint: disable=W0703
+                _LOGGER.exception( "unable to write %s", key )
+                if self.errorCallback is not None:
+                    self.errorCallback( exc )
+
+    def _notify(self, written):
+        if self.callback is None:
+            return
+        try:
+            self.callback( written )
+        except Exception:                       # pylint: disable=W0703
+            _LOGGER.exception( "writer callback failed" )
@@ -22,9 +22,10 @@ import logging
 from . import uiloader
 from .qt import pyqtSignal
 from .qt import QtCore, QtGui
-from ..clevoio import Mode as ClevoMode, ClevoDriver
+from ..clevoio import Mode as ClevoMode, ClevoDriver, FilePath, DriverState, parseAttribute
 from ..sysfswatchdog import SysFSWatcher
-from ..sysfswatchdog import WatcherBlocker
+from ..driverwriter import DriverWriter
+from .. import startuptrace
 
 
 _LOGGER = logging.getLogger(__name__)
@@ -32,27 +33,71 @@ _LOGGER = logging.getLogger(__name__)
 
 class QSysFSWatcher( QtCore.QObject ):
 
-    sysfsChanged  = pyqtSignal()
+    sysfsChanged  = pyqtSignal( dict )          ## passes dict: path -> content
 
     def __init__(self, parent):
         super().__init__( parent )
-        self.detector = SysFSWatcher("DriverThread")
+        self.detector = SysFSWatcher()
         self.detector.setCallback( self._sysfsCallback )
 
     def setEnabled(self, newState):
         return self.detector.setEnabled(newState)
 
-    def ignoreNextEvent(self):
-        self.detector.ignoreNextEvent()
+    def expectWrite(self, path, value):
+        self.detector.expectWrite(path, value)
+
+    def setValueNormalizer(self, normalizer):
+        self.detector.setValueNormalizer(normalizer)
+
+    def setCoalescing(self, window, leading=False, trailing=True):
+        self.detector.setCoalescing(window, leading, trailing)
+
+    def touch(self):
+        self.detector.touch()
+
+    def setPaused(self, paused):
+        self.detector.setPaused(paused)
 
     def stop(self):
         self.detector.stop()
 
-    def watch(self, directoryPath, recursiveMode: bool):
-        self.detector.watch(directoryPath, recursiveMode)
+    def watch(self, directoryPath, recursiveMode: bool, files=None):
+        self.detector.watch(directoryPath, recursiveMode, files)
+
+    def _sysfsCallback(self, changes):
+        self.sysfsChanged.emit( changes )
 
-    def _sysfsCallback(self):
-        self.sysfsChanged.emit()
+
+class QDriverWriter( QtCore.QObject ):
+
+    batchWritten     = pyqtSignal()
+    stateWritten     = pyqtSignal()             ## request queued by 'replace()' executed
+    permissionDenied = pyqtSignal()
+
+    def __init__(self, parent):
+        super().__init__( parent )
+        self.writer = DriverWriter("DriverWriterThread")
+        self.writer.setCallback( self._batchCallback )
+        self.writer.setErrorCallback( self._errorCallback )
+        self.writer.start()
+
+    def submit(self, key, function, *args):
+        self.writer.submit( key, function, *args )
+
+    def replace(self, key, function, *args):
+        self.writer.replace( key, function, *args )
+
+    def stop(self):
+        self.writer.stop()
+
+    def _batchCallback(self, written):
+        if DriverState in written:
+            self.stateWritten.emit()
+        self.batchWritten.emit()
+
+    def _errorCallback(self, exc):
+        if isinstance(exc, PermissionError):
+            self.permissionDenied.emit()
 
 
 UiTargetClass, QtBaseClass = uiloader.loadUiFromClassName( __file__ )
@@ -61,8 +106,12 @@ UiTargetClass, QtBaseClass = uiloader.loadUiFromClassName( __file__ )
 class DriverWidget(QtBaseClass):        # type: ignore
 
     driverChanged    = pyqtSignal( ClevoDriver )
+    attributeChanged = pyqtSignal( FilePath, int )     ## attribute changed externally
     permissionDenied = pyqtSignal( )
 
+    ## seconds of merging external changes into single view update
+    COALESCE_WINDOW = 0.1
+
     def __init__(self, parentWidget=None):
         super().__init__(parentWidget)
 
@@ -72,6 +121,13 @@ class DriverWidget(QtBaseClass):        # type: ignore
         self.driver = None
         self.watcher = None
 
+        ## writes to driver are done in background thread
+        self.writer = QDriverWriter(self)
+        self.writer.batchWritten.connect( self._emitDriverChange )
+        self.writer.stateWritten.connect( self._stateWritten )
+        self.writer.permissionDenied.connect( self.permissionDenied )
+        self.restoreSpan = None
+
         self._initModeCB()
 
         ## connect signals
@@ -100,87 +156,130 @@ class DriverWidget(QtBaseClass):        # type: ignore
     def attachDriver(self, driver):
         _LOGGER.debug("attaching driver")
         self.driver = driver
+        ## external changes are detected by watcher, so values can be cached
+        self.driver.setShadowCacheEnabled( True )
 
         if self.watcher is not None:
+            ## release subscriptions of previous driver
             self.watcher.stop()
+            self.watcher.deleteLater()
         self.watcher = QSysFSWatcher(self)
         self.watcher.sysfsChanged.connect( self._sysfsChanged )
+        self.watcher.setValueNormalizer( self._normalizeValue )
+        ## bursts of external changes (e.g. vendor tool setting all colors) update view once
+        self.watcher.setCoalescing( self.COALESCE_WINDOW, leading=True, trailing=True )
+        ## own writes are registered in watcher to suppress their notifications
+        self.driver.setStoreListener( self._driverStoring )
         driverDir = self.driver.getDriverRootDirectory()
-        self.watcher.watch(driverDir, False)
+        ## watch only attributes used by application
+        driverFiles = [ self.driver.getFilePath( fileType ) for fileType in FilePath ]
+        driverFiles = [ path for path in driverFiles if path is not None ]
+        if not driverFiles:
+            driverFiles = None
+        self.watcher.watch(driverDir, False, driverFiles)
 
         ## self.refreshWidgets()               ## read driver state
 
+    def stop(self):
+        """Write pending changes and stop background threads."""
+        self.writer.stop()
+        if self.watcher is not None:
+            self.watcher.stop()
+
+    def setWatchPaused(self, paused):
+        """Pause polling of driver attributes, e.g. while session is locked."""
+        if self.watcher is None:
+            return
+        self.watcher.setPaused( paused )
+        if paused is False:
+            self.watcher.touch()
+
     def refreshWidgets(self):
         self._refreshView()
         self._emitDriverChange()
 
     def _refreshView(self):
         _LOGGER.debug("reading widget state from driver")
-
-        self.ui.stateCB.blockSignals( True )
-        ledOn = self.driver.getState()
-        self.ui.stateCB.setChecked( ledOn )
-        self.ui.stateCB.blockSignals( False )
-
-        self.ui.brightnessSlider.blockSignals( True )
-        brightness = self.driver.getBrightness()
-        self.ui.brightnessSlider.setValue( brightness )
-        self._setBrightnessLabel( brightness )
-        self.ui.brightnessSlider.blockSignals( False )
-
-        self.ui.modeCB.blockSignals( True )
-        mode = self.driver.getMode()
-        self.ui.modeCB.setCurrentIndex( mode.value )
-        self.ui.modeCB.blockSignals( False )
-
-        self.ui.leftColor.blockSignals( True )
-        leftPanelColor = self.driver.getColorLeft()
-        leftColor = self.toQColor( leftPanelColor )
-        self.ui.leftColor.updateWidget( leftColor )
-        self.ui.leftColor.blockSignals( False )
-
-        self.ui.centerColor.blockSignals( True )
-        centerPanelColor = self.driver.getColorCenter()
-        centerColor = self.toQColor( centerPanelColor )
-        self.ui.centerColor.updateWidget( centerColor )
-        self.ui.centerColor.blockSignals( False )
-
-        self.ui.rightColor.blockSignals( True )
-        rightPanelColor = self.driver.getColorRight()
-        rightColor = self.toQColor( rightPanelColor )
-        self.ui.rightColor.updateWidget( rightColor )
-        self.ui.rightColor.blockSignals( False )
+        state = self.driver.readDriverState()
+        for fileType in FilePath:
+            self._updateControl( fileType, state.getValue( fileType ) )
+
+    def _updateControl(self, fileType: FilePath, value: int):
+        """Set value of control related to given attribute without emitting signals."""
+        if fileType == FilePath.STATE_PATH:
+            self.ui.stateCB.blockSignals( True )
+            self.ui.stateCB.setChecked( value != 0 )
+            self.ui.stateCB.blockSignals( False )
+        elif fileType == FilePath.BRIGHTNESS_PATH:
+            self.ui.brightnessSlider.blockSignals( True )
+            self.ui.brightnessSlider.setValue( value )
+            self._setBrightnessLabel( value )
+            self.ui.brightnessSlider.blockSignals( False )
+        elif fileType == FilePath.MODE_PATH:
+            self.ui.modeCB.blockSignals( True )
+            self.ui.modeCB.setCurrentIndex( value )
+            self.ui.modeCB.blockSignals( False )
+        else:
+            colorWidget = self._getColorWidget( fileType )
+            colorWidget.blockSignals( True )
+            colorWidget.updateWidget( self.toQColor( value ) )
+            colorWidget.blockSignals( False )
+
+    def _getColorWidget(self, fileType: FilePath):
+        if fileType == FilePath.COLOR_LEFT_PATH:
+            return self.ui.leftColor
+        if fileType == FilePath.COLOR_CENTER_PATH:
+            return self.ui.centerColor
+        if fileType == FilePath.COLOR_RIGHT_PATH:
+            return self.ui.rightColor
+        raise ValueError("unhandled value: " + str(fileType))
 
     def refreshDriver(self):
         """Set drivers values from GUI controls."""
         enabled = self.ui.stateCB.isChecked()
-        self.driver.setState( enabled )
+        self._submitWrite( FilePath.STATE_PATH, self.driver.setState, enabled )
 
         value = self.ui.brightnessSlider.value()
-        self.driver.setBrightness( value )
+        self._submitWrite( FilePath.BRIGHTNESS_PATH, self.driver.setBrightness, value )
 
         selectedMode = self.ui.modeCB.currentData()
-        self.driver.setMode( selectedMode )
-
-        leftColor = self.ui.leftColor.getColor()
-        self.driver.setColorLeft( leftColor.red(), leftColor.green(), leftColor.blue() )
-
-        centerColor = self.ui.centerColor.getColor()
-        self.driver.setColorCenter( centerColor.red(), centerColor.green(), centerColor.blue() )
+        self._submitWrite( FilePath.MODE_PATH, self.driver.setMode, selectedMode )
 
-        rightColor = self.ui.rightColor.getColor()
-        self.driver.setColorRight( rightColor.red(), rightColor.green(), rightColor.blue() )
-
-        self._emitDriverChange()
+        self._setDeviceLeftColor( self.ui.leftColor.getColor() )
+        self._setDeviceCenterColor( self.ui.centerColor.getColor() )
+        self._setDeviceRightColor( self.ui.rightColor.getColor() )
 
-    def restoreDriver(self, driverState: dict):
+    def restoreDriver(self, driverState: DriverState):
         _LOGGER.debug( "restoring driver state" )
-        try:
-            self.driver.setDriverState( driverState )
-            self._refreshView()
-        except PermissionError:
-            _LOGGER.exception("unable to restore driver state")
-            self.permissionDenied.emit()
+        if driverState is None:
+            with startuptrace.span( "driver restore" ):
+                try:
+                    self._refreshView()
+                except PermissionError:
+                    _LOGGER.exception("unable to read driver state")
+                    self.permissionDenied.emit()
+            return
+        ## state is written by writer's thread -- span ends when writer reports the write
+        startuptrace.end( self.restoreSpan )
+        self.restoreSpan = startuptrace.begin( "driver restore" )
+        self.applyDriverState( driverState )
+
+    def applyDriverState(self, driverState: DriverState):
+        """
+        Switch driver to state (e.g. profile).
+
+        State is written by writer's thread replacing queued writes of
+        single attributes, so they cannot overwrite it. Only attributes
+        differing from hardware state are stored.
+        """
+        _LOGGER.debug( "applying driver state: %r", driverState )
+        for fileType in FilePath:
+            self._updateControl( fileType, driverState.getValue( fileType ) )
+        self.writer.replace( DriverState, self.driver.setDriverState, driverState, True )
+
+    def _stateWritten(self):
+        startuptrace.end( self.restoreSpan )
+        self.restoreSpan = None
 
     def turnLED(self, newState):
         ## Xfce4 stops Qt main loop, so turning LED when screen saver changes during session lock is impossible.
@@ -192,25 +291,40 @@ class DriverWidget(QtBaseClass):        # type: ignore
 
     ### ==============================================
 
-    def _sysfsChanged(self):
-        ## call method from Qt's thread instead of watchdog's thread
-        QtCore.QTimer.singleShot(0, self.refreshWidgets)
+    def _sysfsChanged(self, changes):
+        unknownChange = False
+        for filePath, content in changes.items():
+            fileType = self.driver.findFileType( filePath )
+            if fileType is None or content is None:
+                unknownChange = True
+                continue
+            try:
+                value = self.driver.updateAttribute( fileType, content.decode() )
+            except ValueError:
+                _LOGGER.warning( "invalid content of %s: %r", filePath, content )
+                unknownChange = True
+                continue
+            _LOGGER.debug( "attribute %s changed to %s", fileType.name, value )
+            ## update only affected control
+            self._updateControl( fileType, value )
+            self.attributeChanged.emit( fileType, value )
+
+        if unknownChange:
+            self.driver.invalidateCache()
+            ## call method from Qt's thread instead of watchdog's thread
+            QtCore.QTimer.singleShot(0, self.refreshWidgets)
 
     ### ==============================================
 
     def _toggleLED(self, state):
         ## state: 0 -- unchecked
         ## state: 2 -- checked
-        with WatcherBlocker(self.watcher):
-            enabled = (state != 0)
-            self.driver.setState( enabled )
-            self._emitDriverChange()
+        enabled = (state != 0)
+        self._submitWrite( FilePath.STATE_PATH, self.driver.setState, enabled )
 
     def _brightnessChanged(self, value: int):
-        with WatcherBlocker(self.watcher):
-            self.driver.setBrightness( value )
-            self._setBrightnessLabel( value )
-            self._emitDriverChange()
+        self._setBrightnessLabel( value )
+        self._submitWrite( FilePath.BRIGHTNESS_PATH, self.driver.setBrightness, value )
 
     def _setBrightnessLabel(self, value: int):
         valueString = str(value)
@@ -221,43 +335,35 @@ class DriverWidget(QtBaseClass):        # type: ignore
         self.ui.brightnessValue.setText( valueString )
 
     def _modeChanged(self):
-        with WatcherBlocker(self.watcher):
-            selectedMode = self.ui.modeCB.currentData()
-            self.driver.setMode( selectedMode )
-            self._emitDriverChange()
+        selectedMode = self.ui.modeCB.currentData()
+        self._submitWrite( FilePath.MODE_PATH, self.driver.setMode, selectedMode )
 
     def _leftColorChanged(self, color):
-        with WatcherBlocker(self.watcher):
-            self._setDeviceLeftColor(color)
-            self._emitDriverChange()
+        self._setDeviceLeftColor(color)
 
     def _setDeviceLeftColor(self, color):
         red = color.red()
         green = color.green()
         blue = color.blue()
-        self.driver.setColorLeft( red, green, blue )
+        self._submitWrite( FilePath.COLOR_LEFT_PATH, self.driver.setColorLeft, red, green, blue )
 
     def _centerColorChanged(self, color):
-        with WatcherBlocker(self.watcher):
-            self._setDeviceCenterColor(color)
-            self._emitDriverChange()
+        self._setDeviceCenterColor(color)
 
     def _setDeviceCenterColor(self, color):
         red = color.red()
         green = color.green()
         blue = color.blue()
-        self.driver.setColorCenter( red, green, blue )
+        self._submitWrite( FilePath.COLOR_CENTER_PATH, self.driver.setColorCenter, red, green, blue )
 
     def _rightColorChanged(self, color):
-        with WatcherBlocker(self.watcher):
-            self._setDeviceRightColor(color)
-            self._emitDriverChange()
+        self._setDeviceRightColor(color)
 
     def _setDeviceRightColor(self, color):
         red = color.red()
         green = color.green()
         blue = color.blue()
-        self.driver.setColorRight( red, green, blue )
+        self._submitWrite( FilePath.COLOR_RIGHT_PATH, self.driver.setColorRight, red, green, blue )
 
     def _setLeftToAll(self):
         color = self.ui.leftColor.getColor()
@@ -266,26 +372,45 @@ class DriverWidget(QtBaseClass):        # type: ignore
 
     def _setCenterToAll(self):
         color = self.ui.centerColor.getColor()
-        with WatcherBlocker(self.watcher):
-            self.ui.leftColor.updateWidget(color)
-            self.ui.rightColor.updateWidget(color)
-            self._setDeviceLeftColor(color)
-            self._setDeviceRightColor(color)
+        self.ui.leftColor.updateWidget(color)
+        self.ui.rightColor.updateWidget(color)
+        self._setDeviceLeftColor(color)
+        self._setDeviceRightColor(color)
 
     def _setRightToAll(self):
         color = self.ui.rightColor.getColor()
-        with WatcherBlocker(self.watcher):
-            self.ui.leftColor.updateWidget(color)
-            self.ui.centerColor.updateWidget(color)
-            self.ui.leftColor.updateWidget(color)
-            self._setDeviceCenterColor(color)
+        self.ui.leftColor.updateWidget(color)
+        self.ui.centerColor.updateWidget(color)
+        self._setDeviceLeftColor(color)
+        self._setDeviceCenterColor(color)
+
+    def _submitWrite(self, fileType: FilePath, function, *args):
+        """Queue write to driver. Only last value of each attribute is written."""
+        self.writer.submit( fileType, function, *args )
+        if self.watcher is not None:
+            ## user interacts -- poll driver faster for a while
+            self.watcher.touch()
+
+    def _driverStoring(self, fileType: FilePath, value: str):
+        ## can be called from writer's thread
+        if self.watcher is None:
+            return
+        filePath = self.driver.getFilePath( fileType )
+        if filePath is not None:
+            self.watcher.expectWrite( filePath, value )
+
+    def _normalizeValue(self, filePath, value: str):
+        fileType = self.driver.findFileType( filePath )
+        if fileType is None:
+            return value
+        return parseAttribute( fileType, value )
 
     def _emitDriverChange(self):
         self.driverChanged.emit( self.driver )
 
     @staticmethod
-    def toQColor(driverColor):
-        red = driverColor[0]
-        green = driverColor[1]
-        blue = driverColor[2]
+    def toQColor(driverColor: int):
+        red = (driverColor >> 16) & 255
+        green = (driverColor >> 8) & 255
+        blue = driverColor & 255
         return QtGui.QColor( red, green, blue )
@@ -21,14 +21,17 @@ import subprocess
 import os
 import getpass
 
-from .qt import qApp, QIcon, QtCore, QMessageBox
-# from .qt import pyqtSignal
+from .qt import qApp, QIcon, QtCore, QMessageBox, QInputDialog
+from .qt import pyqtSignal
 from . import uiloader
 from . import tray_icon
 from . import resources
+from . import settingsstore
+from ..settings import isValidProfileName
 
 from . import suspenddetector
 from .. import screensaverwatcher
+from .. import startuptrace
 
 
 _LOGGER = logging.getLogger(__name__)
@@ -55,24 +58,33 @@ UiTargetClass, QtBaseClass = uiloader.loadUiFromClassName( __file__ )
 
 class MainWindow(QtBaseClass):      # type: ignore
 
+    ## screen saver state passed from watcher's thread to Qt's thread
+    screenSaverActivated = pyqtSignal( bool )
+
     def __init__(self, driver):
         super().__init__()
-        self.ui = UiTargetClass()
-        self.ui.setupUi(self)
+        with startuptrace.span( "setupUi" ):
+            self.ui = UiTargetClass()
+            self.ui.setupUi(self)
 
         ## configure objects
-        self.suspendDetector = suspenddetector.QSuspendDetector(self)
-        self.suspendDetector.systemResumed.connect( self.ui.settingsWidget.requestDriverRestore )
-        self.suspendDetector.setEnabled( self.ui.settingsWidget.isRestoreFromSuspendEnabled() )
+        with startuptrace.span( "suspend detector" ):
+            self.suspendDetector = suspenddetector.QSuspendDetector(self)
+            self.suspendDetector.systemResumed.connect( self.ui.settingsWidget.requestDriverRestore )
+            self.suspendDetector.setEnabled( self.ui.settingsWidget.isRestoreFromSuspendEnabled() )
 
-        self.screenSaverDetector = screensaverwatcher.ScreenSaverWatcher()
-        self.screenSaverDetector.setCallback( self._screenSaverActivationCallback )
-        self.screenSaverDetector.setEnabled( self.ui.settingsWidget.isScreenSaverLEDEnabled() )
+        with startuptrace.span( "ScreenSaverWatcher" ):
+            self.screenSaverDetector = screensaverwatcher.ScreenSaverWatcher()
+            self.screenSaverDetector.setCallback( self._screenSaverActivationCallback )
+            self.screenSaverDetector.setEnabled( self.ui.settingsWidget.isScreenSaverLEDEnabled() )
 
         ## connect widgets
         self.ui.actionExit.triggered.connect( qApp.quit )
+        qApp.aboutToQuit.connect( self.ui.driverWidget.stop )
+        qApp.aboutToQuit.connect( self.screenSaverDetector.stop )
 
         self.ui.driverWidget.driverChanged.connect( self.ui.settingsWidget.readDriverState )
+        self.ui.driverWidget.attributeChanged.connect( self.ui.settingsWidget.updateDriverState )
         self.ui.driverWidget.permissionDenied.connect( self.noDriverPermission )
 
         self.ui.settingsWidget.restoreDriver.connect( self.ui.driverWidget.restoreDriver )
@@ -82,15 +94,26 @@ class MainWindow(QtBaseClass):      # type: ignore
 
         self.ui.fixPermissionsPB.clicked.connect( self.fixPermissions )
 
+        ## persist changes shortly after they happen instead of only on exit
+        self.settingsSaver = settingsstore.DebouncedSaver( self, self.saveSettings, self.settingsSnapshot )
+        self.ui.settingsWidget.settingsChanged.connect( self.settingsSaver.schedule )
+        self.screenSaverActivated.connect( self.settingsSaver.setPaused, QtCore.Qt.QueuedConnection )
+
         ## other operations
-        self.ui.driverWidget.attachDriver( driver )
+        with startuptrace.span( "attach driver (sysfs watcher)" ):
+            self.ui.driverWidget.attachDriver( driver )
 
-        self.trayIcon = tray_icon.TrayIcon(self)
-        self.trayIcon.setToolTip("Clevo Keyboard")
+        with startuptrace.span( "tray icon" ):
+            self.trayIcon = tray_icon.TrayIcon(self)
+            self.trayIcon.setToolTip("Clevo Keyboard")
+            self.trayIcon.profileSelected.connect( self.applyProfile )
+            self.trayIcon.profileStoreRequested.connect( self.storeProfile )
+            self.ui.settingsWidget.profilesChanged.connect( self._updateTrayProfiles )
+            self.ui.settingsWidget.settingsChanged.connect( self._updateTrayCurrentProfile )
 
-        self.setIconTheme( tray_icon.TrayIconTheme.WHITE )
+            self.setIconTheme( tray_icon.TrayIconTheme.WHITE )
 
-        self.trayIcon.show()
+            self.trayIcon.show()
 
         self.statusBar().showMessage("Ready")
 
@@ -119,13 +142,45 @@ class MainWindow(QtBaseClass):      # type: ignore
 
     def _screenSaverActivationCallback(self, newState):
         _LOGGER.info( "screen saver activation: %s", newState )
+        ## LEDs turned off by screen saver are not user's choice to persist
+        ## (callback is called from watcher's thread, so saver is paused in Qt's thread)
+        self.screenSaverActivated.emit( newState )
         if newState:
             ## turn off
             self.ui.driverWidget.turnLED( False )
+            self.ui.driverWidget.setWatchPaused( True )
         else:
             ## turn on
+            self.ui.driverWidget.setWatchPaused( False )
             self.ui.driverWidget.turnLED( True )
 
+    def applyProfile(self, name):
+        state = self.ui.settingsWidget.getProfile( name )
+        if state is None:
+            _LOGGER.warning( "profile not found: %s", name )
+            return
+        _LOGGER.info( "switching to profile: %s", name )
+        self.ui.driverWidget.applyDriverState( state )
+        ## re-check action even if state did not change
+        self._updateTrayCurrentProfile()
+
+    def storeProfile(self):
+        name, accepted = QInputDialog.getText( self, "Save profile", "Name of profile:" )
+        if accepted is False or not name:
+            return
+        if isValidProfileName( name ) is False:
+            QMessageBox.warning( self, 'Error', "Invalid profile name. Use letters, digits, '_' and '-'." )
+            return
+        if self.ui.settingsWidget.storeProfile( name ) is False:
+            QMessageBox.warning( self, 'Error', "Keyboard state is not known." )
+
+    def _updateTrayProfiles(self, names):
+        self.trayIcon.setProfiles( names )
+        self._updateTrayCurrentProfile()
+
+    def _updateTrayCurrentProfile(self):
+        self.trayIcon.setCurrentProfile( self.ui.settingsWidget.currentProfile() )
+
     # ================================================================
 
     def loadSettings(self):
@@ -143,6 +198,9 @@ class MainWindow(QtBaseClass):      # type: ignore
             self.restoreState( state )
         settings.endGroup()
 
+        ## values applied from file are not a change
+        self.settingsSaver.setSaved()
+
     def saveSettings(self):
         settings = self.getSettings()
         _LOGGER.debug( "saving app state to %s", settings.fileName() )
@@ -157,12 +215,18 @@ class MainWindow(QtBaseClass):      # type: ignore
         ## force save to file
         settings.sync()
 
+        if settings.status() != settings.NoError:
+            _LOGGER.warning( "unable to write settings to %s", settings.fileName() )
+
+    def flushSettings(self):
+        """Save settings if they differ from stored ones (e.g. on exit)."""
+        self.settingsSaver.flush( force=True )
+
+    def settingsSnapshot(self):
+        return ( self.ui.settingsWidget.settingsSnapshot(), bytes( self.saveGeometry() ), bytes( self.saveState() ) )
+
     def getSettings(self):
-        ## store in home directory
-        orgName = qApp.organizationName()
-        appName = qApp.applicationName()
-        settings = QtCore.QSettings(QtCore.QSettings.IniFormat, QtCore.QSettings.UserScope, orgName, appName, self)
-        return settings
+        return settingsstore.getSettings()
 
     # ================================================================
 
@@ -170,7 +234,7 @@ class MainWindow(QtBaseClass):      # type: ignore
         _LOGGER.debug("setting tray theme: %r", theme)
 
         fileName = theme.value
-        iconPath = resources.getImagePath( fileName )
+        iconPath = resources.getIconPath( fileName )
         appIcon = QIcon( iconPath )
 
         self.setWindowIcon( appIcon )
@@ -18,6 +18,16 @@
 
 
 import os
+import logging
+
+from . import uicompiler
+
+
+_LOGGER = logging.getLogger(__name__)
+
+
+## None means not loaded yet
+_RESOURCES_LOADED = None
 
 
 def getImagePath(imageName):
@@ -31,3 +41,25 @@ def getImagesPath():
     imgDir = scriptDir + os.path.sep + 'img'
     return imgDir
 
+
+def getIconPath(imageName):
+    """Return path of image suitable for QIcon -- Qt resource if precompiled resources are available."""
+    if loadResources():
+        return ":" + uicompiler.RESOURCES_PREFIX + "/" + imageName
+    return getImagePath( imageName )
+
+
+def loadResources():
+    """Register precompiled images in Qt resource system (generates them on first run)."""
+    global _RESOURCES_LOADED
+    if _RESOURCES_LOADED is not None:
+        return _RESOURCES_LOADED
+    _RESOURCES_LOADED = False
+    try:
+        _RESOURCES_LOADED = uicompiler.loadResources()
+        if _RESOURCES_LOADED is False and uicompiler.canGenerate():
+            uicompiler.compileResources()
+            _RESOURCES_LOADED = uicompiler.loadResources()
+    except Exception:
+        _LOGGER.exception( "unable to load precompiled resources" )
+    return _RESOURCES_LOADED
@@ -19,6 +19,10 @@
 
 import logging
 
+from ..clevoio import DriverState, FilePath
+from ..settings import loadDriverState, saveDriverState
+from ..settings import loadProfiles, saveProfile, removeProfile, findProfile
+
 from . import uiloader
 from .qt import pyqtSignal
 from .tray_icon import TrayIconTheme
@@ -32,19 +36,26 @@ _LOGGER = logging.getLogger(__name__)
 
 class SettingsWidget(QtBaseClass):      # type: ignore
 
-    restoreDriver            = pyqtSignal( dict )
+    restoreDriver            = pyqtSignal( object )          ## passes DriverState or None
     iconThemeChanged         = pyqtSignal( TrayIconTheme )
     handleSuspendChanged     = pyqtSignal( bool )
     handleScreenSaverChanged = pyqtSignal( bool )
+    settingsChanged          = pyqtSignal()                  ## persisted values changed
+    profilesChanged          = pyqtSignal( list )            ## passes sorted names of profiles
 
     def __init__(self, parentWidget=None):
         super().__init__(parentWidget)
 
-        self.driverState = dict()
+        self.driverState: DriverState = None
+        ## named profiles: name -> DriverState
+        self.profiles: dict = dict()
+        ## profiles to remove from settings on next save
+        self.removedProfiles: set = set()
 
         self.ui = UiTargetClass()
         self.ui.setupUi(self)
 
+        self.ui.restoreStartCB.stateChanged.connect( self.settingsChanged )
         self.ui.restoreSuspendCB.stateChanged.connect( self._toggleResumeSuspend )
         self.ui.screenSaverLEDOffCB.stateChanged.connect( self._toggleScreenSaverLED )
 
@@ -59,7 +70,14 @@ class SettingsWidget(QtBaseClass):      # type: ignore
             self.ui.trayThemeCB.addItem( itemName, item )
 
     def readDriverState(self, driver):
-        self.driverState = driver.readDriverState()
+        self._setDriverState( driver.readDriverState() )
+
+    def updateDriverState(self, fileType: FilePath, value: int):
+        """Patch cached driver state with single attribute's change."""
+        if self.driverState is None:
+            ## state not read yet
+            return
+        self._setDriverState( self.driverState.replace( fileType, value ) )
 
     def requestDriverRestore(self):
         _LOGGER.debug( "request driver restore received" )
@@ -71,17 +89,62 @@ class SettingsWidget(QtBaseClass):      # type: ignore
     def isScreenSaverLEDEnabled(self):
         return self.ui.screenSaverLEDOffCB.isChecked()
 
+    def getProfile(self, name: str) -> DriverState:
+        return self.profiles.get( name )
+
+    def getProfileNames(self):
+        return sorted( self.profiles )
+
+    def currentProfile(self):
+        """Return name of profile matching current driver state or None."""
+        if self.driverState is None:
+            return None
+        return findProfile( self.profiles, self.driverState )
+
+    def storeProfile(self, name: str):
+        """Store current driver state as profile. Returns False if state is not known."""
+        if self.driverState is None:
+            return False
+        self.profiles[ name ] = self.driverState
+        self.removedProfiles.discard( name )
+        self._emitProfilesChanged()
+        return True
+
+    def removeProfile(self, name: str):
+        if self.profiles.pop( name, None ) is None:
+            return
+        self.removedProfiles.add( name )
+        self._emitProfilesChanged()
+
+    def settingsSnapshot(self):
+        """Return comparable tuple of values stored by 'saveSettings()'."""
+        selectedTheme = self.ui.trayThemeCB.currentData()
+        return ( self.driverState,
+                 tuple( sorted( self.profiles.items() ) ),
+                 self.ui.restoreStartCB.isChecked(),
+                 self.ui.restoreSuspendCB.isChecked(),
+                 self.ui.screenSaverLEDOffCB.isChecked(),
+                 selectedTheme )
+
     ## =====================================================
 
+    def _setDriverState(self, state: DriverState):
+        if state == self.driverState:
+            return
+        self.driverState = state
+        self.settingsChanged.emit()
+
     def _trayThemeChanged(self):
         selectedTheme = self.ui.trayThemeCB.currentData()
         self.iconThemeChanged.emit( selectedTheme )
+        self.settingsChanged.emit()
 
     def _toggleResumeSuspend(self, state):
         ## state: 0 -- unchecked
         ## state: 2 -- checked
         enabled = (state != 0)
         self.handleSuspendChanged.emit( enabled )
+        self.settingsChanged.emit()
 
     def _toggleScreenSaverLED(self, state):
         ##_LOGGER.info("toggling screen saver LED")
@@ -89,11 +152,15 @@ class SettingsWidget(QtBaseClass):      # type: ignore
         ## state: 2 -- checked
         enabled = (state != 0)
         self.handleScreenSaverChanged.emit( enabled )
+        self.settingsChanged.emit()
 
     ## =====================================================
 
     def loadSettings(self, settings):
         self._loadDriverState(settings)
+        self.profiles = loadProfiles( settings )
+        self.removedProfiles.clear()
+        self.profilesChanged.emit( self.getProfileNames() )
 
         settings.beginGroup( self.objectName() )
 
@@ -115,6 +182,7 @@ class SettingsWidget(QtBaseClass):      # type: ignore
 
     def saveSettings(self, settings):
         self._saveDriverState(settings)
+        self._saveProfiles(settings)
 
         settings.beginGroup( self.objectName() )
 
@@ -133,25 +201,31 @@ class SettingsWidget(QtBaseClass):      # type: ignore
         settings.endGroup()
 
     def _loadDriverState(self, settings):
-        settings.beginGroup( "DriverState" )
-        state = loadKeysToDict( settings )
-        settings.endGroup()
-        if bool(state) is False:
-            ## state dictionary is empty
+        state = loadDriverState( settings )
+        if state is None:
+            ## state not stored
             return
         self.driverState = state
         _LOGGER.debug( "loaded driver state: %r", self.driverState )
 
     def _saveDriverState(self, settings):
-        if bool(self.driverState) is False:
-            ## state dictionary is empty
+        if self.driverState is None:
+            ## state not read yet
             return
         _LOGGER.debug( "Saving driver state: %r", self.driverState )
-        settings.beginGroup( "DriverState" )
-        for key in self.driverState:
-            val = self.driverState[ key ]
-            settings.setValue( key, val)
-        settings.endGroup()
+        saveDriverState( settings, self.driverState )
+
+    def _saveProfiles(self, settings):
+        ## profiles added externally (e.g. by command line) are kept
+        for name in self.removedProfiles:
+            removeProfile( settings, name )
+        self.removedProfiles.clear()
+        for name, state in self.profiles.items():
+            saveProfile( settings, name, state )
+
+    def _emitProfilesChanged(self):
+        self.profilesChanged.emit( self.getProfileNames() )
+        self.settingsChanged.emit()
 
     def _setCurrentTrayTheme( self, trayTheme: str ):
         themeIndex = TrayIconTheme.indexOf( trayTheme )
@@ -165,14 +239,5 @@ class SettingsWidget(QtBaseClass):      # type: ignore
         if emitState is True:
             self.restoreDriver.emit( self.driverState )
         else:
-            self.restoreDriver.emit( dict() )
-
-
-def loadKeysToDict(settings):
-    state = dict()
-    for key in settings.childKeys():
-        value = settings.value(key, "", type=str)
-        if len(value) > 0:
-            state[ key ] = value
-    return state
+            self.restoreDriver.emit( None )
 
@@ -0,0 +1,133 @@
+#     ClevoKeyboardControl. Control of keyboard backlights.
+#
+#     Copyright (C) 2018  Arkadiusz Netczuk <dev.arnet@gmail.com>
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""
+Application's settings store.
+
+Settings are kept in single QSettings object for whole process. Changes
+are persisted by DebouncedSaver shortly after last modification, so crash
+or killed session does not lose them.
+"""
+
+import logging
+
+from .qt import qApp, QtCore
+
+
+_LOGGER = logging.getLogger(__name__)
+
+
+## seconds between last change and write to file
+AUTOSAVE_DELAY = 2.0
+
+## process-wide settings object
+_settings = None
+
+
+def getSettings():
+    """Return application's settings object (created on first call)."""
+    global _settings
+    if _settings is None:
+        ## store in home directory
+        orgName = qApp.organizationName()
+        appName = qApp.applicationName()
+        _settings = QtCore.QSettings( QtCore.QSettings.IniFormat, QtCore.QSettings.UserScope, orgName, appName )
+        ## write to temporary file and rename, never overwrite file in place
+        _settings.setAtomicSyncRequired( True )
+    return _settings
+
+
+class DebouncedSaver( QtCore.QObject ):
+    """
+    Calls save function after delay since last change.
+
+    Consecutive changes restart the delay. Write is skipped if snapshot of
+    persisted values equals snapshot of last save, so idle session or
+    change reverted before timeout do not touch the file.
+    """
+
+    def __init__(self, parent, saveFunction, snapshotFunction=None, delay=AUTOSAVE_DELAY):
+        super().__init__( parent )
+        self.saveFunction = saveFunction
+        self.snapshotFunction = snapshotFunction
+        self.lastSnapshot = None
+        self.paused = False
+        self.pending = False
+        self.timer = QtCore.QTimer( self )
+        self.timer.setSingleShot( True )
+        self.timer.setInterval( int( delay * 1000 ) )
+        self.timer.timeout.connect( self.flush )
+
+    def setSaved(self):
+        """Mark current state as persisted (e.g. just loaded)."""
+        self.timer.stop()
+        self.pending = False
+        self.lastSnapshot = self._snapshot()
+
+    ## slot
+    def schedule(self):
+        """Register change and restart delay."""
+        self.pending = True
+        if self.paused:
+            return
+        self.timer.start()
+
+    def setPaused(self, paused):
+        """
+        Postpone saving, e.g. while values are changed temporarily.
+
+        Change pending before pause is saved immediately. Nothing is saved
+        while paused (also by 'flush()').
+        """
+        if paused and self.paused is False:
+            self.flush()
+        self.paused = paused
+        if paused:
+            self.timer.stop()
+        elif self.pending:
+            self.timer.start()
+
+    def isPending(self):
+        return self.pending
+
+    def flush(self, force=False):
+        """
+        Save pending change immediately. Returns True if save function was called.
+
+        'force' checks snapshot even if no change was registered (e.g. on exit).
+        """
+        self.timer.stop()
+        if self.paused:
+            ## values can be changed temporarily
+            return False
+        if self.pending is False and force is False:
+            return False
+        self.pending = False
+        snapshot = self._snapshot()
+        if snapshot is not None and snapshot == self.lastSnapshot:
+            _LOGGER.debug( "settings not changed, skipping save" )
+            return False
+        self.saveFunction()
+        self.lastSnapshot = snapshot
+        return True
+
+    def _snapshot(self):
+        if self.snapshotFunction is None:
+            return None
+        return self.snapshotFunction()
@@ -19,49 +19,101 @@
 
 import logging
 from typing import Dict, Any
-import datetime
 
 from .qt import QtCore
 from .qt import qApp
 from .qt import pyqtSignal
 
+from ..suspend import SuspendDetector, SleepListener
+
 
 _LOGGER = logging.getLogger(__name__)
 
 
 class QSuspendTimer( QtCore.QObject ):
+    """
+    Qt adapter of SuspendDetector.
+
+    Fallback used when logind is not available. Detector's timer descriptor
+    is watched by QSocketNotifier, so there is no periodic Qt timer.
+    """
 
     resumed = pyqtSignal()
 
-    def __init__(self, parent):
+    def __init__(self, parent, detector=None):
         super().__init__(parent)
-        self.lastTime = None
+        self.detector = detector
+        if self.detector is None:
+            self.detector = SuspendDetector()
+        self.detector.setCallback( self._resumed )
+        self.notifier = None
+        ## used only if timerfd is not available
         self.timer = QtCore.QTimer(self)
         self.timer.timeout.connect( self.checkResumed )
 
     def start(self):
         _LOGGER.debug("starting suspension timer")
-        self.lastTime = None
-        self.timer.start( 1000 )                            ## triggered every second
+        self.stop()
+        if self.detector.start():
+            self.notifier = QtCore.QSocketNotifier( self.detector.fileno(), QtCore.QSocketNotifier.Read, self )
+            self.notifier.activated.connect( self.detector.handleTimer )
+        else:
+            self.timer.start( int( self.detector.interval * 1000 ) )
 
     def stop(self):
         _LOGGER.debug("stopping suspension timer")
+        if self.notifier is not None:
+            self.notifier.setEnabled( False )
+            self.notifier.deleteLater()
+            self.notifier = None
+        self.detector.stop()
         self.timer.stop()
 
     def checkResumed(self):
-        if self.lastTime is None:
-            self.lastTime = datetime.datetime.now()
-            return False
-        currTime = datetime.datetime.now()
-        timeDiff = currTime - self.lastTime
-        secDiff = timeDiff.total_seconds()
-        self.lastTime = currTime
-        if secDiff < 3.5:
-            return False
-        _LOGGER.debug("resumed from suspend / hibernation after %s[s]", secDiff)
+        return self.detector.check()
+
+    def _resumed(self, _):
         self.resumed.emit()
+
+
+class QSleepListener( QtCore.QObject ):
+    """Qt adapter of SleepListener (logind's 'PrepareForSleep' signal)."""
+
+    resumed        = pyqtSignal()
+    connectionLost = pyqtSignal()
+
+    LOGIN_PATH = SleepListener.LOGIN_PATH
+    LOGIN_MANAGER_INTERFACE = SleepListener.LOGIN_MANAGER_INTERFACE
+
+    def __init__(self, parent, address=None):
+        super().__init__(parent)
+        self.listener = SleepListener( address )
+        self.listener.setCallback( self.resumed.emit )
+        self.notifier = None
+
+    def start(self):
+        """Subscribe signal. Returns False if system bus is not available."""
+        if self.notifier is not None:
+            return True
+        if self.listener.connect() is False:
+            return False
+        self.notifier = QtCore.QSocketNotifier( self.listener.fileno(), QtCore.QSocketNotifier.Read, self )
+        self.notifier.activated.connect( self._readMessages )
         return True
 
+    def stop(self):
+        if self.notifier is not None:
+            self.notifier.setEnabled( False )
+            self.notifier.deleteLater()
+            self.notifier = None
+        self.listener.close()
+
+    def _readMessages(self):
+        if self.listener.handleMessages():
+            return
+        self.stop()
+        self.connectionLost.emit()
+
 
 class SingletonMeta(type):
     _instances: Dict[Any, Any] = {}
@@ -94,13 +146,20 @@ class QSuspendSingleton( QtCore.QObject, metaclass=QSingletonMeta ):
 
     def __init__(self):
         super().__init__( qApp )
+        self.listener = QSleepListener( self )
+        self.listener.resumed.connect( self.resumed )
         self.timer = QSuspendTimer( self )
         self.timer.resumed.connect( self.resumed )
+        self.listener.connectionLost.connect( self.timer.start )
 
     def start(self):
+        if self.listener.start():
+            return
+        ## D-Bus not available
         self.timer.start()
 
     def stop(self):
+        self.listener.stop()
         self.timer.stop()
 
     @classmethod
@@ -125,7 +184,7 @@ class QSuspendDetector( QtCore.QObject ):
         self.detector.resumed.connect( self.systemResumed )
 
     def setEnabled(self, enable=True):
-        _LOGGER.debug("changing suspend detector state to %s" % enable)
+        _LOGGER.debug("changing suspend detector state to %s", enable)
         if enable:
             self.start()
         else:
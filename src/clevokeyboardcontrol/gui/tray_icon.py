@@ -22,6 +22,7 @@ from enum import Enum, unique
 
 from .qt import qApp, QSystemTrayIcon, QMenu, QAction
 from .qt import QIcon
+from .qt import pyqtSignal
 
 from . import resources
 
@@ -54,6 +55,10 @@ class TrayIconTheme(Enum):
 
 
 class TrayIcon(QSystemTrayIcon):
+
+    profileSelected       = pyqtSignal( str )
+    profileStoreRequested = pyqtSignal()
+
     def __init__(self, parent):
         super().__init__(parent)
 
@@ -72,8 +77,28 @@ class TrayIcon(QSystemTrayIcon):
 
         tray_menu = QMenu()
         tray_menu.addAction( self.toggle_window_action )
+        self.profiles_menu = tray_menu.addMenu( "Profiles" )
         tray_menu.addAction( quit_action )
         self.setContextMenu( tray_menu )
+        self.setProfiles( [] )
+
+    def setProfiles(self, names):
+        """Fill profiles submenu with actions of given profiles."""
+        self.profiles_menu.clear()
+        for name in names:
+            action = self.profiles_menu.addAction( name )
+            action.setCheckable( True )
+            action.triggered.connect( lambda _, profile=name: self.profileSelected.emit( profile ) )
+        if names:
+            self.profiles_menu.addSeparator()
+        store_action = self.profiles_menu.addAction( "Save current as..." )
+        store_action.triggered.connect( self.profileStoreRequested )
+
+    def setCurrentProfile(self, name):
+        """Check action of given profile (None unchecks all)."""
+        for action in self.profiles_menu.actions():
+            if action.isCheckable():
+                action.setChecked( action.text() == name )
 
     def displayMessage(self, message):
         timeout = 10000
@@ -87,7 +112,7 @@ class TrayIcon(QSystemTrayIcon):
     def setIconTheme(self, theme: TrayIconTheme):
         _LOGGER.debug("setting tray theme: %r", theme)
         fileName = theme.value
-        iconPath = resources.getImagePath( fileName )
+        iconPath = resources.getIconPath( fileName )
         self.setIcon( QIcon( iconPath ) )
 
     def _icon_activated(self, reason):
@@ -0,0 +1,215 @@
+#     ClevoKeyboardControl. Control of keyboard backlights.
+#
+#     Copyright (C) 2018  Arkadiusz Netczuk <dev.arnet@gmail.com>
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""
+Compilation of UI files and image resources to Python modules.
+
+Generated modules are stored in 'generated' directory. Each module starts
+with header containing hash of it's sources, so stale module is detected
+and can be recompiled. Compilation is done on install (see setup.py),
+by running 'python3 -m clevokeyboardcontrol.gui.uicompiler' or on first
+run of application.
+"""
+
+import os
+import sys
+import hashlib
+import logging
+import importlib.util
+
+import clevokeyboardcontrol.defs as defs
+
+
+_LOGGER = logging.getLogger(__name__)
+
+
+GENERATED_DIR = os.path.join( os.path.dirname( os.path.abspath(__file__) ), "generated" )
+UI_DIR        = os.path.join( defs.ROOT_DIR, "ui" )
+IMAGES_DIR    = os.path.join( os.path.dirname( os.path.abspath(__file__) ), "img" )
+
+RESOURCES_MODULE = "resources_rc"
+## prefix of images in Qt resource system
+RESOURCES_PREFIX = "/img"
+
+HEADER_PREFIX = "## "
+
+
+def sourceHash(paths) -> str:
+    """Calculate hash of content of given files."""
+    sourceDigest = hashlib.sha1()
+    for path in paths:
+        with open( path, "rb" ) as sourceFile:
+            sourceDigest.update( sourceFile.read() )
+    return sourceDigest.hexdigest()
+
+
+def readHeader(modulePath) -> dict:
+    """Read header of generated module. Returns empty dict if module does not exist."""
+    ret = dict()
+    try:
+        with open( modulePath, "r", encoding="utf-8" ) as moduleFile:
+            for line in moduleFile:
+                if line.startswith( HEADER_PREFIX ) is False:
+                    break
+                key, _, value = line[ len(HEADER_PREFIX): ].partition( ":" )
+                ret[ key.strip() ] = value.strip()
+    except OSError:
+        pass
+    return ret
+
+
+def writeModule(modulePath, header: dict, content: str):
+    """Write generated module atomically. Raises OSError on failure."""
+    os.makedirs( os.path.dirname( modulePath ), exist_ok=True )
+    headerLines = [ "%s%s: %s\n" % ( HEADER_PREFIX, key, value ) for key, value in header.items() ]
+    tmpPath = modulePath + ".tmp"
+    with open( tmpPath, "w", encoding="utf-8" ) as moduleFile:
+        moduleFile.write( "".join( headerLines ) )
+        moduleFile.write( "##\n## File was generated automatically. Any change will be lost.\n##\n\n" )
+        moduleFile.write( content )
+    os.replace( tmpPath, modulePath )
+
+
+def canGenerate():
+    """Check if generated modules can be written."""
+    targetDir = GENERATED_DIR
+    if os.path.isdir( targetDir ) is False:
+        targetDir = os.path.dirname( targetDir )
+    return os.access( targetDir, os.W_OK )
+
+
+def importModule(modulePath):
+    moduleName = __package__ + ".generated." + os.path.splitext( os.path.basename( modulePath ) )[0]
+    spec = importlib.util.spec_from_file_location( moduleName, modulePath )
+    module = importlib.util.module_from_spec( spec )
+    spec.loader.exec_module( module )
+    return module
+
+
+## =====================================================
+
+
+def generatedUiPath(uiFilename):
+    baseName = os.path.splitext( os.path.basename( uiFilename ) )[0]
+    return os.path.join( GENERATED_DIR, "ui_" + baseName + ".py" )
+
+
+def compileUi(uiFilename):
+    """Generate Python module of UI file. Raises OSError if module cannot be written."""
+    import io
+    import xml.etree.ElementTree as ElementTree
+    from PyQt5 import uic
+
+    uiPath = os.path.join( UI_DIR, uiFilename )
+    rootWidget = ElementTree.parse( uiPath ).getroot().find( "widget" )
+    header = { "source hash": sourceHash( [ uiPath ] ),
+               "form class": "Ui_" + rootWidget.get( "name" ),
+               "base class": rootWidget.get( "class" ) }
+    code = io.StringIO()
+    uic.compileUi( uiPath, code )
+    modulePath = generatedUiPath( uiFilename )
+    writeModule( modulePath, header, code.getvalue() )
+    _LOGGER.debug( "compiled %s to %s", uiPath, modulePath )
+    return modulePath
+
+
+def loadUiModule(uiFilename):
+    """
+    Load classes from generated UI module.
+
+    Returns pair ( form class, base class ) (the same as 'uic.loadUiType()')
+    or None if module is missing or stale.
+    """
+    modulePath = generatedUiPath( uiFilename )
+    header = readHeader( modulePath )
+    if not header:
+        return None
+    uiPath = os.path.join( UI_DIR, uiFilename )
+    if header.get( "source hash" ) != sourceHash( [ uiPath ] ):
+        _LOGGER.debug( "generated module %s is stale", modulePath )
+        return None
+    from PyQt5 import QtWidgets
+
+    module = importModule( modulePath )
+    formClass = getattr( module, header[ "form class" ] )
+    baseClass = getattr( QtWidgets, header[ "base class" ] )
+    return ( formClass, baseClass )
+
+
+## =====================================================
+
+
+def imagePaths():
+    return sorted( os.path.join( IMAGES_DIR, item ) for item in os.listdir( IMAGES_DIR ) if item.endswith( ".png" ) )
+
+
+def generatedResourcesPath():
+    return os.path.join( GENERATED_DIR, RESOURCES_MODULE + ".py" )
+
+
+def compileResources():
+    """Generate rcc module of images. Raises OSError if module cannot be written."""
+    import tempfile
+    from PyQt5 import pyrcc_main
+
+    images = imagePaths()
+    with tempfile.TemporaryDirectory() as tmpDir:
+        ## rcc resolves files relatively to directory of qrc file
+        fileEntries = [ '    <file alias="%s">%s</file>\n' % ( os.path.basename( path ), os.path.relpath( path, tmpDir ) )
+                        for path in images ]
+        qrcContent = '<RCC>\n  <qresource prefix="%s">\n%s  </qresource>\n</RCC>\n'
+        qrcContent = qrcContent % ( RESOURCES_PREFIX, "".join( fileEntries ) )
+        qrcPath = os.path.join( tmpDir, "resources.qrc" )
+        outPath = os.path.join( tmpDir, RESOURCES_MODULE + ".py" )
+        with open( qrcPath, "w", encoding="utf-8" ) as qrcFile:
+            qrcFile.write( qrcContent )
+        if pyrcc_main.processResourceFile( [ qrcPath ], outPath, False ) is False:
+            raise OSError( "unable to compile resources" )
+        with open( outPath, "r", encoding="utf-8" ) as outFile:
+            code = outFile.read()
+    modulePath = generatedResourcesPath()
+    writeModule( modulePath, { "source hash": sourceHash( images ) }, code )
+    _LOGGER.debug( "compiled resources to %s", modulePath )
+    return modulePath
+
+
+def loadResources():
+    """Register images in Qt resource system. Returns False if module is missing or stale."""
+    modulePath = generatedResourcesPath()
+    header = readHeader( modulePath )
+    if not header:
+        return False
+    if header.get( "source hash" ) != sourceHash( imagePaths() ):
+        _LOGGER.debug( "generated module %s is stale", modulePath )
+        return False
+    importModule( modulePath )
+    return True
+
+
+def compileAll():
+    for uiFilename in sorted( os.listdir( UI_DIR ) ):
+        if uiFilename.endswith( ".ui" ):
+            compileUi( uiFilename )
+    compileResources()
+
+
+if __name__ == '__main__':
+    logging.basicConfig( stream=sys.stdout, level=logging.INFO )
+    _LOGGER.setLevel( logging.DEBUG )
+    compileAll()
@@ -18,18 +18,15 @@
 
 
 import os
-
 import logging
 
+import clevokeyboardcontrol.defs as defs
 
-try:
-    from PyQt5 import uic
-except ImportError:
-    ### No module named <name>
-    logging.exception("Exception while importing")
-    exit(1)
+from . import uicompiler
+from .. import startuptrace
 
-import clevokeyboardcontrol.defs as defs
+
+_LOGGER = logging.getLogger(__name__)
 
 
 def generateUIFileNameFromClassName(classFileName):
@@ -39,7 +36,33 @@ def generateUIFileNameFromClassName(classFileName):
 
 
 def loadUi(uiFilename):
+    """
+    Return pair ( form class, base class ) of UI file.
+
+    Precompiled module is used if it's up to date. Otherwise module is
+    generated (first run) or, if it's not possible, UI file is loaded
+    in runtime.
+    """
+    with startuptrace.span( "load UI: " + uiFilename ):
+        return _loadUi( uiFilename )
+
+
+def _loadUi(uiFilename):
     try:
+        loaded = uicompiler.loadUiModule( uiFilename )
+        if loaded is None and uicompiler.canGenerate():
+            uicompiler.compileUi( uiFilename )
+            loaded = uicompiler.loadUiModule( uiFilename )
+        if loaded is not None:
+            return loaded
+    except Exception:
+        _LOGGER.exception( "unable to use precompiled UI file: %s", uiFilename )
+    return loadUiRuntime( uiFilename )
+
+
+def loadUiRuntime(uiFilename):
+    try:
+        from PyQt5 import uic
         return uic.loadUiType( os.path.join( defs.ROOT_DIR, "ui", uiFilename ) )
     except Exception as e:
         print("Exception while loading UI file:", uiFilename, e)
@@ -49,4 +72,3 @@ def loadUi(uiFilename):
 def loadUiFromClassName(uiFilename):
     ui_file = generateUIFileNameFromClassName(uiFilename)
     return loadUi( ui_file )
-
@@ -18,19 +18,60 @@
 
 
 import os
+import re
 import sys
+import time
+import gzip
+import shutil
+import enum
+import queue
+import atexit
 import logging
+import threading
+import datetime
 import logging.handlers as handlers
 
 
-script_dir = os.path.dirname(__file__)
 log_file = None
 
+## maximum number of records waiting for logging thread
+QUEUE_SIZE = 10000
+
+## time of waiting for free space in queue for records of level WARNING and above
+BLOCK_TIMEOUT = 0.5
+
+## running listener of asynchronous logging
+log_listener = None
+
+## rate limiting filter of configured handlers
+rate_filter = None
+
+## size of single log file before rotation
+SEGMENT_SIZE = 1048576
+
+## budget of all rotated (compressed) log files
+TOTAL_SIZE = 10 * 1048576
+
+## default rate limits of repetitive loggers: logger name -> ( interval in seconds, records per call site )
+RATE_LIMITS = { "clevokeyboardcontrol.screensaverwatcher": ( 60.0, 10 ),
+                "clevokeyboardcontrol.sysfswatchdog":      ( 60.0, 10 ),
+                "clevokeyboardcontrol.sysfspolling":       ( 60.0, 10 ) }
+
+
+def getLoggingDirectory():
+    """Return directory of logs (XDG state directory)."""
+    stateDir = os.environ.get( "XDG_STATE_HOME" )
+    if not stateDir:
+        stateDir = os.path.join( os.path.expanduser( "~" ), ".local", "state" )
+    return os.path.join( stateDir, "ClevoKeyboardControl", "log" )
+
 
 def getLoggingOutputFile():
-    logDir = os.path.join(script_dir, "../../tmp/log")
-    logDir = os.path.abspath( logDir )
-    os.makedirs( logDir, exist_ok=True )
+    logDir = getLoggingDirectory()
+    try:
+        os.makedirs( logDir, exist_ok=True )
+    except OSError:
+        pass
     if os.path.isdir( logDir ) is False:
         ## something bad happened (or unable to create directory)
         logDir = os.getcwd()
@@ -39,8 +80,36 @@ def getLoggingOutputFile():
     return logFile
 
 
-def configure( logFile=None, logLevel=None ):
-    global log_file
+def listLogSegments(logFile, suffix=r"(\.gz)?"):
+    """
+    Return paths of rotated segments of log file ordered from the oldest.
+
+    'suffix' is regular expression matching extension following segment's timestamp.
+    """
+    logDir = os.path.dirname( os.path.abspath( logFile ) )
+    pattern = re.compile( re.escape( os.path.basename( logFile ) ) + r"\.\d{8}-\d{6}-\d{6}" + suffix + "$" )
+    try:
+        names = os.listdir( logDir )
+    except OSError:
+        return []
+    return [ os.path.join( logDir, name ) for name in sorted( names ) if pattern.match( name ) ]
+
+
+def listLogTemporaries(logFile):
+    """Return paths of not finished archives of log file's segments."""
+    return listLogSegments( logFile, r"\.gz\.tmp" )
+
+
+def configure( logFile=None, logLevel=None, asynchronous=True, rateLimits=None ):
+    """
+    Configure root logger.
+
+    In asynchronous mode records are only put to queue by calling thread.
+    Formatting, writing and rotation of files is done by logging thread.
+
+    'rateLimits' overrides RATE_LIMITS (see RateLimitFilter).
+    """
+    global log_file, rate_filter
 
     log_file = logFile
     if log_file is None:
@@ -49,8 +118,8 @@ def configure( logFile=None, logLevel=None ):
     if logLevel is None:
         logLevel = logging.DEBUG
 
-    ## rotation of log files, 1048576 equals to 1MB
-    fileHandler    = handlers.RotatingFileHandler( filename=log_file, mode="a+", maxBytes=1048576, backupCount=100 )
+    ## rotated segments are compressed and removed when exceeding size budget
+    fileHandler    = CompressingRotatingFileHandler( log_file, maxBytes=SEGMENT_SIZE, totalBytes=TOTAL_SIZE )
     ## fileHandler    = logging.FileHandler( filename=log_file, mode="a+" )
     consoleHandler = logging.StreamHandler( stream=sys.stdout )
 
@@ -59,8 +128,20 @@ def configure( logFile=None, logLevel=None ):
     fileHandler.setFormatter( formatter )
     consoleHandler.setFormatter( formatter )
 
-    logging.root.addHandler( consoleHandler )
-    logging.root.addHandler( fileHandler )
+    if rateLimits is None:
+        rateLimits = RATE_LIMITS
+    rateFilter = RateLimitFilter( rateLimits )
+    rate_filter = rateFilter
+
+    if asynchronous:
+        startListener( [ consoleHandler, fileHandler ] )
+        ## repeated records are dropped before entering queue
+        log_listener.setRateFilter( rateFilter )
+    else:
+        consoleHandler.addFilter( rateFilter )
+        fileHandler.addFilter( rateFilter )
+        logging.root.addHandler( consoleHandler )
+        logging.root.addHandler( fileHandler )
     logging.root.setLevel( logLevel )
 
 ##     loggerFormat   = '%(asctime)s,%(msecs)-3d %(levelname)-8s %(threadName)s [%(filename)s:%(lineno)d] %(message)s'
@@ -72,6 +153,38 @@ def configure( logFile=None, logLevel=None ):
 ##                        )
 
 
+def startListener( targetHandlers, queueSize=QUEUE_SIZE ):
+    """Start logging thread passing records from root logger to given handlers."""
+    global log_listener
+    if log_listener is None:
+        atexit.register( shutdown )
+    else:
+        shutdown()
+    log_listener = LogListener( queue.Queue( maxsize=queueSize ), *targetHandlers )
+    log_listener.start()
+    logging.root.addHandler( log_listener.queueHandler )
+
+
+def shutdown():
+    """
+    Flush queued records and stop logging thread.
+
+    Target handlers are attached directly to root logger, so records logged
+    later (e.g. during interpreter exit) are still written. Pending counters
+    of rate limited records are reported.
+    """
+    global log_listener
+    if log_listener is not None:
+        logging.root.removeHandler( log_listener.queueHandler )
+        log_listener.stop()
+        for handler in log_listener.handlers:
+            logging.root.addHandler( handler )
+        log_listener = None
+    if rate_filter is not None:
+        for record in rate_filter.flush( force=True ):
+            logging.root.handle( record )
+
+
 def createStdOutHandler():
     formatter = createFormatter()
     consoleHandler = logging.StreamHandler( stream=sys.stdout )
@@ -101,3 +214,363 @@ class EmptyLineFormatter(logging.Formatter):
             # empty
             return msg
         return super().format( record )
+
+
+class CompressingRotatingFileHandler( handlers.RotatingFileHandler ):
+    """
+    Rotating file handler compressing rotated segments.
+
+    Rotated file is renamed to '<file>.<timestamp>' and compressed with gzip
+    by background thread, so rotation does not stall logging. The thread is
+    started on first rotation. Instead of number of backups total size of
+    segments is limited -- the oldest ones are removed when budget is exceeded.
+    """
+
+    def __init__(self, filename, maxBytes=SEGMENT_SIZE, totalBytes=TOTAL_SIZE, encoding="utf-8"):
+        super().__init__( filename, mode="a", maxBytes=maxBytes, backupCount=0, encoding=encoding )
+        self.totalBytes = totalBytes
+        self.jobs = queue.Queue()
+        self.compressThread = None
+        ## files left by killed process: partial archives and uncompressed segments
+        for tmpFile in listLogTemporaries( self.baseFilename ):
+            try:
+                os.remove( tmpFile )
+            except OSError:
+                pass
+        leftovers = [ segment for segment in listLogSegments( self.baseFilename ) if segment.endswith( ".gz" ) is False ]
+        for segment in leftovers:
+            self._submit( segment )
+        if not leftovers:
+            try:
+                self._removeOldSegments()
+            except OSError as exc:
+                sys.stderr.write( "unable to remove old log files: %s\n" % exc )
+
+    ## override base class method
+    def doRollover(self):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+        segment = "%s.%s" % ( self.baseFilename, datetime.datetime.now().strftime( "%Y%m%d-%H%M%S-%f" ) )
+        try:
+            os.replace( self.baseFilename, segment )
+            self._submit( segment )
+        except OSError:
+            ## file could be removed externally
+            pass
+        if not self.delay:
+            self.stream = self._open()
+
+    ## override base class method
+    def close(self):
+        """Close file and wait for pending compression."""
+        self.acquire()
+        try:
+            super().close()
+            thread = self.compressThread
+            self.compressThread = None
+        finally:
+            self.release()
+        if thread is not None:
+            self.jobs.put( False )
+            thread.join()
+
+    def _submit(self, segment):
+        """Queue compression of segment. None only enforces size budget."""
+        if self.compressThread is None:
+            self.compressThread = threading.Thread( target=self._compressLoop, name="LogCompressThread", daemon=True )
+            self.compressThread.start()
+        self.jobs.put( segment )
+
+    def _compressLoop(self):
+        while True:
+            segment = self.jobs.get()
+            if segment is False:
+                return
+            try:
+                if segment is not None:
+                    compressSegment( segment )
+                self._removeOldSegments()
+            except OSError as exc:
+                sys.stderr.write( "unable to compress log file %s: %s\n" % ( segment, exc ) )
+
+    def _removeOldSegments(self):
+        segments = listLogSegments( self.baseFilename )
+        sizes = [ os.path.getsize( segment ) for segment in segments ]
+        totalSize = sum( sizes )
+        for segment, size in zip( segments, sizes ):
+            if totalSize <= self.totalBytes:
+                break
+            os.remove( segment )
+            totalSize -= size
+
+
+def compressSegment(segment):
+    """Compress file with gzip and remove source file."""
+    target = segment + ".gz"
+    tmpTarget = target + ".tmp"
+    with open( segment, "rb" ) as source, gzip.open( tmpTarget, "wb" ) as output:
+        shutil.copyfileobj( source, output )
+    os.replace( tmpTarget, target )
+    os.remove( segment )
+    return target
+
+
+class RateLimitFilter( logging.Filter ):
+    """
+    Filter collapsing repeated records of the same call site.
+
+    Rules map logger name (including it's children) to pair ( interval, burst ):
+    at most 'burst' records of each call site (logger, file and line) pass
+    during 'interval' seconds. Number of suppressed records is appended to
+    first record passed in next interval or reported by 'flush()' if there
+    is no such record. Records above 'maxLevel' always pass.
+    """
+
+    def __init__(self, rules=None, maxLevel=logging.INFO, clock=time.monotonic):
+        super().__init__()
+        self.rules = dict()
+        if rules is not None:
+            self.rules.update( rules )
+        self.maxLevel = maxLevel
+        self.clock = clock
+        ## ( logger name, path, line ) -> [ interval start, passed records, suppressed records,
+        ##                                 last suppressed record, interval ]
+        self.sites = dict()
+        self.lock = threading.Lock()
+        self.suppressedCallback = None
+
+    def setSuppressedCallback(self, callback):
+        """Set function called when call site starts suppressing records (e.g. to schedule 'flush()')."""
+        self.suppressedCallback = callback
+
+    def setRule(self, loggerName, interval, burst):
+        with self.lock:
+            self.rules[ loggerName ] = ( interval, burst )
+
+    def removeRule(self, loggerName):
+        with self.lock:
+            self.rules.pop( loggerName, None )
+
+    def findRule(self, loggerName):
+        """Return rule of logger or it's closest configured ancestor."""
+        name = loggerName
+        while True:
+            rule = self.rules.get( name )
+            if rule is not None or not name:
+                return rule
+            name = name.rpartition( "." )[0]
+
+    ## override base class method
+    def filter(self, record):
+        if record.levelno > self.maxLevel:
+            return True
+        if getattr( record, "rateLimitSummary", False ):
+            ## already counted
+            return True
+        with self.lock:
+            rule = self.findRule( record.name )
+            if rule is None:
+                return True
+            interval, burst = rule
+            now = self.clock()
+            key = ( record.name, record.pathname, record.lineno )
+            site = self.sites.get( key )
+            suppressed = 0
+            firstSuppressed = None
+            if site is None or now - site[0] >= interval:
+                if site is not None:
+                    suppressed = site[2]
+                self.sites[ key ] = [ now, 1, 0, None, interval ]
+            elif site[1] < burst:
+                site[1] += 1
+            else:
+                site[2] += 1
+                site[3] = record
+                firstSuppressed = site[2] == 1
+        if firstSuppressed is not None:
+            callback = self.suppressedCallback
+            if firstSuppressed and callback is not None:
+                callback()
+            return False
+        if suppressed > 0:
+            ## appended text does not contain formatting characters, so arguments are still applied properly
+            record.msg = "%s [repeated %s times in last %ss]" % ( record.msg, suppressed, int( interval ) )
+        return True
+
+    def flushDelay(self):
+        """Return seconds to expiry of the first interval having suppressed records or None if there is none."""
+        with self.lock:
+            deadlines = [ site[0] + site[4] for site in self.sites.values() if site[2] > 0 ]
+        if not deadlines:
+            return None
+        return max( min( deadlines ) - self.clock(), 0.0 )
+
+    def flush(self, force=False):
+        """
+        Return records reporting suppressed records of call sites with expired interval.
+
+        If 'force' is True, then suppressed records of all call sites are reported.
+        """
+        now = self.clock()
+        pending = []
+        with self.lock:
+            for key, site in list( self.sites.items() ):
+                expired = now - site[0] >= site[4]
+                if expired:
+                    del self.sites[ key ]
+                if site[2] < 1 or ( expired is False and force is False ):
+                    continue
+                pending.append( ( site[3], site[2], site[4] ) )
+                site[2] = 0
+                site[3] = None
+        summaries = []
+        for record, suppressed, interval in pending:
+            summary = logging.makeLogRecord( record.__dict__ )
+            summary.msg = "%s [repeated %s times in last %ss]" % ( record.getMessage(), suppressed, int( interval ) )
+            summary.args = None
+            summary.rateLimitSummary = True
+            summaries.append( summary )
+        return summaries
+
+
+class BoundedQueueHandler( handlers.QueueHandler ):
+    """
+    Handler passing records to bounded queue without blocking caller.
+
+    When queue is full records below WARNING are dropped and more important
+    records wait for free space up to 'blockTimeout'. Number of dropped
+    records is reported by warning put to queue when space is available.
+    """
+
+    def __init__(self, recordQueue, blockTimeout=BLOCK_TIMEOUT):
+        super().__init__( recordQueue )
+        self.blockTimeout = blockTimeout
+        self.dropped = 0
+        self.droppedLock = threading.Lock()
+
+    ## override base class method
+    def prepare(self, record):
+        ## record is formatted by logging thread -- only mutable arguments have to be rendered now
+        if record.args and isImmutable( record.args ) is False:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    ## override base class method
+    def enqueue(self, record):
+        try:
+            if record.levelno >= logging.WARNING:
+                self.queue.put( record, timeout=self.blockTimeout )
+            else:
+                self.queue.put_nowait( record )
+        except queue.Full:
+            with self.droppedLock:
+                self.dropped += 1
+            return
+        if self.dropped > 0:
+            self._reportDropped()
+
+    def _reportDropped(self):
+        with self.droppedLock:
+            counter = self.dropped
+            self.dropped = 0
+        if counter < 1:
+            return
+        record = logging.LogRecord( __name__, logging.WARNING, __file__, 0,
+                                    "logging queue overflow: %s records dropped", ( counter, ), None )
+        try:
+            self.queue.put_nowait( record )
+        except queue.Full:
+            with self.droppedLock:
+                self.dropped += counter
+
+
+class LogListener( handlers.QueueListener ):
+    """
+    Logging thread writing records from queue to target handlers.
+
+    Records suppressed by rate filter are reported by logging thread when
+    their interval expires and when listener is stopped. Thread waits with
+    timeout only while there are suppressed records to report.
+    """
+
+    def __init__(self, recordQueue, *targetHandlers):
+        super().__init__( recordQueue, *targetHandlers, respect_handler_level=True )
+        self.queueHandler = BoundedQueueHandler( recordQueue )
+        self.rateFilter = None
+        ## put to queue to recalculate waiting timeout
+        self._wakeToken = object()
+
+    def setRateFilter(self, rateFilter):
+        """Set RateLimitFilter dropping records before entering queue."""
+        if self.rateFilter is not None:
+            self.queueHandler.removeFilter( self.rateFilter )
+            self.rateFilter.setSuppressedCallback( None )
+        self.rateFilter = rateFilter
+        if rateFilter is not None:
+            rateFilter.setSuppressedCallback( self._wake )
+            self.queueHandler.addFilter( rateFilter )
+
+    ## override base class method
+    def start(self):
+        self._thread = threading.Thread( target=self._monitor, name="LoggingThread", daemon=True )
+        self._thread.start()
+
+    ## override base class method
+    def stop(self):
+        super().stop()
+        self._flushRateFilter( True )
+
+    ## override base class method
+    def dequeue(self, block):
+        if block is False:
+            return self.queue.get_nowait()
+        while True:
+            rateFilter = self.rateFilter
+            timeout = None
+            if rateFilter is not None:
+                timeout = rateFilter.flushDelay()
+            try:
+                record = self.queue.get( timeout=timeout )
+            except queue.Empty:
+                self._flushRateFilter( False )
+                continue
+            if record is not self._wakeToken:
+                return record
+            self.queue.task_done()
+
+    def _wake(self):
+        try:
+            self.queue.put_nowait( self._wakeToken )
+        except queue.Full:
+            ## thread is woken up by queued records
+            pass
+
+    def _flushRateFilter(self, force):
+        rateFilter = self.rateFilter
+        if rateFilter is None:
+            return
+        for record in rateFilter.flush( force ):
+            self.handle( record )
+
+    ## override base class method
+    def enqueue_sentinel(self):
+        ## queue can be full -- wait until logging thread makes space
+        self.queue.put( self._sentinel )
+
+
+## types of arguments that can be formatted later by logging thread
+IMMUTABLE_TYPES = ( str, int, float, bool, bytes, type(None), enum.Enum )
+
+
+def isImmutable(args):
+    if isinstance( args, dict ):
+        args = args.values()
+    for item in args:
+        if isinstance( item, ( tuple, frozenset ) ):
+            if isImmutable( item ) is False:
+                return False
+        elif isinstance( item, IMMUTABLE_TYPES ) is False:
+            return False
+    return True
@@ -28,62 +28,100 @@ import os
 script_dir = os.path.dirname(__file__)
 sys.path.append(os.path.abspath( os.path.join(script_dir, "..") ))
 
-import time
-import argparse
-import logging
-import cProfile
+import clevokeyboardcontrol.startuptrace as startuptrace
 
-import clevokeyboardcontrol.logger as logger
+startuptrace.start()
 
-from clevokeyboardcontrol.clevoio import TuxedoDriver
+with startuptrace.span( "imports" ):
+    import time
+    import argparse
+    import logging
+    import cProfile
 
-from clevokeyboardcontrol.gui.main_window import MainWindow
-from clevokeyboardcontrol.gui.qt import QApplication
-from clevokeyboardcontrol.gui.sigint import setup_interrupt_handling
+    import clevokeyboardcontrol.logger as logger
+
+    from clevokeyboardcontrol.clevoio import TuxedoDriver
+    from clevokeyboardcontrol.sysfswatchdog import WatchService
+
+    from clevokeyboardcontrol.gui.main_window import MainWindow
+    from clevokeyboardcontrol.gui.qt import QApplication, QtCore
+    from clevokeyboardcontrol.gui.sigint import setup_interrupt_handling
 
 
-logger.configure()
 _LOGGER = logging.getLogger(__name__)
 
 
 def runApp(args):
 
     ## GUI
-    app = QApplication(sys.argv)
-    app.setApplicationName("ClevoKeyboardControl")
-    app.setOrganizationName("arnet")
-    ### app.setOrganizationDomain("www.my-org.com")
+    with startuptrace.span( "QApplication" ):
+        app = QApplication(sys.argv)
+        app.setApplicationName("ClevoKeyboardControl")
+        app.setOrganizationName("arnet")
+        ### app.setOrganizationDomain("www.my-org.com")
 
-    driver = TuxedoDriver()
+    driver = TuxedoDriver( cachedIO=True )
 
-    window = MainWindow( driver )
+    with startuptrace.span( "MainWindow.__init__" ):
+        window = MainWindow( driver )
 
-    window.loadSettings()
+    with startuptrace.span( "loadSettings" ):
+        window.loadSettings()
 
     if args.minimized is False:
-        window.show()
+        with startuptrace.span( "show window" ):
+            window.show()
 
     setup_interrupt_handling()
 
+    ## called when event loop processed pending events (tray icon is shown)
+    QtCore.QTimer.singleShot( 0, lambda: finishStartupTrace( args.trace_startup ) )
+
     exitCode = app.exec_()
 
     if exitCode == 0:
-        window.saveSettings()
+        window.flushSettings()
+
+    WatchService.shutdownInstance( timeout=5.0 )
 
     return exitCode
 
 
+def finishStartupTrace(traceFile=None):
+    tracer = startuptrace.StartupTracer.instance()
+    tracer.mark( "tray icon shown" )
+    ## asynchronous phases (e.g. driver restore) can still be running
+    tracer.whenSettled( lambda: writeStartupTrace( traceFile ) )
+
+
+def writeStartupTrace(traceFile=None):
+    tracer = startuptrace.StartupTracer.instance()
+    tracer.finish()
+    tracer.logSummary( _LOGGER )
+    if traceFile is None:
+        return
+    try:
+        tracer.writeChromeTrace( traceFile )
+    except OSError:
+        _LOGGER.exception( "unable to write startup trace" )
+
+
 def main():
     parser = argparse.ArgumentParser(description='Clevo Keyboard Control')
     parser.add_argument('--minimized', action='store_const', const=True, default=False, help='Start minimized' )
     parser.add_argument('--profile', action='store_const', const=True, default=False, help='Profile the code' )
     parser.add_argument('--pfile', action='store', default=None, help='Profile the code and output data to file' )
+    parser.add_argument('--trace-startup', action='store', default=None, metavar='FILE',
+                        help='Write timing of startup phases to file in Chrome trace format' )
 
     args = parser.parse_args()
 
+    with startuptrace.span( "logger.configure" ):
+        logger.configure()
+
     _LOGGER.debug("\n\n")
     _LOGGER.debug("Starting the application")
-    _LOGGER.debug("Logger log file: %s" % logger.log_file)
+    _LOGGER.debug("Logger log file: %s", logger.log_file)
 
     starttime = time.time()
     profiler = None
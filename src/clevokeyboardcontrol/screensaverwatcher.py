@@ -19,7 +19,10 @@
 import logging
 from logging import Logger
 import os
+import select
+import threading
 
+from . import dbusclient
 from .sysfswatchdog import SysFSWatcher
 
 
@@ -45,7 +48,10 @@ class DeviceWatcher():
 
     logger: Logger = None
 
-    def __init__(self, driver_path, index):
+    ## seconds of merging power changes (e.g. screen blinking while locking)
+    COALESCE_WINDOW = 0.2
+
+    def __init__(self, driver_path, index, coalesceWindow=None):
         self.watcherIndex = index
         self.stateCallback = None
         self.driverPath = driver_path
@@ -59,33 +65,47 @@ class DeviceWatcher():
 #         self.brightnessWatcher.setCallback( self._sysfsBrightnessChanged )
 #         self.brightnessWatcher.watch( self.brightnessFile, False )
 
-        self.watcher = SysFSWatcher("SSaverThread")
+        self.watcher = SysFSWatcher()
         self.watcher.setCallback( self._sysfsPowerChanged )
-        self.watcher.watch( self.driverPath, False )
+        if coalesceWindow is None:
+            coalesceWindow = self.COALESCE_WINDOW
+        self.watcher.setCoalescing( coalesceWindow )
+        ## only power state is used
+        self.watcher.watch( self.driverPath, False, files=[ self.powerFile ] )
 
     def setCallback(self, callback):
         self.stateCallback = callback
 
+    def stop(self):
+        self.watcher.stop()
+
 #     def _sysfsBrightnessChanged(self):
 #         newValue = self._readActualBrightness()
 #         if newValue == self.actualBrightness:
 #             return
 #         self.actualBrightness = newValue
 #         if self.stateCallback is None:
-#             self.logger.debug( "brightness file changed to: %s" % newValue )
+#             self.logger.debug( "brightness file changed to: %s", newValue )
 #             return
 #         self.stateCallback( self.watcherIndex )
 
-    def _sysfsPowerChanged(self):
-        newValue = self._readPower()
+    def _sysfsPowerChanged(self, changes):
+        if self.powerFile not in changes:
+            ## other file changed
+            return
+        content = changes[ self.powerFile ]
+        if content is None:
+            newValue = self._readPower()
+        else:
+            newValue = self._parsePower( content )
         if newValue == self.blPower:
             self.logger.debug( "power file not changed" )
             return
         self.blPower = newValue
         if self.stateCallback is None:
-            self.logger.debug( "power file changed to: %s" % newValue )
+            self.logger.debug( "power file changed to: %s", newValue )
             return
-        self.logger.debug( "power file changed to: %s" % newValue )
+        self.logger.debug( "power file changed to: %s", newValue )
         self.stateCallback( self.watcherIndex )
 
 #     def _readActualBrightness(self):
@@ -97,9 +117,13 @@ class DeviceWatcher():
 
         Returns True if backlight is powered, otherwise False.
         """
+        return self._parsePower( readFile(self.powerFile) )
+
+    @staticmethod
+    def _parsePower(value):
         ## 0 -- power on
         ## 4 -- power off
-        currVal = int( readFile(self.powerFile) )
+        currVal = int( value )
         if currVal == 0:
             return True
         return False
@@ -108,9 +132,242 @@ class DeviceWatcher():
 DeviceWatcher.logger = _LOGGER.getChild(DeviceWatcher.__name__)
 
 
+class SessionLockWatcher( threading.Thread ):
+    """
+    Listener of screen saver and session lock signals on D-Bus.
+
+    Receives 'ActiveChanged' of screen saver services on session bus and
+    logind's 'Lock'/'Unlock' of current session on system bus. Thread
+    sleeps in 'poll()' on buses' sockets, so it does not use CPU while
+    idle and does not depend on Qt event loop.
+
+    Callback receives True when screen saver is activated or session is
+    locked, and False when both are inactive.
+
+    Buses are reachable even if no screen saver service is running, so
+    names registered on session bus are checked ('findScreenSaverService()').
+    """
+
+    SCREENSAVER_INTERFACES = [ "org.freedesktop.ScreenSaver", "org.xfce.ScreenSaver",
+                               "org.gnome.ScreenSaver", "org.mate.ScreenSaver",
+                               "org.cinnamon.ScreenSaver" ]
+
+    LOGIN_SESSION_INTERFACE = "org.freedesktop.login1.Session"
+    LOGIN_SESSION_PATH = "/org/freedesktop/login1/session/"
+
+    def __init__(self, sessionAddress=None, systemAddress=None, sessionPath=None):
+        super().__init__( name="SessionLockThread", daemon=True )
+        self.sessionAddress = sessionAddress
+        if self.sessionAddress is None:
+            self.sessionAddress = dbusclient.sessionBusAddress()
+        self.systemAddress = systemAddress
+        if self.systemAddress is None:
+            self.systemAddress = dbusclient.systemBusAddress()
+        self.sessionPath = sessionPath
+        if self.sessionPath is None:
+            self.sessionPath = self.currentSessionPath()
+        self.callback = None
+        self.screenSaverActive = False
+        self.sessionLocked = False
+        self.connections = []
+        self.ready = threading.Event()              ## set when all subscriptions are confirmed by buses
+        self._pendingMatches = set()               ## ( id of connection, serial of AddMatch call )
+        self.servicesChecked = threading.Event()    ## set when names registered on session bus are received
+        self.screenSaverService = None              ## name of found screen saver service
+        self._pendingNames = set()                  ## ( id of connection, serial of List*Names call )
+        self._stopped = False
+        self._wakeRead, self._wakeWrite = os.pipe()
+
+    @classmethod
+    def currentSessionPath(cls):
+        """Return logind's object path of current session or None if not known."""
+        sessionId = os.environ.get( "XDG_SESSION_ID" )
+        if not sessionId:
+            return None
+        return cls.LOGIN_SESSION_PATH + dbusclient.encodePathElement( sessionId )
+
+    def setCallback(self, callback):
+        self.callback = callback
+
+    def isActive(self):
+        return self.screenSaverActive or self.sessionLocked
+
+    def findScreenSaverService(self, timeout=None):
+        """Return name of screen saver service registered on session bus or None if there is no such service."""
+        self.servicesChecked.wait( timeout )
+        return self.screenSaverService
+
+    def connect(self):
+        """Connect to buses and subscribe signals. Returns True if at least one bus is connected."""
+        sessionBus = self._connectBus( self.sessionAddress )
+        if sessionBus is not None:
+            for interface in self.SCREENSAVER_INTERFACES:
+                rule = "type='signal',interface='%s',member='ActiveChanged'" % interface
+                self._pendingMatches.add( ( id( sessionBus ), sessionBus.addMatch( rule ) ) )
+            ## services are registered under names equal to interfaces
+            for member in [ "ListNames", "ListActivatableNames" ]:
+                serial = sessionBus.callMethod( dbusclient.BUS_NAME, dbusclient.BUS_PATH, dbusclient.BUS_INTERFACE, member )
+                self._pendingNames.add( ( id( sessionBus ), serial ) )
+        else:
+            self.servicesChecked.set()
+
+        if self.systemAddress != self.sessionAddress or sessionBus is None:
+            systemBus = self._connectBus( self.systemAddress )
+        else:
+            systemBus = sessionBus
+        if systemBus is not None:
+            for member in [ "Lock", "Unlock" ]:
+                rule = "type='signal',interface='%s',member='%s'" % ( self.LOGIN_SESSION_INTERFACE, member )
+                if self.sessionPath is not None:
+                    rule += ",path='%s'" % self.sessionPath
+                self._pendingMatches.add( ( id( systemBus ), systemBus.addMatch( rule ) ) )
+        if not self._pendingMatches:
+            self.ready.set()
+        return len( self.connections ) > 0
+
+    def stop(self):
+        if self._stopped:
+            return
+        self._stopped = True
+        if self.ident is None:
+            ## thread not started
+            self._close()
+            return
+        wakeFd = self._wakeWrite
+        if wakeFd is None:
+            ## thread already finished
+            return
+        try:
+            os.write( wakeFd, b"\0" )
+        except OSError:
+            pass
+
+    def run(self):
+        poller = select.poll()
+        poller.register( self._wakeRead, select.POLLIN )
+        for connection in self.connections:
+            poller.register( connection.fileno(), select.POLLIN )
+        try:
+            while self._stopped is False and self.connections:
+                for fd, _ in poller.poll():
+                    if fd == self._wakeRead:
+                        continue
+                    connection = self._findConnection( fd )
+                    if connection is None:
+                        continue
+                    try:
+                        messages = connection.readMessages()
+                    except ( OSError, EOFError, dbusclient.DBusError ) as exc:
+                        self.logger.warning( "lost connection to bus %s: %s", connection.address, exc )
+                        poller.unregister( fd )
+                        self.connections.remove( connection )
+                        connection.close()
+                        self._pendingNames = { key for key in self._pendingNames if key[0] != id( connection ) }
+                        if not self._pendingNames:
+                            self.servicesChecked.set()
+                        continue
+                    for message in messages:
+                        self._handleMessage( connection, message )
+        finally:
+            self._close()
+
+    ## =====================================================
+
+    def _connectBus(self, address):
+        if address is None:
+            return None
+        connection = dbusclient.DBusConnection( address )
+        try:
+            connection.connect()
+        except ( OSError, dbusclient.DBusError ) as exc:
+            self.logger.info( "unable to connect to bus %s: %s", address, exc )
+            return None
+        self.connections.append( connection )
+        return connection
+
+    def _findConnection(self, fd):
+        for connection in self.connections:
+            if connection.fileno() == fd:
+                return connection
+        return None
+
+    def _handleMessage(self, connection, message):
+        if message.messageType in ( dbusclient.METHOD_RETURN, dbusclient.ERROR ):
+            key = ( id( connection ), message.replySerial )
+            if key in self._pendingNames:
+                self._handleNames( message )
+                self._pendingNames.discard( key )
+                if not self._pendingNames:
+                    self.servicesChecked.set()
+                return
+            if key in self._pendingMatches:
+                if message.messageType == dbusclient.ERROR:
+                    self.logger.warning( "unable to subscribe signal: %s %s", message.errorName, message.body )
+                self._pendingMatches.discard( key )
+                if not self._pendingMatches:
+                    self.ready.set()
+            return
+        if message.messageType != dbusclient.SIGNAL:
+            return
+        if message.member == "ActiveChanged" and message.interface in self.SCREENSAVER_INTERFACES:
+            if message.body:
+                self.logger.debug( "screen saver %s active: %s", message.interface, message.body[0] )
+                self._setState( bool( message.body[0] ), self.sessionLocked )
+            return
+        if message.interface == self.LOGIN_SESSION_INTERFACE:
+            if message.member == "Lock":
+                self.logger.debug( "session locked" )
+                self._setState( self.screenSaverActive, True )
+            elif message.member == "Unlock":
+                self.logger.debug( "session unlocked" )
+                self._setState( self.screenSaverActive, False )
+
+    def _handleNames(self, message):
+        if message.messageType != dbusclient.METHOD_RETURN or not message.body:
+            return
+        names = message.body[0]
+        for interface in self.SCREENSAVER_INTERFACES:
+            if interface in names:
+                self.logger.debug( "found screen saver service: %s", interface )
+                self.screenSaverService = interface
+                return
+
+    def _setState(self, screenSaverActive, sessionLocked):
+        prevActive = self.isActive()
+        self.screenSaverActive = screenSaverActive
+        self.sessionLocked = sessionLocked
+        currActive = self.isActive()
+        if currActive == prevActive:
+            return
+        if self.callback is not None:
+            self.callback( currActive )
+
+    def _close(self):
+        for connection in self.connections:
+            connection.close()
+        self.connections = []
+        wakeFds = [ self._wakeRead, self._wakeWrite ]
+        self._wakeRead = None
+        self._wakeWrite = None
+        for fd in wakeFds:
+            if fd is not None:
+                os.close( fd )
+        ## nothing more will be received
+        self.servicesChecked.set()
+
+
+SessionLockWatcher.logger = _LOGGER.getChild(SessionLockWatcher.__name__)
+
+
 class ScreenSaverWatcher():
     """
-    Watch for changes in backlight driver.
+    Watch for screen saver activation.
+
+    Screen saver and session lock are received from D-Bus (SessionLockWatcher).
+    If none of buses is available or there is no screen saver service (so
+    screen can be turned off without any signal), then changes of backlight
+    driver's power are watched as well. LEDs are on only if session is not
+    locked and any backlight is powered.
 
     Note: Xfce blocks Qt event loop when session is locked, so it cannot be
     wrapped around QtObject if backlight needs to be monitored even when user's
@@ -119,17 +376,44 @@ class ScreenSaverWatcher():
 
     logger: Logger = None
 
-    def __init__(self):
+    BACKLIGHT_DIR = "/sys/class/backlight/"
+
+    ## seconds of waiting for list of services registered on session bus
+    SERVICES_TIMEOUT = 1.0
+
+    def __init__(self, useDBus=True, sessionAddress=None, systemAddress=None, backlightDir=None):
         self.watchers = []
+        self.sessionWatcher = None
+        self.sessionActive = False
         self.isLEDOn = True
         self.callbackEnabled = None
         self.stateCallback = None
-
-        backlight_dir = "/sys/class/backlight/"
-        for f in os.listdir(backlight_dir):
-            item_path = os.path.join(backlight_dir, f)
+        self.stateLock = threading.Lock()
+
+        if useDBus:
+            sessionWatcher = SessionLockWatcher( sessionAddress, systemAddress )
+            if sessionWatcher.connect():
+                self.logger.debug( "watching screen saver on D-Bus" )
+                sessionWatcher.setCallback( self._sessionLockChanged )
+                sessionWatcher.start()
+                self.sessionWatcher = sessionWatcher
+                if sessionWatcher.findScreenSaverService( self.SERVICES_TIMEOUT ) is not None:
+                    return
+                self.logger.info( "screen saver service not found on D-Bus, watching backlight" )
+            else:
+                sessionWatcher.stop()
+
+        ## fallback
+        if backlightDir is None:
+            backlightDir = self.BACKLIGHT_DIR
+        if self.sessionWatcher is not None and os.path.isdir( backlightDir ) is False:
+            ## session lock is still detected
+            self.logger.info( "backlight directory not found: %s", backlightDir )
+            return
+        for f in sorted( os.listdir(backlightDir) ):
+            item_path = os.path.join(backlightDir, f)
             if os.path.isdir(item_path):
-                self.logger.debug( "registering device watcher: {0}".format( item_path ) )
+                self.logger.debug( "registering device watcher: %s", item_path )
                 watcher = DeviceWatcher( item_path, len(self.watchers) )
                 watcher.setCallback( self._sysfsChanged )
                 self.watchers.append( watcher )
@@ -141,31 +425,39 @@ class ScreenSaverWatcher():
     def setCallback(self, callback):
         self.stateCallback = callback
 
+    def stop(self):
+        if self.sessionWatcher is not None:
+            self.sessionWatcher.stop()
+        for watcher in self.watchers:
+            watcher.stop()
+
+    def _sessionLockChanged(self, active):
+        ## called from D-Bus watcher's thread
+        self.logger.debug( "screen saver active: %s", active )
+        self.sessionActive = active
+        self._updateState()
+
     def _sysfsChanged( self, deviceIndex ):
+        ## called from sysfs watcher's thread
         deviceWatcher = self.watchers[ deviceIndex ]
-        newPower = deviceWatcher.blPower
-        if newPower:
-            if self.isLEDOn:
+        self.logger.debug( "device's power file changed to %s", deviceWatcher.blPower )
+        self._updateState()
+
+    def _updateState(self):
+        with self.stateLock:
+            newPowerState = self.sessionActive is False and self._isBacklightOn()
+            if newPowerState == self.isLEDOn:
                 ## screen power state not changed
-                self.logger.debug( "device's power file changed to %s" % newPower )
                 return
-        else:
-            if not self.isLEDOn:
-                ## screen power state not changed
-                self.logger.debug( "device's power file changed to %s" % newPower )
+            if self.stateCallback is None or self.callbackEnabled is False:
                 return
-        newPowerState = self._isBacklightOn()
-        if newPowerState == self.isLEDOn:
-            ## screen power state not changed
-            self.logger.debug( "device's power file changed to %s" % newPower )
-            return
-        if self.stateCallback is None or self.callbackEnabled is False:
-            self.logger.debug( "device's power file changed to %s" % newPower )
-            return
-        self.isLEDOn = newPowerState
-        self.stateCallback( not self.isLEDOn )
+            self.isLEDOn = newPowerState
+            self.stateCallback( not newPowerState )
 
     def _isBacklightOn(self):
+        if self.sessionWatcher is not None and not self.watchers:
+            ## backlight not watched
+            return True
         for w in self.watchers:
             if w.blPower:
                 return True
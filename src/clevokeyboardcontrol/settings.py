@@ -0,0 +1,240 @@
+#     ClevoKeyboardControl. Control of keyboard backlights.
+#
+#     Copyright (C) 2018  Arkadiusz Netczuk <dev.arnet@gmail.com>
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+Qt-free access to application's settings file.
+
+Reads and writes the same INI file as QSettings used by GUI
+(~/.config/arnet/ClevoKeyboardControl.ini).
+"""
+
+import logging
+import os
+import re
+import configparser
+
+from .clevoio import DriverState
+
+
+_LOGGER = logging.getLogger(__name__)
+
+
+ORGANIZATION_NAME = "arnet"
+APPLICATION_NAME  = "ClevoKeyboardControl"
+
+## QSettings stores keys without group in "General" section
+GENERAL_SECTION = "General"
+
+## group of driver's state stored by GUI
+DRIVER_STATE_GROUP = "DriverState"
+
+## group of named profiles: name -> hex of packed DriverState
+PROFILES_GROUP = "Profiles"
+
+## allowed characters of profile names (stored as keys without escaping)
+PROFILE_NAME_PATTERN = re.compile( r"^[\w\-]+$", re.ASCII )
+
+
+def settingsFilePath():
+    """Return path of settings file (the same as QSettings' IniFormat in UserScope)."""
+    configDir = os.environ.get( "XDG_CONFIG_HOME" )
+    if not configDir:
+        configDir = os.path.join( os.path.expanduser( "~" ), ".config" )
+    return os.path.join( configDir, ORGANIZATION_NAME, APPLICATION_NAME + ".ini" )
+
+
+class IniSettings():
+    """
+    Subset of QSettings interface working on INI file.
+
+    Supports groups (one level), 'value()' with type conversion and 'setValue()'.
+    Changes are written to file by 'sync()'.
+    """
+
+    def __init__(self, filePath=None):
+        self.filePath = filePath
+        if self.filePath is None:
+            self.filePath = settingsFilePath()
+        self.group = None
+        self.parser = self._createParser()
+        self.reload()
+
+    def fileName(self):
+        return self.filePath
+
+    def reload(self):
+        """Read content of file. Missing file is treated as empty settings."""
+        self.parser = self._createParser()
+        try:
+            self.parser.read( self.filePath, encoding="utf-8" )
+        except configparser.Error as exc:
+            _LOGGER.warning( "unable to read settings file %s: %s", self.filePath, exc )
+            self.parser = self._createParser()
+
+    def beginGroup(self, name):
+        self.group = name
+
+    def endGroup(self):
+        self.group = None
+
+    def childKeys(self):
+        """Return keys of current group."""
+        section = self.group if self.group else GENERAL_SECTION
+        if self.parser.has_section( section ) is False:
+            return []
+        return self.parser.options( section )
+
+    def allKeys(self):
+        ret = []
+        for section in self.parser.sections():
+            for key in self.parser.options( section ):
+                if section == GENERAL_SECTION:
+                    ret.append( key )
+                else:
+                    ret.append( section + "/" + key )
+        return ret
+
+    def value(self, key, defaultValue=None, type=None):        # pylint: disable=W0622
+        section, key = self._locate( key )
+        rawValue = self.parser.get( section, key, fallback=None )
+        if rawValue is None:
+            return defaultValue
+        rawValue = unquote( rawValue )
+        if type is None or type is str:
+            return rawValue
+        try:
+            if type is bool:
+                return rawValue.lower() in ( "true", "1" )
+            return type( rawValue )
+        except ValueError:
+            _LOGGER.warning( "invalid value of %s: %r", key, rawValue )
+            return defaultValue
+
+    def setValue(self, key, value):
+        section, key = self._locate( key )
+        if self.parser.has_section( section ) is False:
+            self.parser.add_section( section )
+        if isinstance( value, bool ):
+            value = "true" if value else "false"
+        self.parser.set( section, key, str( value ) )
+
+    def remove(self, key):
+        section, key = self._locate( key )
+        if self.parser.has_section( section ):
+            self.parser.remove_option( section, key )
+
+    def sync(self):
+        """Write settings to file atomically."""
+        fileDir = os.path.dirname( self.filePath )
+        if fileDir:
+            os.makedirs( fileDir, exist_ok=True )
+        tmpPath = self.filePath + ".tmp"
+        with open( tmpPath, "w", encoding="utf-8" ) as settingsFile:
+            self.parser.write( settingsFile, space_around_delimiters=False )
+        os.replace( tmpPath, self.filePath )
+
+    def _locate(self, key):
+        """Return pair ( section, key ) of key relative to current group."""
+        if self.group:
+            key = self.group + "/" + key
+        section, _, name = key.rpartition( "/" )
+        if not section:
+            section = GENERAL_SECTION
+        return ( section, name )
+
+    @staticmethod
+    def _createParser():
+        parser = configparser.ConfigParser( interpolation=None, strict=False, delimiters=( "=", ) )
+        ## keys are case sensitive
+        parser.optionxform = str
+        return parser
+
+
+def loadDriverState(settings):
+    """Return driver state stored in settings or None."""
+    settings.beginGroup( DRIVER_STATE_GROUP )
+    try:
+        return DriverState.loadSettings( settings )
+    finally:
+        settings.endGroup()
+
+
+def saveDriverState(settings, state: DriverState):
+    settings.beginGroup( DRIVER_STATE_GROUP )
+    try:
+        state.saveSettings( settings )
+    finally:
+        settings.endGroup()
+
+
+def isValidProfileName(name: str):
+    return PROFILE_NAME_PATTERN.match( name ) is not None
+
+
+def loadProfiles(settings):
+    """Return dict of profiles stored in settings: name -> DriverState."""
+    ret = dict()
+    settings.beginGroup( PROFILES_GROUP )
+    try:
+        for name in settings.childKeys():
+            value = settings.value( name, "", type=str )
+            try:
+                data = bytes.fromhex( value )
+                if len( data ) != DriverState.BYTES_SIZE:
+                    raise ValueError( "invalid length" )
+                state = DriverState.fromBytes( data )
+                ## validate mode
+                state.mode                                  # pylint: disable=W0104
+            except ValueError:
+                _LOGGER.warning( "invalid profile %s: %r", name, value )
+                continue
+            ret[ name ] = state
+    finally:
+        settings.endGroup()
+    return ret
+
+
+def saveProfile(settings, name: str, state: DriverState):
+    settings.beginGroup( PROFILES_GROUP )
+    try:
+        settings.setValue( name, state.toBytes().hex() )
+    finally:
+        settings.endGroup()
+
+
+def removeProfile(settings, name: str):
+    settings.beginGroup( PROFILES_GROUP )
+    try:
+        settings.remove( name )
+    finally:
+        settings.endGroup()
+
+
+def findProfile(profiles: dict, state: DriverState):
+    """Return name of profile equal to given state or None."""
+    for name in sorted( profiles ):
+        if profiles[ name ] == state:
+            return name
+    return None
+
+
+def unquote(value: str):
+    """Remove quotation added by QSettings around values with special characters."""
+    if len( value ) > 1 and value[0] == '"' and value[-1] == '"':
+        return value[1:-1].replace( '\\"', '"' ).replace( '\\\\', '\\' )
+    return value
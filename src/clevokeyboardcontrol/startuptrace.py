@@ -0,0 +1,212 @@
+#     ClevoKeyboardControl. Control of keyboard backlights.
+#
+#     Copyright (C) 2018  Arkadiusz Netczuk <dev.arnet@gmail.com>
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""
+Timing of application's startup phases.
+
+Phases are recorded as nested spans by global tracer. When startup is
+finished summary of spans is emitted as single log record and spans can
+be written to file in Chrome's trace event format (chrome://tracing or
+https://ui.perfetto.dev).
+
+Spans are expected to be recorded by main thread. Before 'start()' and
+after 'finish()' recording is disabled, so spans cost almost nothing.
+Phases completed asynchronously (e.g. by worker thread) are recorded by
+'begin()' and 'end()'.
+"""
+
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class Span():
+
+    __slots__ = ( 'name', 'start', 'end', 'depth' )
+
+    def __init__(self, name, start, depth, end=None):
+        self.name  = name
+        self.start = start
+        self.end   = end
+        self.depth = depth
+
+    def duration(self):
+        if self.end is None:
+            return 0.0
+        return self.end - self.start
+
+    def isInstant(self):
+        return self.end == self.start
+
+    def toDict(self, origin=0.0):
+        return { "name": self.name, "depth": self.depth,
+                 "start_ms": round( ( self.start - origin ) * 1000.0, 3 ),
+                 "duration_ms": round( self.duration() * 1000.0, 3 ) }
+
+
+class StartupTracer():
+
+    _instance = None
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.origin = 0.0
+        self.spans = []
+        self.depth = 0
+        self.enabled = False
+        self.openSpans = []                         ## spans started by 'begin()'
+        self.settledCallbacks = []
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = StartupTracer()
+        return cls._instance
+
+    def start(self):
+        self.origin = self.clock()
+        self.spans = []
+        self.depth = 0
+        self.enabled = True
+        self.openSpans = []
+        self.settledCallbacks = []
+
+    def finish(self):
+        """Stop recording. Returns recorded spans."""
+        self.enabled = False
+        return self.spans
+
+    @contextmanager
+    def span(self, name):
+        if self.enabled is False:
+            yield
+            return
+        record = Span( name, self.clock(), self.depth )
+        self.spans.append( record )
+        self.depth += 1
+        try:
+            yield
+        finally:
+            self.depth -= 1
+            record.end = self.clock()
+
+    def begin(self, name):
+        """Start span finished later by 'end()'. Returns None if recording is disabled."""
+        if self.enabled is False:
+            return None
+        record = Span( name, self.clock(), self.depth )
+        self.spans.append( record )
+        self.openSpans.append( record )
+        return record
+
+    def end(self, record):
+        """Finish span returned by 'begin()'."""
+        if record is None or record not in self.openSpans:
+            return
+        record.end = self.clock()
+        self.openSpans.remove( record )
+        if self.openSpans:
+            return
+        callbacks = self.settledCallbacks
+        self.settledCallbacks = []
+        for callback in callbacks:
+            callback()
+
+    def whenSettled(self, callback):
+        """Call 'callback' when all spans started by 'begin()' are finished."""
+        if not self.openSpans:
+            callback()
+            return
+        self.settledCallbacks.append( callback )
+
+    def mark(self, name):
+        """Record instant event."""
+        if self.enabled is False:
+            return
+        timestamp = self.clock()
+        self.spans.append( Span( name, timestamp, self.depth, timestamp ) )
+
+    def elapsed(self):
+        if not self.spans:
+            return 0.0
+        return max( record.end for record in self.spans if record.end is not None ) - self.origin
+
+    def summary(self) -> str:
+        ## top level phases only, nested ones are in trace file
+        phases = [ "%s=%.1fms" % ( record.name, record.duration() * 1000.0 )
+                   for record in self.spans if record.depth == 0 and record.isInstant() is False ]
+        return "total=%.1fms %s" % ( self.elapsed() * 1000.0, " ".join( phases ) )
+
+    def logSummary(self, logger=None):
+        """Emit spans as single log record (available in 'startupSpans' attribute of record)."""
+        if logger is None:
+            logger = _LOGGER
+        spans = [ record.toDict( self.origin ) for record in self.spans ]
+        logger.info( "startup phases: %s", self.summary(), extra={ "startupSpans": spans } )
+
+    def toChromeTrace(self) -> dict:
+        processId = os.getpid()
+        threadId = threading.main_thread().ident
+        events = []
+        for record in self.spans:
+            event = { "name": record.name, "cat": "startup", "pid": processId, "tid": threadId,
+                      "ts": round( ( record.start - self.origin ) * 1000000.0, 1 ) }
+            if record.isInstant():
+                event[ "ph" ] = "i"
+                event[ "s" ] = "p"
+            else:
+                event[ "ph" ] = "X"
+                event[ "dur" ] = round( record.duration() * 1000000.0, 1 )
+            events.append( event )
+        return { "traceEvents": events, "displayTimeUnit": "ms" }
+
+    def writeChromeTrace(self, filePath):
+        import json
+
+        with open( filePath, "w", encoding="utf-8" ) as traceFile:
+            json.dump( self.toChromeTrace(), traceFile, indent=1 )
+        _LOGGER.info( "startup trace written to %s", filePath )
+
+
+## =====================================================
+
+
+def start():
+    StartupTracer.instance().start()
+
+
+def span(name):
+    return StartupTracer.instance().span( name )
+
+
+def begin(name):
+    return StartupTracer.instance().begin( name )
+
+
+def end(record):
+    StartupTracer.instance().end( record )
+
+
+def mark(name):
+    StartupTracer.instance().mark( name )
@@ -0,0 +1,313 @@
+#     ClevoKeyboardControl. Control of keyboard backlights.
+#
+#     Copyright (C) 2018  Arkadiusz Netczuk <dev.arnet@gmail.com>
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+Detection of system suspend / hibernation.
+
+CLOCK_BOOTTIME includes time spent in suspend while CLOCK_MONOTONIC does
+not, so increase of difference between them means that system was
+suspended. Both clocks are immune to wall clock changes (NTP, manual
+changes). Module does not depend on Qt.
+"""
+
+import logging
+import os
+import time
+import select
+import struct
+import ctypes
+import threading
+import functools
+
+from . import dbusclient
+
+
+_LOGGER = logging.getLogger(__name__)
+
+
+CLOCK_MONOTONIC = getattr( time, "CLOCK_MONOTONIC", 1 )
+CLOCK_BOOTTIME  = getattr( time, "CLOCK_BOOTTIME", 7 )
+
+
+class TimeSpec( ctypes.Structure ):
+    _fields_ = [ ( "tv_sec", ctypes.c_long ), ( "tv_nsec", ctypes.c_long ) ]
+
+
+class ITimerSpec( ctypes.Structure ):
+    _fields_ = [ ( "it_interval", TimeSpec ), ( "it_value", TimeSpec ) ]
+
+
+class TimerFD():
+    """
+    Minimal timerfd wrapper.
+
+    Uses 'os.timerfd_*' functions if available (Python 3.13+), otherwise
+    calls libc directly.
+    """
+
+    TFD_NONBLOCK = os.O_NONBLOCK
+    TFD_CLOEXEC  = os.O_CLOEXEC
+
+    def __init__(self, libc, fd):
+        self.libc = libc
+        self.fd = fd
+
+    @classmethod
+    def create(cls, clockId=CLOCK_BOOTTIME):
+        """Create timer. Returns None if timerfd is not supported."""
+        flags = cls.TFD_NONBLOCK | cls.TFD_CLOEXEC
+        if hasattr( os, "timerfd_create" ):
+            try:
+                return cls( None, os.timerfd_create( clockId, flags=flags ) )
+            except OSError as exc:
+                _LOGGER.warning( "unable to create timerfd: %s", exc )
+                return None
+        try:
+            libc = ctypes.CDLL( None, use_errno=True )
+            fd = libc.timerfd_create( clockId, flags )
+        except (OSError, AttributeError):
+            return None
+        if fd < 0:
+            _LOGGER.warning( "unable to create timerfd: %s", os.strerror( ctypes.get_errno() ) )
+            return None
+        return cls( libc, fd )
+
+    def setInterval(self, interval):
+        """Arm periodic timer expiring every 'interval' seconds."""
+        if self.libc is None:
+            os.timerfd_settime( self.fd, initial=interval, interval=interval )
+            return
+        seconds = int( interval )
+        spec = TimeSpec( seconds, int( ( interval - seconds ) * 1000000000 ) )
+        value = ITimerSpec( spec, spec )
+        if self.libc.timerfd_settime( self.fd, 0, ctypes.byref( value ), None ) < 0:
+            raise OSError( ctypes.get_errno(), os.strerror( ctypes.get_errno() ) )
+
+    def read(self):
+        """Return number of expirations since last read."""
+        try:
+            data = os.read( self.fd, 8 )
+        except BlockingIOError:
+            return 0
+        return struct.unpack( "Q", data )[0]
+
+    def close(self):
+        if self.fd is not None:
+            os.close( self.fd )
+            self.fd = None
+
+
+class SuspendDetector():
+    """
+    Detector of resume from suspend.
+
+    Checks are triggered by single periodic timerfd on CLOCK_BOOTTIME. Timer
+    counts time of suspend, so if suspend lasted longer than remaining time
+    to next expiry, then timer expires immediately after resume. Each resume
+    is reported once, because detection compares clocks' difference with
+    value from previous check.
+
+    Clocks are injectable for testing.
+    """
+
+    ## seconds between checks -- timer on CLOCK_BOOTTIME expires right after
+    ## resume from suspend longer than remaining time, so interval can be long
+    DEFAULT_INTERVAL = 300.0
+
+    ## minimal increase of suspend time (in seconds) considered as resume
+    DRIFT_THRESHOLD = 1.0
+
+    def __init__(self, interval=None, boottime=None, monotonic=None):
+        self.interval = interval
+        if self.interval is None:
+            self.interval = self.DEFAULT_INTERVAL
+        self.boottime = boottime
+        if self.boottime is None:
+            self.boottime = functools.partial( time.clock_gettime, CLOCK_BOOTTIME )
+        self.monotonic = monotonic
+        if self.monotonic is None:
+            self.monotonic = functools.partial( time.clock_gettime, CLOCK_MONOTONIC )
+        self.callback = None                        ## called with duration of suspend in seconds
+        self.lastOffset = None
+        self.timer = None
+
+    def setCallback(self, callback):
+        self.callback = callback
+
+    def start(self):
+        """Arm timer. Returns False if timerfd is not supported -- then 'check()' has to be called periodically."""
+        self.lastOffset = self.suspendOffset()
+        if self.timer is None:
+            self.timer = TimerFD.create( CLOCK_BOOTTIME )
+        if self.timer is None:
+            return False
+        self.timer.setInterval( self.interval )
+        return True
+
+    def stop(self):
+        if self.timer is not None:
+            self.timer.close()
+            self.timer = None
+
+    def fileno(self):
+        """Return descriptor becoming readable when check is due or None if timer is not available."""
+        if self.timer is None:
+            return None
+        return self.timer.fd
+
+    def handleTimer(self):
+        """Consume timer's expirations and check for resume. Returns True if resume is detected."""
+        if self.timer is not None:
+            self.timer.read()
+        return self.check()
+
+    def suspendOffset(self):
+        """Return time spent in suspend since boot."""
+        return self.boottime() - self.monotonic()
+
+    def check(self):
+        """Returns True if resume is detected."""
+        currOffset = self.suspendOffset()
+        if self.lastOffset is None:
+            self.lastOffset = currOffset
+            return False
+        drift = currOffset - self.lastOffset
+        self.lastOffset = currOffset
+        if drift < self.DRIFT_THRESHOLD:
+            return False
+        _LOGGER.debug( "resumed from suspend / hibernation after %s[s]", drift )
+        if self.callback is not None:
+            self.callback( drift )
+        return True
+
+
+class SleepListener():
+    """
+    Receiver of logind's 'PrepareForSleep' signal from system bus.
+
+    Callback is called right after resume. Connection's descriptor has to
+    be watched by caller's event loop ('fileno()', 'handleMessages()').
+    """
+
+    LOGIN_PATH = "/org/freedesktop/login1"
+    LOGIN_MANAGER_INTERFACE = "org.freedesktop.login1.Manager"
+
+    def __init__(self, address=None):
+        self.address = address
+        if self.address is None:
+            self.address = dbusclient.systemBusAddress()
+        self.callback = None
+        self.connection = None
+
+    def setCallback(self, callback):
+        self.callback = callback
+
+    def connect(self):
+        """Subscribe signal. Returns False if system bus is not available."""
+        if self.connection is not None:
+            return True
+        connection = dbusclient.DBusConnection( self.address )
+        try:
+            connection.connect()
+        except ( OSError, dbusclient.DBusError ) as exc:
+            _LOGGER.info( "unable to connect to bus %s: %s", self.address, exc )
+            return False
+        rule = "type='signal',interface='%s',member='PrepareForSleep',path='%s'"
+        rule = rule % ( self.LOGIN_MANAGER_INTERFACE, self.LOGIN_PATH )
+        connection.addMatch( rule )
+        self.connection = connection
+        _LOGGER.debug("listening for PrepareForSleep signal")
+        return True
+
+    def fileno(self):
+        if self.connection is None:
+            return None
+        return self.connection.fileno()
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def handleMessages(self):
+        """Read received messages. Returns False if connection is lost."""
+        try:
+            messages = self.connection.readMessages()
+        except ( OSError, EOFError, dbusclient.DBusError ) as exc:
+            _LOGGER.warning( "lost connection to bus %s: %s", self.address, exc )
+            self.close()
+            return False
+        for message in messages:
+            if message.messageType != dbusclient.SIGNAL or message.member != "PrepareForSleep":
+                continue
+            if not message.body:
+                continue
+            if message.body[0]:
+                _LOGGER.debug("going to suspend / hibernation")
+                continue
+            _LOGGER.debug("resumed from suspend / hibernation")
+            if self.callback is not None:
+                self.callback()
+        return True
+
+
+class SuspendThread( threading.Thread ):
+    """Thread running SuspendDetector for code without event loop."""
+
+    def __init__(self, detector=None):
+        super().__init__( name="SuspendThread", daemon=True )
+        self.detector = detector
+        if self.detector is None:
+            self.detector = SuspendDetector()
+        self._lock = threading.Lock()
+        self._wakeRead, self._wakeWrite = os.pipe()
+        self._stopped = False
+
+    def setCallback(self, callback):
+        self.detector.setCallback( callback )
+
+    def stop(self):
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            if self._wakeWrite is not None:
+                os.write( self._wakeWrite, b"\0" )
+
+    def run(self):
+        poller = select.poll()
+        poller.register( self._wakeRead, select.POLLIN )
+        timeout = None
+        if self.detector.start():
+            poller.register( self.detector.fileno(), select.POLLIN )
+        else:
+            ## no timerfd -- check periodically
+            timeout = int( self.detector.interval * 1000 )
+        try:
+            while self._stopped is False:
+                poller.poll( timeout )
+                if self._stopped:
+                    break
+                self.detector.handleTimer()
+        finally:
+            self.detector.stop()
+            with self._lock:
+                os.close( self._wakeRead )
+                os.close( self._wakeWrite )
+                self._wakeRead = None
+                self._wakeWrite = None
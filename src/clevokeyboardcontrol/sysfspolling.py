@@ -0,0 +1,218 @@
+#     ClevoKeyboardControl. Control of keyboard backlights.
+#
+#     Copyright (C) 2018  Arkadiusz Netczuk <dev.arnet@gmail.com>
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""
+Polling observer of sysfs attributes based on watchdog.
+
+Fallback of SysFSObserver for platforms without 'poll()'. Module is imported
+on demand, so watchdog is not loaded if it's not needed.
+"""
+
+import os
+import stat
+import threading
+import functools
+
+import hashlib
+
+from watchdog.observers import polling
+
+from .sysfswatchdog import CONTENT_BUFFER_SIZE, PollScheduler, allowedFiles, readFileContent
+
+
+class AdaptivePollingEmitter(polling.PollingEmitter):
+    """Polling emitter with interval controlled by PollScheduler."""
+
+    def __init__(self, event_queue, watch, timeout=None, event_filter=None,
+                 stat=os.stat, listdir=os.scandir, maxInterval=None):
+        super().__init__( event_queue, watch, event_filter=event_filter, stat=stat, listdir=listdir )
+        self.scheduler = PollScheduler( maxInterval=maxInterval )
+        self.wakeEvent = threading.Event()
+        self.queuedCounter = 0
+
+    def touch(self):
+        self.scheduler.touch()
+        self.wakeEvent.set()
+
+    def setPaused(self, paused):
+        self.scheduler.setPaused( paused )
+        self.wakeEvent.set()
+
+    def on_thread_stop(self):
+        self.wakeEvent.set()
+
+    def queue_event(self, event):
+        self.queuedCounter += 1
+        super().queue_event( event )
+
+    def queue_events(self, timeout):
+        self.wakeEvent.wait( self.scheduler.delay() )
+        self.wakeEvent.clear()
+        if self.stopped_event.is_set():
+            return
+        if self.scheduler.isDue() is False:
+            ## woken up to recalculate schedule
+            return
+        self.queuedCounter = 0
+        super().queue_events( 0 )
+        self.scheduler.polled( self.queuedCounter > 0 )
+
+
+class FileContentObserver(polling.PollingObserverVFS):
+    """
+    Polling observer detecting changes of files content.
+
+    By default content is represented by it's hash. In content mode raw bytes
+    of files are kept and compared directly, which is cheaper for small files
+    like sysfs attributes.
+
+    Each watched path is polled according to it's own adaptive PollScheduler.
+    Directory can be limited to allowed files, then other entries are not
+    stat'ed nor compared.
+    """
+
+    def __init__(self, listdir=os.scandir, contentMode=False, maxInterval=None):
+        super().__init__(self.stat, listdir)
+        self.listdirFunction = listdir
+        self.allowedFiles = dict()                  ## directory path -> set of allowed paths or None (all)
+        ## replace emitter of base class
+        self._emitter_class = functools.partial( AdaptivePollingEmitter, stat=self.stat, listdir=self.listdir,
+                                                 maxInterval=maxInterval )
+        self.buffer = None
+        if contentMode:
+            self.buffer = memoryview( bytearray( CONTENT_BUFFER_SIZE ) )
+
+    def schedule(self, event_handler, path, recursive=False, files=None):
+        """If 'files' is given, then only those files of directory are watched."""
+        if files is None:
+            self.allowedFiles[ path ] = None
+        elif self.allowedFiles.get( path, set() ) is not None:
+            ## other subscriptions of directory can watch other files
+            allowed = self.allowedFiles.get( path, set() )
+            self.allowedFiles[ path ] = allowed.union( allowedFiles( path, files ) )
+        return super().schedule( event_handler, path, recursive=recursive )
+
+    def listdir(self, path):
+        allowed = self.allowedFiles.get( path )
+        if allowed is None:
+            yield from self.listdirFunction( path )
+            return
+        with self.listdirFunction( path ) as entries:
+            for entry in entries:
+                if os.path.join( path, entry.name ) in allowed:
+                    yield entry
+
+    def touch(self, watch=None):
+        """Switch polling to fast mode. 'watch' is value returned by 'schedule()'."""
+        for emitter in self._selectEmitters( watch ):
+            emitter.touch()
+
+    def setPaused(self, paused, watch=None):
+        for emitter in self._selectEmitters( watch ):
+            emitter.setPaused( paused )
+
+    def pollStats(self):
+        """Return dict: path -> poll statistics of watched paths."""
+        return { emitter.watch.path: emitter.scheduler.stats() for emitter in self.emitters }
+
+    def _selectEmitters(self, watch):
+        if watch is None:
+            return list( self.emitters )
+        emitter = self._emitter_for_watch.get( watch )
+        if emitter is None:
+            return []
+        return [ emitter ]
+
+    def stat(self, path):
+        defStat = os.stat(path)
+        if stat.S_ISDIR( defStat.st_mode ):
+            ## _LOGGER.debug("performing stat on directory %r", path)
+            return defStat
+        ## file case
+        if self.buffer is not None:
+            return ContentStatResult(defStat, path, self.buffer)
+        return StatResult(defStat, path)
+
+
+class StatResult():
+
+    __slots__ = ( 'osResult', 'filePath', 'mtimeField' )
+
+    def __init__(self, osResult, path):
+        self.osResult = osResult
+        self.filePath = path
+        self.mtimeField = None
+
+    @property
+    def st_size(self):
+        return self.osResult.st_size
+
+    @property
+    def st_ino(self):
+        return self.osResult.st_ino
+
+    @property
+    def st_dev(self):
+        return self.osResult.st_dev
+
+    @property
+    def st_mode(self):
+        return self.osResult.st_mode
+
+    @property
+    def st_mtime(self):
+        """
+        st_mtime includeing file hash.
+
+        Watchdog does not support checking for file content, so workaround is
+        to incorporate information about content (hash) into 'mtime' field.
+        """
+        if self.mtimeField is None:
+            hashValue = self.calculateHash()
+            ## st_mtime allows to detect case, when file was modified with the same content
+            self.mtimeField = str(self.osResult.st_mtime) + "_" + str(self.osResult.st_size) + "_" + hashValue
+            ##_LOGGER.debug("calculated field %r", self.mtimeField)
+        return self.mtimeField
+
+    def calculateHash(self):
+        hasher = hashlib.md5()
+        with open(self.filePath, 'rb') as afile:
+            buf = afile.read()
+            hasher.update(buf)
+        return hasher.hexdigest()
+
+
+class ContentStatResult(StatResult):
+    """
+    Stat result keeping raw content of file in 'mtime' field.
+
+    Content is read immediately into shared preallocated buffer, so no hashing
+    nor string building is needed to compare snapshots.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, osResult, path, buffer):
+        super().__init__(osResult, path)
+        self.mtimeField = readFileContent( path, buffer )
+
+    @property
+    def st_mtime(self):
+        """st_mtime containing raw content of file."""
+        return self.mtimeField
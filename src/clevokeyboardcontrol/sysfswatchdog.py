@@ -19,183 +19,987 @@
 
 import logging
 import os
+import math
 import time
+import threading
+import select
+import struct
+import ctypes
 
-import hashlib
 
-from watchdog.observers import polling
-from watchdog.events import FileSystemEventHandler
+_LOGGER = logging.getLogger(__name__)
 
 
-_LOGGER = logging.getLogger(__name__)
+## sysfs attributes are not bigger than single page
+CONTENT_BUFFER_SIZE = 4096
+
+
+class WatchService:
+    """
+    Process-wide service of watching sysfs attributes.
+
+    All subscriptions share single observer thread, so number of threads
+    and idle wakeups do not depend on number of watched directories.
+    Observer thread is started on first subscription.
+
+    On Linux changes are detected by SysFSObserver (poll/inotify), on other
+    platforms service falls back to FileContentObserver.
+    """
+
+    THREAD_NAME = "SysFSWatchThread"
+
+    _instance = None
+    _instanceLock = threading.Lock()
+
+    def __init__(self, observer=None):
+        self.lock = threading.Lock()
+        self.observer = observer
+        if self.observer is None:
+            if hasattr(select, "poll"):
+                self.observer = SysFSObserver()
+            else:
+                ## import watchdog only when needed
+                from .sysfspolling import FileContentObserver
+                self.observer = FileContentObserver( contentMode=True )
+            self.observer.name = self.THREAD_NAME
+        self.subscriptions = set()
+        self.closed = False
+
+    @classmethod
+    def instance(cls):
+        """Return shared service. Service is created if needed."""
+        with cls._instanceLock:
+            if cls._instance is None:
+                cls._instance = WatchService()
+            return cls._instance
+
+    @classmethod
+    def shutdownInstance(cls, timeout=None):
+        """Stop shared service (if exists). Next call of 'instance()' creates new service."""
+        with cls._instanceLock:
+            service = cls._instance
+            cls._instance = None
+        if service is not None:
+            service.shutdown( timeout )
+
+    def subscribe(self, event_handler, path, recursive=False, files=None):
+        """
+        Start watching 'path'. Return subscription handle.
+
+        If 'files' is given, then only those files of directory are watched.
+        """
+        with self.lock:
+            if self.closed:
+                raise RuntimeError( "watch service is shut down" )
+            watch = self.observer.schedule( event_handler=event_handler, path=path, recursive=recursive, files=files )
+            subscription = WatchSubscription( self, watch, event_handler )
+            self.subscriptions.add( subscription )
+            if self.observer.is_alive() is False:
+                self.observer.start()
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            if subscription not in self.subscriptions:
+                return
+            self.subscriptions.discard( subscription )
+            if self.closed is False:
+                self.observer.unschedule( subscription.watch )
+
+    def touch(self, watch=None):
+        """Notify about user interaction -- watched paths are polled faster for a while."""
+        self.observer.touch( watch )
+
+    def setPaused(self, paused, watch=None):
+        """Pause polling (e.g. while session is locked). Kernel notifications are still received."""
+        self.observer.setPaused( paused, watch )
+
+    def pollStats(self):
+        """Return dict: path -> dict with current poll interval and counters."""
+        return self.observer.pollStats()
+
+    def shutdown(self, timeout=None):
+        """Remove all subscriptions and stop observer thread."""
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            subscriptions = self.subscriptions
+            self.subscriptions = set()
+        for subscription in subscriptions:
+            subscription.handler.cancel()
+        self.observer.stop()
+        if self.observer.is_alive():
+            self.observer.join( timeout )
+
+
+class WatchSubscription:
+    """Handle of watched path."""
+
+    def __init__(self, service, watch, handler):
+        self.service = service
+        self.watch = watch
+        self.handler = handler
+
+    def unsubscribe(self):
+        self.service.unsubscribe( self )
+
+    def touch(self):
+        self.service.touch( self.watch )
+
+    def setPaused(self, paused):
+        self.service.setPaused( paused, self.watch )
 
 
 class SysFSWatcher:
     """
     SysFS observer.
 
+    Callback receives dict of changed files: path -> new content (bytes).
+    Content is None if it's not known.
+
     SysFS is not real file system, so there is no assumption about file modification times.
     For example sysfs file content can be changed without changing of it's modification timestamp.
     For instance it happens for keyboard shortcuts.
+
+    Watched directories are subscribed in shared WatchService, so watchers
+    do not start threads on their own.
     """
 
-    def __init__(self, threadName=None):
-        self.observer = FileContentObserver()
+    def __init__(self, threadName=None, service=None):
+        ## 'threadName' is kept for compatibility -- observer thread is shared
+        self.service = service
+        if self.service is None:
+            self.service = WatchService.instance()
         self.event_handler = Handler()
-        if threadName is not None:
-            ## set thread name
-            self.observer.setName( threadName )
+        self.subscriptions = []
 
     def setCallback(self, callback):
         self.event_handler.callback = callback
 
-    def ignoreNextEvent(self):
-        self.event_handler.ignoreNextEvent()
+    def expectWrite(self, path, value):
+        """Register value written by application, so it's change event will be suppressed."""
+        self.event_handler.expectWrite( path, value )
+
+    def setValueNormalizer(self, normalizer):
+        self.event_handler.setValueNormalizer( normalizer )
+
+    def setCoalescing(self, window, leading=False, trailing=True):
+        """Merge changes occurring within 'window' seconds into one callback."""
+        self.event_handler.setCoalescing( window, leading, trailing )
 
     def setEnabled(self, newState):
         return self.event_handler.setEnabled(newState)
 
-    def watch(self, directoryPath, recursiveMode: bool):
+    def watch(self, directoryPath, recursiveMode: bool, files=None):
+        """
+        Watch directory.
+
+        'files' is optional collection of files (absolute or relative to
+        directory) to watch instead of whole directory content.
+        """
         if directoryPath is None:
             return
-        self.observer.schedule(event_handler=self.event_handler, path=directoryPath, recursive=recursiveMode)
-        self.observer.start()
+        subscription = self.service.subscribe( self.event_handler, directoryPath, recursiveMode, files )
+        self.subscriptions.append( subscription )
+
+    def touch(self):
+        """Poll watched directories faster for a while (e.g. after user interaction)."""
+        for subscription in self.subscriptions:
+            subscription.touch()
+
+    def setPaused(self, paused):
+        for subscription in self.subscriptions:
+            subscription.setPaused( paused )
 
     def stop(self):
-        self.observer.stop()
+        """Unsubscribe watched directories. Shared observer thread keeps running."""
+        subscriptions = self.subscriptions
+        self.subscriptions = []
+        for subscription in subscriptions:
+            subscription.unsubscribe()
+        self.event_handler.cancel()
 
     def runLoop(self):
         try:
             while True:
                 time.sleep(5)
         except BaseException:
-            self.observer.stop()
             _LOGGER.error("Error")
+        self.stop()
 
-        self.observer.join()
 
-
-class WatcherBlocker:
+class Handler():
     """
-    Context guard.
-
-    Disables watcher callbacks in "with" scope.
+    Handler of file system events.
+
+    Events caused by application's own writes are suppressed: written
+    values are registered by 'expectWrite()' and event is ignored if
+    observed content matches one of pending writes of the file.
+
+    Bursts of events can be coalesced (see 'setCoalescing()'): changes
+    received within coalescing window are merged and delivered in single
+    callback. Leading edge delivers first change of burst immediately,
+    trailing edge delivers merged changes when window elapses. Window is
+    closed by observer driving the handler (see 'setWindowListener()'),
+    so trailing callback is called from observer's thread. Handler without
+    listener (e.g. used by watchdog's observer) closes window by timer.
     """
 
-    def __init__(self, watcher):
-        self.watcher = watcher
-        self.oldEnabled = None
-
-    def __enter__(self):
-        if self.watcher is None:
-            return
-        self.oldEnabled = self.watcher.setEnabled( False )
-        _LOGGER.debug( "disabling sysfs watcher, prev state: %s" % self.oldEnabled )
-        self.watcher.ignoreNextEvent()
-
-    def __exit__(self, exceptionType, value, traceback):
-        _LOGGER.debug( "restoring sysfs watcher state to %s" % self.oldEnabled )
-        if self.watcher is None:
-            return False                                                            ## do not suppress exceptions
-        if self.oldEnabled is None:
-            return False                                                            ## do not suppress exceptions
-        self.watcher.setEnabled( self.oldEnabled )
-        return False                                                                ## do not suppress exceptions
-
-
-class Handler(FileSystemEventHandler):
+    ## time after which not confirmed write is forgotten (e.g. write did not change content)
+    PENDING_WRITE_TIMEOUT = 5.0
 
     def __init__(self):
-        super().__init__()
         self.enabled = True
         self.callback = None
-        self.ignoreEventCounter = 0
-
-    def ignoreNextEvent(self):
-        self.ignoreEventCounter += 1
+        self.normalizer = None
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.pendingWrites = dict()                 ## path -> list of ( generation, value, timestamp )
+        self.coalesceWindow = 0.0
+        self.coalesceLeading = False
+        self.coalesceTrailing = True
+        self.batch = dict()                         ## changes collected in current window
+        self.windowDeadline = None                  ## time of closing current window
+        self.windowListener = None
+        self.windowTimer = None                     ## used only if there is no listener
 
     def setEnabled(self, newState):
         oldState = self.enabled
         self.enabled = newState
         return oldState
 
+    def setValueNormalizer(self, normalizer):
+        """Set function 'normalizer(path, value: str)' converting values to comparable form."""
+        self.normalizer = normalizer
+
+    def setCoalescing(self, window, leading=False, trailing=True):
+        """
+        Configure coalescing of events.
+
+        'window' is length of window in seconds, 0 disables coalescing.
+        If both edges are disabled, then changes are delivered on trailing edge.
+        """
+        if leading is False and trailing is False:
+            trailing = True
+        with self.lock:
+            self.coalesceWindow = max( window, 0.0 )
+            self.coalesceLeading = leading
+            self.coalesceTrailing = trailing
+
+    def setWindowListener(self, listener):
+        """
+        Set function called when coalescing window opens.
+
+        Listener takes responsibility of calling 'flushWindow()' after
+        'getWindowDeadline()', so no timer thread is started.
+        """
+        self.windowListener = listener
+
+    def getWindowDeadline(self):
+        """Return time (time.monotonic()) of closing current window or None if there is no window."""
+        return self.windowDeadline
+
+    def flushWindow(self):
+        """Close coalescing window if it's time elapsed and deliver collected changes."""
+        with self.lock:
+            if self.windowDeadline is None or time.monotonic() < self.windowDeadline:
+                return
+            changes = self._closeWindow()
+        if changes:
+            self._notify( changes )
+
+    def cancel(self):
+        """Cancel coalescing window and drop collected changes."""
+        with self.lock:
+            self._closeWindow()
+
+    def expectWrite(self, path, value):
+        """Register value written to file by application."""
+        normValue = self._normalize( path, value )
+        currTime = time.monotonic()
+        with self.lock:
+            self.generation += 1
+            pending = self._getPending( path, currTime )
+            pending.append( ( self.generation, normValue, currTime ) )
+            self.pendingWrites[ path ] = pending
+
+    def isSelfWrite(self, path, content):
+        """Check if content comes from pending write. Matching and older writes are removed."""
+        normValue = self._normalize( path, content )
+        with self.lock:
+            pending = self._getPending( path, time.monotonic() )
+            for index in range( len(pending) - 1, -1, -1 ):
+                if pending[ index ][1] == normValue:
+                    ## older writes are superseded
+                    self.pendingWrites[ path ] = pending[ index + 1: ]
+                    return True
+            self.pendingWrites[ path ] = pending
+            return False
+
+    def dispatch(self, event):
+        """Handle event (interface of watchdog's handlers)."""
+        self.on_any_event( event )
+
     def on_any_event(self, event):
         ##_LOGGER.info( "Directory content modified - %s, %r", event.src_path, event )
 
-        if self.ignoreEventCounter > 0:
-            _LOGGER.debug("detected driver external change -- ignored")
-            self.ignoreEventCounter -= 1
+        content = getattr( event, "content", None )
+        if content is not None and self.isSelfWrite( event.src_path, content ):
+            _LOGGER.debug("detected driver change -- own write")
             return
 
         if self.enabled is False:
             _LOGGER.debug("detected driver external change -- disabled")
             return
 
+        _LOGGER.debug( "detected driver external change: %s", event )
+        changes = self._coalesce( event.src_path, content )
+        if changes:
+            self._notify( changes )
+
+    def _coalesce(self, path, content):
+        """Add change to current window. Return changes to deliver immediately."""
+        with self.lock:
+            if self.coalesceWindow <= 0.0:
+                return { path: content }
+            if self.windowDeadline is not None:
+                ## window already open
+                self.batch[ path ] = content
+                return None
+            self.windowDeadline = time.monotonic() + self.coalesceWindow
+            listener = self.windowListener
+            if listener is None:
+                self.windowTimer = threading.Timer( self.coalesceWindow, self._timerExpired )
+                self.windowTimer.daemon = True
+                self.windowTimer.start()
+            if self.coalesceLeading:
+                changes = { path: content }
+            else:
+                self.batch[ path ] = content
+                changes = None
+        if listener is not None:
+            listener()
+        return changes
+
+    def _timerExpired(self):
+        with self.lock:
+            if self.windowTimer is not threading.current_thread():
+                ## window cancelled
+                return
+            changes = self._closeWindow()
+        if changes:
+            self._notify( changes )
+
+    def _closeWindow(self):
+        """Close window. Return changes to deliver on trailing edge. Has to be called under lock."""
+        timer = self.windowTimer
+        self.windowTimer = None
+        self.windowDeadline = None
+        changes = self.batch
+        self.batch = dict()
+        if timer is not None and timer is not threading.current_thread():
+            timer.cancel()
+        if self.coalesceTrailing is False:
+            return None
+        return changes
+
+    def _notify(self, changes):
         if self.callback is None:
             _LOGGER.debug("detected driver external change -- no callback")
             return
+        self.callback( changes )
+
+    def _getPending(self, path, currTime):
+        """Return list of not expired pending writes."""
+        pending = self.pendingWrites.get( path, [] )
+        expireTime = currTime - self.PENDING_WRITE_TIMEOUT
+        return [ item for item in pending if item[2] > expireTime ]
+
+    def _normalize(self, path, value):
+        if isinstance( value, bytes ):
+            value = value.decode( errors="replace" )
+        value = str( value ).strip()
+        if self.normalizer is None:
+            return value
+        try:
+            return self.normalizer( path, value )
+        except ValueError:
+            return value
 
-        _LOGGER.debug( "detected driver external change: {0}".format(event) )
-        self.callback()
 
+class ContentModifiedEvent():
+    """File modified event carrying new content of the file (compatible with watchdog's events)."""
 
-class FileContentObserver(polling.PollingObserverVFS):
+    event_type = "modified"
+    is_directory = False
 
-    def __init__(self, listdir=os.scandir):
-        super().__init__(self.stat, listdir)
+    def __init__(self, src_path, content):
+        self.src_path = src_path
+        self.content = content
 
-    def stat(self, path):
-        if os.path.isdir( path ):
-            ## _LOGGER.debug("performing stat on directory %r", path)
-            return os.stat(path)
-        ## file case
-        defStat = os.stat(path)
-        ret = StatResult(defStat, path)
-        return ret
+    def __repr__(self):
+        return "<ContentModifiedEvent: src_path=%r>" % self.src_path
 
 
-class StatResult():
+class PollScheduler():
+    """
+    Adaptive schedule of polling single path.
 
-    def __init__(self, osResult, path):
-        self.osResult = osResult
-        self.filePath = path
-        self.mtimeField = None
+    After change or user interaction path is polled with fast interval for
+    'hotPeriod' seconds. Later, when nothing changes, interval grows
+    exponentially up to 'maxInterval'. Polling can be paused entirely
+    (e.g. when user's session is locked). Failed polls are retried starting
+    from fast interval with the same backoff.
+    """
 
-    @property
-    def st_size(self):
-        return self.osResult.st_size
+    FAST_INTERVAL = 0.1
+    HOT_PERIOD = 2.0
+    MAX_INTERVAL = 5.0
+    BACKOFF_FACTOR = 2.0
+
+    def __init__(self, fastInterval=None, maxInterval=None, hotPeriod=None, clock=time.monotonic):
+        self.maxInterval = maxInterval if maxInterval is not None else self.MAX_INTERVAL
+        self.fastInterval = fastInterval if fastInterval is not None else self.FAST_INTERVAL
+        self.fastInterval = min( self.fastInterval, self.maxInterval )
+        self.hotPeriod = hotPeriod if hotPeriod is not None else self.HOT_PERIOD
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.paused = False
+        self.pollCount = 0
+        self.changeCount = 0
+        self.failCount = 0
+        currTime = self.clock()
+        self.interval = self.fastInterval
+        self.hotUntil = currTime + self.hotPeriod
+        self.nextPoll = currTime + self.interval
+
+    def touch(self):
+        """Switch to fast polling (change or user interaction happened)."""
+        with self.lock:
+            currTime = self.clock()
+            self.hotUntil = currTime + self.hotPeriod
+            self.interval = self.fastInterval
+            self.nextPoll = min( self.nextPoll, currTime + self.interval )
+
+    def setPaused(self, paused):
+        with self.lock:
+            self.paused = paused
+
+    def nextPollTime(self):
+        """Return time of next poll or None if paused."""
+        with self.lock:
+            if self.paused:
+                return None
+            return self.nextPoll
+
+    def delay(self):
+        """Return seconds to next poll or None if paused."""
+        nextPoll = self.nextPollTime()
+        if nextPoll is None:
+            return None
+        return max( nextPoll - self.clock(), 0.0 )
+
+    def isDue(self, slack=0.0):
+        nextPoll = self.nextPollTime()
+        if nextPoll is None:
+            return False
+        return nextPoll <= self.clock() + slack
+
+    def polled(self, changed):
+        """Register poll and it's result. Calculates next poll time."""
+        with self.lock:
+            currTime = self.clock()
+            self.pollCount += 1
+            if changed:
+                self.changeCount += 1
+                self.hotUntil = currTime + self.hotPeriod
+                self.interval = self.fastInterval
+            elif currTime >= self.hotUntil:
+                self.interval = min( self.interval * self.BACKOFF_FACTOR, self.maxInterval )
+            self.failCount = 0
+            self.nextPoll = currTime + self.interval
+
+    def failed(self):
+        """Register failed poll (e.g. attribute disappeared during module reload). Calculates retry time."""
+        with self.lock:
+            currTime = self.clock()
+            self.pollCount += 1
+            self.failCount += 1
+            self.hotUntil = currTime
+            if self.failCount == 1:
+                self.interval = self.fastInterval
+            else:
+                self.interval = min( self.interval * self.BACKOFF_FACTOR, self.maxInterval )
+            self.nextPoll = currTime + self.interval
+
+    def stats(self):
+        with self.lock:
+            return { "interval": self.interval,
+                     "pollCount": self.pollCount,
+                     "changeCount": self.changeCount,
+                     "failCount": self.failCount,
+                     "paused": self.paused }
+
+
+class SysFSObserver(threading.Thread):
+    """
+    Event driven observer of sysfs attributes.
+
+    Thread blocks in 'poll()' on descriptors of watched attributes. Kernel
+    drivers calling 'sysfs_notify()' wake the thread with POLLPRI/POLLERR.
+    Writes done by user space processes are received through inotify.
+    Attributes that have never been notified by kernel are checked
+    periodically by comparing their content. Each of them has own
+    adaptive PollScheduler. Attributes that can not be read (e.g. driver's
+    module is being reloaded) are closed and reopened with backoff.
+    """
+
+    ## max interval of checking attributes that do not notify about changes
+    DEFAULT_POLL_INTERVAL = PollScheduler.MAX_INTERVAL
+
+    ## attributes due within slack are polled together to reduce wakeups
+    POLL_SLACK = 0.02
+
+    POLL_MASK = select.POLLPRI | select.POLLERR
 
-    @property
-    def st_ino(self):
-        return self.osResult.st_ino
+    ## max time of waiting for observer thread to (un)register attributes
+    SCHEDULE_TIMEOUT = 5.0
 
-    @property
-    def st_dev(self):
-        return self.osResult.st_dev
+    def __init__(self, pollInterval=None):
+        super().__init__(daemon=True)
+        self.pollInterval = pollInterval
+        if self.pollInterval is None:
+            self.pollInterval = self.DEFAULT_POLL_INTERVAL
 
-    @property
-    def st_mode(self):
-        return self.osResult.st_mode
+        ## guards pending operations and modifications of '_attributes' and '_broken'
+        ## (they are modified only by observer's thread, but read by other threads)
+        self._lock = threading.Lock()
+        self._pending = []                          ## operations to execute in observer's thread
+        self._attributes = dict()                   ## fd -> SysFSAttribute
+        self._watches = dict()                      ## inotify watch descriptor -> SysFSAttribute
+        self._broken = []                           ## attributes waiting for reopen
+        self._stopped = False
+        self._buffer = memoryview( bytearray( CONTENT_BUFFER_SIZE ) )
 
-    @property
-    def st_mtime(self):
+        self._poller = select.poll()
+        self._wakeRead, self._wakeWrite = os.pipe()
+        os.set_blocking( self._wakeRead, False )
+        self._poller.register( self._wakeRead, select.POLLIN )
+
+        self._inotify = Inotify.create()
+        if self._inotify is not None:
+            self._poller.register( self._inotify.fd, select.POLLIN )
+
+    def schedule(self, event_handler, path, recursive=False, files=None):
         """
-        st_mtime includeing file hash.
+        Start watching attributes in 'path'. Returns when attributes are watched.
 
-        Watchdog does not support checking for file content, so workaround is
-        to incorporate information about content (hash) into 'mtime' field.
+        If 'files' is given, then only those attributes are watched.
         """
-        if self.mtimeField is None:
-            hashValue = self.calculateHash()
-            ## st_mtime allows to detect case, when file was modified with the same content
-            self.mtimeField = str(self.osResult.st_mtime) + "_" + str(self.osResult.st_size) + "_" + hashValue
-            ##_LOGGER.debug("calculated field %r", self.mtimeField)
-        return self.mtimeField
-
-    def calculateHash(self):
-        hasher = hashlib.md5()
-        with open(self.filePath, 'rb') as afile:
-            buf = afile.read()
-            hasher.update(buf)
-        return hasher.hexdigest()
+        if files is None:
+            filesList = listAttributes( path, recursive )
+        else:
+            filesList = allowedFiles( path, files )
+        if event_handler is not None and hasattr( event_handler, "setWindowListener" ):
+            ## coalescing windows are closed by observer's loop instead of timer threads
+            event_handler.setWindowListener( self._windowOpened )
+        attributes = [ SysFSAttribute( filePath, event_handler, PollScheduler( maxInterval=self.pollInterval ) )
+                       for filePath in filesList ]
+        self._executeAndWait( lambda: self._addAttributes( attributes ) )
+        return attributes
+
+    def unschedule(self, watch):
+        """Stop watching attributes. Returns when attributes are removed."""
+        self._executeAndWait( lambda: self._removeAttributes( watch ) )
+
+    def touch(self, watch=None):
+        """Switch polling of attributes to fast mode. 'watch' is value returned by 'schedule()'."""
+        for attribute in self._selectAttributes( watch ):
+            attribute.scheduler.touch()
+        self._wake()
+
+    def setPaused(self, paused, watch=None):
+        for attribute in self._selectAttributes( watch ):
+            attribute.scheduler.setPaused( paused )
+        self._wake()
+
+    def pollStats(self):
+        """Return dict: path -> poll statistics of polled attributes."""
+        attributes = [ attribute for attribute in self._snapshot() if attribute.notified is False or attribute.fd is None ]
+        return { attribute.path: attribute.scheduler.stats() for attribute in attributes }
+
+    def stop(self):
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+        if self.ident is None:
+            ## thread not started
+            self._close()
+            return
+        self._wake()
+
+    def run(self):
+        try:
+            while self._processPending():
+                timeout = self._pollTimeout()
+                events = self._poller.poll( timeout )
+                for fd, mask in events:
+                    self._handleEvent( fd, mask )
+                self._pollAttributes()
+                self._flushWindows()
+        finally:
+            self._close()
+
+    ## =====================================================
+
+    def _execute(self, operation):
+        with self._lock:
+            self._pending.append( operation )
+        self._wake()
+
+    def _executeAndWait(self, operation):
+        if self.ident is None:
+            ## thread not started -- no concurrent access
+            operation()
+            return
+        done = threading.Event()
+
+        def waitedOperation():
+            operation()
+            done.set()
 
+        self._execute( waitedOperation )
+        if threading.current_thread() is not self and self.is_alive():
+            done.wait( self.SCHEDULE_TIMEOUT )
+
+    def _wake(self):
+        wakeFd = self._wakeWrite
+        if wakeFd is None:
+            ## observer closed
+            return
+        try:
+            os.write( wakeFd, b"\0" )
+        except OSError:
+            ## pipe closed or full -- thread is already woken up
+            pass
+
+    def _windowOpened(self):
+        if threading.current_thread() is self:
+            ## timeout is recalculated before next poll
+            return
+        self._wake()
+
+    def _processPending(self):
+        with self._lock:
+            if self._stopped:
+                return False
+            operations = self._pending
+            self._pending = []
+        for operation in operations:
+            operation()
+        return True
+
+    def _selectAttributes(self, watch):
+        if watch is None:
+            return self._snapshot()
+        return watch
+
+    def _snapshot(self):
+        """Return list of watched attributes. Safe to call from any thread."""
+        with self._lock:
+            return list( self._attributes.values() ) + self._broken
+
+    def _pollTimeout(self):
+        """Return timeout in milliseconds or None if there is no attribute to poll and no open coalescing window."""
+        nextPoll = None
+        for attribute in list( self._attributes.values() ) + self._broken:
+            if attribute.notified and attribute.fd is not None:
+                continue
+            attributePoll = attribute.scheduler.nextPollTime()
+            if attributePoll is None:
+                ## paused
+                continue
+            if nextPoll is None or attributePoll < nextPoll:
+                nextPoll = attributePoll
+        for handler in self._handlers():
+            deadline = handler.getWindowDeadline()
+            if deadline is not None and ( nextPoll is None or deadline < nextPoll ):
+                nextPoll = deadline
+        if nextPoll is None:
+            return None
+        timeout = nextPoll - time.monotonic()
+        ## round up, so deadline is reached after wakeup
+        return max( math.ceil( timeout * 1000 ), 0 )
+
+    def _handlers(self):
+        """Return handlers with coalescing windows driven by observer."""
+        handlers = set()
+        for attribute in list( self._attributes.values() ) + self._broken:
+            if hasattr( attribute.handler, "flushWindow" ):
+                handlers.add( attribute.handler )
+        return handlers
+
+    def _flushWindows(self):
+        for handler in self._handlers():
+            handler.flushWindow()
+
+    def _handleEvent(self, fd, mask):
+        if fd == self._wakeRead:
+            try:
+                while os.read( self._wakeRead, 64 ):
+                    pass
+            except BlockingIOError:
+                pass
+            return
+        if self._inotify is not None and fd == self._inotify.fd:
+            for wd in self._inotify.readEvents():
+                attribute = self._watches.get( wd )
+                if attribute is not None:
+                    self._checkAttribute( attribute )
+            return
+        attribute = self._attributes.get( fd )
+        if attribute is None:
+            return
+        if mask & self.POLL_MASK:
+            if attribute.notified is False:
+                _LOGGER.debug( "attribute %s notifies about changes", attribute.path )
+                attribute.notified = True
+            self._checkAttribute( attribute )
+
+    def _pollAttributes(self):
+        for attribute in list( self._broken ):
+            if attribute.scheduler.isDue( self.POLL_SLACK ):
+                self._reopenAttribute( attribute )
+        for attribute in list( self._attributes.values() ):
+            if attribute.notified:
+                continue
+            if attribute.scheduler.isDue( self.POLL_SLACK ):
+                changed = self._checkAttribute( attribute )
+                attribute.scheduler.polled( changed )
+
+    def _checkAttribute(self, attribute):
+        """Check attribute's content and dispatch event. Returns True if content changed."""
+        try:
+            changed = attribute.refresh( self._buffer )
+        except OSError as exc:
+            ## e.g. ENODEV while driver's module is reloaded
+            _LOGGER.warning( "unable to read attribute %s: %s", attribute.path, exc )
+            self._detachAttribute( attribute )
+            with self._lock:
+                self._broken.append( attribute )
+            attribute.scheduler.failed()
+            return False
+        if changed:
+            attribute.scheduler.touch()
+            attribute.handler.dispatch( ContentModifiedEvent( attribute.path, attribute.content ) )
+        return changed
+
+    def _addAttributes(self, attributes):
+        for attribute in attributes:
+            try:
+                attribute.open( self._buffer )
+            except OSError as exc:
+                ## e.g. write-only attribute
+                _LOGGER.debug( "unable to watch attribute %s: %s", attribute.path, exc )
+                continue
+            self._attachAttribute( attribute )
+
+    def _reopenAttribute(self, attribute):
+        oldContent = attribute.content
+        try:
+            attribute.open( self._buffer )
+        except OSError as exc:
+            _LOGGER.debug( "unable to reopen attribute %s: %s", attribute.path, exc )
+            attribute.scheduler.failed()
+            return
+        _LOGGER.info( "attribute %s available again", attribute.path )
+        with self._lock:
+            self._broken.remove( attribute )
+        self._attachAttribute( attribute )
+        changed = attribute.content != oldContent
+        attribute.scheduler.polled( True )
+        if changed:
+            attribute.handler.dispatch( ContentModifiedEvent( attribute.path, attribute.content ) )
+
+    def _attachAttribute(self, attribute):
+        with self._lock:
+            self._attributes[ attribute.fd ] = attribute
+        self._poller.register( attribute.fd, self.POLL_MASK )
+        if self._inotify is not None:
+            attribute.wd = self._inotify.addWatch( attribute.path )
+            if attribute.wd is not None:
+                self._watches[ attribute.wd ] = attribute
+
+    def _detachAttribute(self, attribute):
+        if attribute.fd is None:
+            return
+        with self._lock:
+            removed = self._attributes.pop( attribute.fd, None )
+        if removed is None:
+            return
+        self._poller.unregister( attribute.fd )
+        if attribute.wd is not None:
+            self._watches.pop( attribute.wd, None )
+            self._inotify.removeWatch( attribute.wd )
+            attribute.wd = None
+        attribute.close()
+
+    def _removeAttributes(self, attributes):
+        for attribute in attributes:
+            with self._lock:
+                if attribute in self._broken:
+                    self._broken.remove( attribute )
+            self._detachAttribute( attribute )
+
+    def _close(self):
+        self._removeAttributes( list( self._attributes.values() ) + self._broken )
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+        if self._wakeRead is not None:
+            os.close( self._wakeRead )
+            os.close( self._wakeWrite )
+            self._wakeRead = None
+            self._wakeWrite = None
+
+
+class SysFSAttribute():
+    """Watched attribute file."""
+
+    def __init__(self, path, handler, scheduler=None):
+        self.path = path
+        self.handler = handler
+        self.scheduler = scheduler
+        if self.scheduler is None:
+            self.scheduler = PollScheduler()
+        self.fd = None
+        self.wd = None
+        self.content = None
+        self.notified = False
+
+    def open(self, buffer):
+        self.fd = os.open( self.path, os.O_RDONLY | os.O_CLOEXEC )
+        try:
+            ## reading content arms sysfs notification
+            self.content = readContent( self.fd, buffer )
+        except OSError:
+            self.close()
+            raise
+
+    def close(self):
+        if self.fd is not None:
+            os.close( self.fd )
+            self.fd = None
+
+    def refresh(self, buffer):
+        """Read attribute's content. Returns True if content changed."""
+        content = readContent( self.fd, buffer )
+        if content == self.content:
+            return False
+        self.content = content
+        return True
+
+
+def readContent(fd, buffer):
+    """Read file content from it's beginning using preallocated buffer (memoryview)."""
+    size = os.preadv( fd, [ buffer ], 0 )
+    return bytes( buffer[ :size ] )
+
+
+def readFileContent(path, buffer):
+    """Read whole content of small file using preallocated buffer (memoryview)."""
+    fd = os.open( path, os.O_RDONLY | os.O_CLOEXEC )
+    try:
+        size = os.readv( fd, [ buffer ] )
+        return bytes( buffer[ :size ] )
+    finally:
+        os.close( fd )
+
+
+def allowedFiles(path, files):
+    """Return list of absolute paths of 'files' (absolute or relative to 'path')."""
+    return sorted( set( os.path.join( path, item ) for item in files ) )
+
+
+def listAttributes(path, recursive=False):
+    """Return list of regular files under given path (symbolic links are skipped)."""
+    if os.path.isdir( path ) is False:
+        return [ path ]
+    ret = []
+    with os.scandir( path ) as entries:
+        for entry in entries:
+            if entry.is_symlink():
+                continue
+            if entry.is_file():
+                ret.append( entry.path )
+            elif recursive and entry.is_dir():
+                ret.extend( listAttributes( entry.path, recursive ) )
+    return ret
+
+
+class Inotify():
+    """Minimal inotify wrapper."""
+
+    IN_MODIFY       = 0x00000002
+    IN_CLOSE_WRITE  = 0x00000008
+    IN_NONBLOCK     = os.O_NONBLOCK
+    IN_CLOEXEC      = os.O_CLOEXEC
+
+    EVENT_HEADER = struct.Struct( "iIII" )
+
+    def __init__(self, libc, fd):
+        self.libc = libc
+        self.fd = fd
+
+    @classmethod
+    def create(cls):
+        """Create inotify instance. Returns None if inotify is not supported."""
+        try:
+            libc = ctypes.CDLL( None, use_errno=True )
+            fd = libc.inotify_init1( cls.IN_NONBLOCK | cls.IN_CLOEXEC )
+        except (OSError, AttributeError):
+            return None
+        if fd < 0:
+            _LOGGER.warning( "unable to initialize inotify: %s", os.strerror( ctypes.get_errno() ) )
+            return None
+        return cls( libc, fd )
+
+    def addWatch(self, path):
+        wd = self.libc.inotify_add_watch( self.fd, os.fsencode( path ), self.IN_MODIFY | self.IN_CLOSE_WRITE )
+        if wd < 0:
+            _LOGGER.debug( "unable to add inotify watch for %s: %s", path, os.strerror( ctypes.get_errno() ) )
+            return None
+        return wd
+
+    def removeWatch(self, wd):
+        self.libc.inotify_rm_watch( self.fd, wd )
+
+    def readEvents(self):
+        """Return list of watch descriptors of received events."""
+        ret = []
+        while True:
+            try:
+                data = os.read( self.fd, 4096 )
+            except BlockingIOError:
+                return ret
+            offset = 0
+            while offset < len( data ):
+                wd, _, _, nameLen = self.EVENT_HEADER.unpack_from( data, offset )
+                offset += self.EVENT_HEADER.size + nameLen
+                ret.append( wd )
+
+    def close(self):
+        os.close( self.fd )
+
+
+## classes of polling observer are loaded on demand, because watchdog is big dependency
+POLLING_NAMES = [ "AdaptivePollingEmitter", "FileContentObserver", "StatResult", "ContentStatResult" ]
+
+
+def __getattr__(name):
+    if name in POLLING_NAMES:
+        from . import sysfspolling
+        return getattr( sysfspolling, name )
+    raise AttributeError( "module %r has no attribute %r" % ( __name__, name ) )
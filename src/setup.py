@@ -4,6 +4,7 @@ import os
 from typing import Dict, Any
 
 from setuptools import setup, find_packages
+from setuptools.command.build_py import build_py
 
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -25,7 +26,7 @@ def read_list(file_path):
 packages_list = find_packages(include=["clevokeyboardcontrol", "clevokeyboardcontrol.*"])
 
 ## additional data to install
-packages_data: Dict[str, Any] = {"clevokeyboardcontrol": ["ui/*.ui"]}
+packages_data: Dict[str, Any] = {"clevokeyboardcontrol": ["ui/*.ui", "gui/img/*.png", "gui/generated/*.py"]}
 
 ## additional scripts to install
 additional_scripts = ['clevokbdctl']
@@ -33,6 +34,21 @@ additional_scripts = ['clevokbdctl']
 requirements_path = os.path.join(SCRIPT_DIR, "requirements.txt")
 install_reqs = read_list(requirements_path)
 
+
+class BuildPyCommand(build_py):
+    """Precompile UI files and resources before copying package files."""
+
+    def run(self):
+        try:
+            from clevokeyboardcontrol.gui import uicompiler
+
+            uicompiler.compileAll()
+        except (ImportError, OSError) as exc:
+            ## UI will be compiled on first run or loaded in runtime
+            print("unable to precompile UI files:", exc)
+        super().run()
+
+
 ## every time setup info changes then version number should be increased
 
 setup(
@@ -46,4 +62,5 @@ setup(
     package_data=packages_data,
     scripts=additional_scripts,
     install_requires=install_reqs,
+    cmdclass={"build_py": BuildPyCommand},
 )
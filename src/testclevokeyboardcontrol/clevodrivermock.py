@@ -28,6 +28,7 @@ _LOGGER = logging.getLogger(__name__)
 class ClevoDriverMock(ClevoDriver):
 
     def __init__(self):
+        super().__init__()
         self.data = dict()
         self.data[ FilePath.STATE_PATH ]         = 0
         self.data[ FilePath.BRIGHTNESS_PATH ]    = 0
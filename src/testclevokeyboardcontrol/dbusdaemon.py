@@ -0,0 +1,50 @@
+#     ClevoKeyboardControl. Control of keyboard backlights.
+#
+#     Copyright (C) 2018  Arkadiusz Netczuk <dev.arnet@gmail.com>
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+import shutil
+import signal
+import subprocess
+
+
+class PrivateBus():
+    """Private instance of 'dbus-daemon' for tests."""
+
+    def __init__(self):
+        self.process = None
+        self.address = None
+
+    @staticmethod
+    def isAvailable():
+        return shutil.which( "dbus-daemon" ) is not None
+
+    def start(self):
+        self.process = subprocess.Popen( [ "dbus-daemon", "--session", "--nofork", "--nopidfile", "--print-address=1" ],
+                                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL )
+        self.address = self.process.stdout.readline().decode().strip()
+        if not self.address:
+            self.stop()
+            raise RuntimeError( "unable to start dbus-daemon" )
+        return self.address
+
+    def stop(self):
+        if self.process is None:
+            return
+        self.process.send_signal( signal.SIGTERM )
+        self.process.wait( 5.0 )
+        self.process.stdout.close()
+        self.process = None
@@ -0,0 +1,122 @@
+#     ClevoKeyboardControl. Control of keyboard backlights.
+#
+#     Copyright (C) 2018  Arkadiusz Netczuk <dev.arnet@gmail.com>
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+import sys
+import unittest
+
+from testclevokeyboardcontrol.clevodrivermock import ClevoDriverMock
+
+from clevokeyboardcontrol.clevoio import FilePath
+from clevokeyboardcontrol.startuptrace import StartupTracer
+from clevokeyboardcontrol.gui.qt import QApplication
+
+from clevokeyboardcontrol.gui.driver_widget import DriverWidget as TestWidget
+
+
+app = QApplication(sys.argv)
+
+
+class FileDriverMock(ClevoDriverMock):
+
+    def __init__(self):
+        super().__init__()
+        self.readCounter = 0
+        self.stored = []
+        self.readOnly = False
+
+    def getFilePath(self, fileType: FilePath):
+        return "/driver/" + fileType.name.lower()
+
+    def _read(self, fileType: FilePath):
+        self.readCounter += 1
+        return super()._read( fileType )
+
+    def _store(self, fileType: FilePath, value: str):
+        if self.readOnly:
+            raise PermissionError( "permission denied" )
+        self.stored.append( fileType )
+        super()._store( fileType, value )
+
+
+class DriverWidgetTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        self.driver = FileDriverMock()
+        self.widget = TestWidget()
+        self.widget.attachDriver( self.driver )
+        self.changes = []
+        self.widget.attributeChanged.connect( self._attributeChanged )
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        self.widget.stop()
+        self.widget = None
+        self.driver = None
+
+    def test_sysfsChanged_partial(self):
+        self.widget._sysfsChanged( { "/driver/brightness_path": b"120\n" } )
+        self.assertEqual( self.widget.ui.brightnessSlider.value(), 120 )
+        self.assertEqual( self.changes, [ ( FilePath.BRIGHTNESS_PATH, 120 ) ] )
+        self.assertEqual( self.driver.readCounter, 0 )
+        ## value is served from cache
+        self.assertEqual( self.driver.getBrightness(), 120 )
+
+    def test_sysfsChanged_color(self):
+        self.widget._sysfsChanged( { "/driver/color_left_path": b"00ff00\n" } )
+        color = self.widget.ui.leftColor.getColor()
+        self.assertEqual( ( color.red(), color.green(), color.blue() ), ( 0, 255, 0 ) )
+
+    def test_applyDriverState(self):
+        state = self.driver.readDriverState()
+        state = state.replace( FilePath.COLOR_LEFT_PATH, 0x00ff00 )
+        self.widget.applyDriverState( state )
+        color = self.widget.ui.leftColor.getColor()
+        self.assertEqual( ( color.red(), color.green(), color.blue() ), ( 0, 255, 0 ) )
+        ## wait for writer
+        self.widget.stop()
+        ## only differing attribute is written
+        self.assertEqual( self.driver.stored, [ FilePath.COLOR_LEFT_PATH ] )
+        self.assertEqual( self.driver.readDriverState(), state )
+
+    def test_restoreDriver_trace(self):
+        tracer = StartupTracer.instance()
+        tracer.start()
+        state = self.driver.readDriverState().replace( FilePath.BRIGHTNESS_PATH, 20 )
+        self.widget.restoreDriver( state )
+        settled = []
+        tracer.whenSettled( lambda: settled.append( True ) )
+        self.assertEqual( settled, [] )
+        self.widget.stop()
+        app.processEvents()
+        spans = tracer.finish()
+        self.assertEqual( settled, [ True ] )
+        restoreSpan = [ item for item in spans if item.name == "driver restore" ][0]
+        self.assertIsNotNone( restoreSpan.end )
+
+    def test_restoreDriver_permissionDenied(self):
+        denied = []
+        self.widget.permissionDenied.connect( lambda: denied.append( True ) )
+        self.driver.readOnly = True
+        state = self.driver.readDriverState().replace( FilePath.BRIGHTNESS_PATH, 20 )
+        self.widget.restoreDriver( state )
+        self.widget.stop()
+        app.processEvents()
+        self.assertEqual( denied, [ True ] )
+
+    def _attributeChanged(self, fileType, value):
+        self.changes.append( ( fileType, value ) )
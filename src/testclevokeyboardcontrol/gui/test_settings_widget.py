@@ -18,10 +18,12 @@
 
 
 import sys
+import os
 import unittest
 import logging
+import tempfile
 
-# from testclevokeyboardcontrol.clevodrivermock import ClevoDriverMock
+from testclevokeyboardcontrol.clevodrivermock import ClevoDriverMock
 
 from clevokeyboardcontrol.gui.qt import QApplication, QtCore
 
@@ -49,7 +51,7 @@ class SettingsWidgetTest(unittest.TestCase):
         settings = QtCore.QSettings(QtCore.QSettings.IniFormat, QtCore.QSettings.UserScope, "test-org", "test-app", None)
 
         self.widget.loadSettings(settings)
-        self.assertEqual(self.receiver.driverCounter, 1)        ## receives empty dict
+        self.assertEqual(self.receiver.driverCounter, 1)        ## receives empty state
         self.assertEqual(self.receiver.themeCounter, 0)
 
     def test_saveSettings_default(self):
@@ -74,15 +76,71 @@ class SettingsWidgetTest(unittest.TestCase):
         self.assertEqual( trayTheme, 'WHITE' )
         self.assertEqual( turnLEDValue, True )
 
+    def test_driverState_persist(self):
+        driver = ClevoDriverMock()
+        driver.setBrightness( 123 )
+        driver.setColorRight( 1, 2, 3 )
+        self.widget.readDriverState( driver )
+
+        with tempfile.TemporaryDirectory() as tmpDir:
+            settings = QtCore.QSettings( os.path.join( tmpDir, "settings.ini" ), QtCore.QSettings.IniFormat )
+            self.widget.saveSettings( settings )
+
+            widget = TestWidget()
+            widget.restoreDriver.connect( self.receiver.driverChanged )
+            widget.loadSettings( settings )
+
+        self.assertEqual( self.receiver.driverState, driver.readDriverState() )
+
+    def test_settingsChanged(self):
+        changes = []
+        self.widget.settingsChanged.connect( lambda: changes.append( True ) )
+        driver = ClevoDriverMock()
+        self.widget.readDriverState( driver )
+        self.assertEqual( len( changes ), 1 )
+        self.widget.readDriverState( driver )
+        self.assertEqual( len( changes ), 1 )
+        snapshot = self.widget.settingsSnapshot()
+        self.widget.ui.restoreSuspendCB.setChecked( False )
+        self.assertEqual( len( changes ), 2 )
+        self.assertNotEqual( self.widget.settingsSnapshot(), snapshot )
+
+    def test_profiles(self):
+        driver = ClevoDriverMock()
+        driver.setBrightness( 10 )
+        self.widget.readDriverState( driver )
+        names = []
+        self.widget.profilesChanged.connect( names.append )
+        self.assertTrue( self.widget.storeProfile( "night" ) )
+        self.assertEqual( names, [ [ "night" ] ] )
+        self.assertEqual( self.widget.currentProfile(), "night" )
+
+        with tempfile.TemporaryDirectory() as tmpDir:
+            settings = QtCore.QSettings( os.path.join( tmpDir, "settings.ini" ), QtCore.QSettings.IniFormat )
+            settings.setValue( "Profiles/external", "00" * 12 )
+            self.widget.saveSettings( settings )
+
+            widget = TestWidget()
+            widget.loadSettings( settings )
+            self.assertEqual( widget.getProfileNames(), [ "external", "night" ] )
+            self.assertEqual( widget.getProfile( "night" ), driver.readDriverState() )
+
+            widget.removeProfile( "external" )
+            widget.saveSettings( settings )
+            widget.loadSettings( settings )
+            self.assertEqual( widget.getProfileNames(), [ "night" ] )
+
 
 class SettingsReceiver():
 
     def __init__(self):
         self.driverCounter = 0
         self.themeCounter = 0
+        self.driverState = None
 
-    def driverChanged(self, driverState: dict):
+    def driverChanged(self, driverState):
         self.driverCounter += 1
+        self.driverState = driverState
 
     def themeChanged(self):
         self.themeCounter += 1
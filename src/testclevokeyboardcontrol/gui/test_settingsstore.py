@@ -0,0 +1,100 @@
+#     ClevoKeyboardControl. Control of keyboard backlights.
+#
+#     Copyright (C) 2018  Arkadiusz Netczuk <dev.arnet@gmail.com>
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+import sys
+import unittest
+import logging
+import time
+
+from clevokeyboardcontrol.gui.qt import QApplication
+
+from clevokeyboardcontrol.gui.settingsstore import DebouncedSaver, getSettings
+
+
+_LOGGER = logging.getLogger(__name__)
+app = QApplication(sys.argv)
+
+
+class DebouncedSaverTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        self.saveCounter = 0
+        self.value = 0
+        self.saver = DebouncedSaver( None, self._save, lambda: self.value, delay=0.05 )
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        self.saver = None
+
+    def _save(self):
+        self.saveCounter += 1
+
+    def processEvents(self, duration):
+        endTime = time.monotonic() + duration
+        while time.monotonic() < endTime:
+            app.processEvents()
+            time.sleep( 0.005 )
+
+    def test_debounce(self):
+        for value in range( 5 ):
+            self.value = value
+            self.saver.schedule()
+            self.processEvents( 0.01 )
+        self.assertEqual( self.saveCounter, 0 )
+        self.processEvents( 0.2 )
+        self.assertEqual( self.saveCounter, 1 )
+        self.assertFalse( self.saver.isPending() )
+
+    def test_unchanged(self):
+        self.saver.setSaved()
+        self.saver.schedule()
+        self.processEvents( 0.2 )
+        self.assertEqual( self.saveCounter, 0 )
+        self.assertFalse( self.saver.flush( force=True ) )
+        self.value = 1
+        self.assertTrue( self.saver.flush( force=True ) )
+        self.assertEqual( self.saveCounter, 1 )
+
+    def test_paused(self):
+        self.saver.setSaved()
+        self.saver.setPaused( True )
+        self.value = 1
+        self.saver.schedule()
+        self.processEvents( 0.2 )
+        self.assertEqual( self.saveCounter, 0 )
+        ## change reverted before resume
+        self.value = 0
+        self.saver.setPaused( False )
+        self.processEvents( 0.2 )
+        self.assertEqual( self.saveCounter, 0 )
+
+    def test_paused_flush(self):
+        self.saver.setSaved()
+        self.value = 1
+        self.saver.schedule()
+        ## pending change is saved before pause
+        self.saver.setPaused( True )
+        self.assertEqual( self.saveCounter, 1 )
+        self.value = 2
+        self.saver.schedule()
+        self.assertFalse( self.saver.flush( force=True ) )
+        self.assertEqual( self.saveCounter, 1 )
+
+    def test_getSettings(self):
+        self.assertIs( getSettings(), getSettings() )
@@ -17,15 +17,25 @@
 #
 
 
+import sys
 import unittest
 import logging
+import time
 
-from clevokeyboardcontrol.gui.suspenddetector import QSuspendSingleton
+from clevokeyboardcontrol.dbusclient import DBusConnection
+from clevokeyboardcontrol.suspend import SuspendDetector
+from clevokeyboardcontrol.gui.qt import QApplication
+from clevokeyboardcontrol.gui.suspenddetector import QSuspendSingleton, QSuspendTimer, QSleepListener
+
+from testclevokeyboardcontrol.dbusdaemon import PrivateBus
 
 
 _LOGGER = logging.getLogger(__name__)
 
 
+app = QApplication(sys.argv)
+
+
 class QSuspendSingletonTest(unittest.TestCase):
     def setUp(self):
         ## Called before testfunction is executed
@@ -45,3 +55,74 @@ class QSuspendSingletonTest(unittest.TestCase):
         detector2 = QSuspendSingleton.instance()
         self.assertEqual(detector1, detector2)
 
+
+class QSuspendTimerTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        self.offset = 0.0
+        self.resumed = 0
+        detector = SuspendDetector( boottime=lambda: 100.0 + self.offset, monotonic=lambda: 100.0 )
+        self.timer = QSuspendTimer( None, detector )
+        self.timer.resumed.connect( self._resumed )
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        self.timer.stop()
+        self.timer = None
+
+    def _resumed(self):
+        self.resumed += 1
+
+    def test_checkResumed(self):
+        self.timer.start()
+        self.assertFalse( self.timer.checkResumed() )
+        self.offset += 0.1
+        self.assertFalse( self.timer.checkResumed() )
+        self.offset += 60.0
+        self.assertTrue( self.timer.checkResumed() )
+        self.assertFalse( self.timer.checkResumed() )
+        self.assertEqual( self.resumed, 1 )
+
+
+@unittest.skipUnless( PrivateBus.isAvailable(), "dbus-daemon not available" )
+class QSleepListenerTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        self.bus = PrivateBus()
+        self.bus.start()
+        self.resumed = 0
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        self.bus.stop()
+        self.bus = None
+
+    def _resumed(self):
+        self.resumed += 1
+
+    def test_prepareForSleep(self):
+        listener = QSleepListener( None, self.bus.address )
+        listener.resumed.connect( self._resumed )
+        self.assertTrue( listener.start() )
+        sender = DBusConnection( self.bus.address )
+        sender.connect()
+        try:
+            ## wait for subscription
+            time.sleep( 0.1 )
+            app.processEvents()
+            sender.emitSignal( QSleepListener.LOGIN_PATH, QSleepListener.LOGIN_MANAGER_INTERFACE, "PrepareForSleep",
+                               "b", [ True ] )
+            sender.emitSignal( QSleepListener.LOGIN_PATH, QSleepListener.LOGIN_MANAGER_INTERFACE, "PrepareForSleep",
+                               "b", [ False ] )
+            endTime = time.monotonic() + 5.0
+            while self.resumed == 0 and time.monotonic() < endTime:
+                app.processEvents()
+                time.sleep( 0.01 )
+            self.assertEqual( self.resumed, 1 )
+        finally:
+            sender.close()
+            listener.stop()
+
+    def test_noBus(self):
+        listener = QSleepListener( None, "unix:path=/nonexistent/bus" )
+        self.assertFalse( listener.start() )
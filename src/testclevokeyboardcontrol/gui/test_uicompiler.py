@@ -0,0 +1,69 @@
+#     ClevoKeyboardControl. Control of keyboard backlights.
+#
+#     Copyright (C) 2018  Arkadiusz Netczuk <dev.arnet@gmail.com>
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+import sys
+import unittest
+import tempfile
+
+from clevokeyboardcontrol.gui.qt import QApplication, QtCore, QtWidgets
+import clevokeyboardcontrol.gui.uicompiler as uicompiler
+
+
+app = QApplication(sys.argv)
+
+
+class UiCompilerTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.generatedDir = uicompiler.GENERATED_DIR
+        uicompiler.GENERATED_DIR = self.tmpDir.name
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        uicompiler.GENERATED_DIR = self.generatedDir
+        self.tmpDir.cleanup()
+
+    def test_loadUiModule_missing(self):
+        self.assertEqual( uicompiler.loadUiModule( "settings_widget.ui" ), None )
+
+    def test_compileUi(self):
+        modulePath = uicompiler.compileUi( "settings_widget.ui" )
+        header = uicompiler.readHeader( modulePath )
+        self.assertEqual( header[ "form class" ], "Ui_settingsWidget" )
+        self.assertEqual( header[ "base class" ], "QWidget" )
+
+        formClass, baseClass = uicompiler.loadUiModule( "settings_widget.ui" )
+        self.assertEqual( formClass.__name__, "Ui_settingsWidget" )
+        self.assertIs( baseClass, QtWidgets.QWidget )
+
+    def test_loadUiModule_stale(self):
+        modulePath = uicompiler.compileUi( "settings_widget.ui" )
+        with open( modulePath, "r", encoding="utf-8" ) as moduleFile:
+            content = moduleFile.read()
+        header = uicompiler.readHeader( modulePath )
+        with open( modulePath, "w", encoding="utf-8" ) as moduleFile:
+            moduleFile.write( content.replace( header[ "source hash" ], "0" * 40 ) )
+        self.assertEqual( uicompiler.loadUiModule( "settings_widget.ui" ), None )
+
+    def test_resources(self):
+        self.assertFalse( uicompiler.loadResources() )
+        uicompiler.compileResources()
+        self.assertTrue( uicompiler.loadResources() )
+        self.assertTrue( QtCore.QFile.exists( ":" + uicompiler.RESOURCES_PREFIX + "/keyboard-black.png" ) )
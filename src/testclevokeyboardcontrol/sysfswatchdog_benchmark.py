@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+#
+#     ClevoKeyboardControl. Control of keyboard backlights.
+#
+#     Copyright (C) 2018  Arkadiusz Netczuk <dev.arnet@gmail.com>
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+##
+## Microbenchmark of FileContentObserver's poll.
+##
+## Compares hash based StatResult with raw content mode on directory
+## shaped like '/sys/devices/platform/tuxedo_keyboard'.
+##
+
+
+import sys
+import os
+
+### append clevo library
+script_dir = os.path.dirname(__file__)
+sys.path.append(os.path.abspath( os.path.join(script_dir, "..") ))
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+
+from watchdog.utils.dirsnapshot import DirectorySnapshot, DirectorySnapshotDiff
+
+from clevokeyboardcontrol.sysfspolling import FileContentObserver
+
+
+DRIVER_FILES = {
+    "state":         "1\n",
+    "brightness":    "200\n",
+    "mode":          "0\n",
+    "color_left":    "ff0000\n",
+    "color_center":  "00ff00\n",
+    "color_right":   "0000ff\n",
+    "uevent":        "DRIVER=tuxedo_keyboard\nMODALIAS=platform:tuxedo_keyboard\n",
+    "modalias":      "platform:tuxedo_keyboard\n",
+    "driver_override":  "(null)\n",
+    "power/control": "auto\n",
+    "power/runtime_status": "unsupported\n",
+    "power/runtime_active_time": "0\n",
+    "power/runtime_suspended_time": "0\n",
+    "power/autosuspend_delay_ms": "0\n"
+}
+
+
+def createDriverDir( rootDir ):
+    for name, content in DRIVER_FILES.items():
+        filePath = os.path.join( rootDir, name )
+        os.makedirs( os.path.dirname( filePath ), exist_ok=True )
+        with open( filePath, "w" ) as file:
+            file.write( content )
+    os.symlink( rootDir, os.path.join( rootDir, "subsystem" ) )
+
+
+def poll( observer, path, refSnapshot ):
+    snapshot = DirectorySnapshot( path, recursive=False, stat=observer.stat, listdir=os.scandir )
+    DirectorySnapshotDiff( refSnapshot, snapshot )
+    return snapshot
+
+
+def measure( contentMode, path, polls ):
+    observer = FileContentObserver( contentMode=contentMode )
+    snapshot = DirectorySnapshot( path, recursive=False, stat=observer.stat, listdir=os.scandir )
+
+    startTime = time.process_time()
+    for _ in range(polls):
+        snapshot = poll( observer, path, snapshot )
+    cpuTime = ( time.process_time() - startTime ) / polls
+
+    ## memory allocated during single poll
+    tracemalloc.start()
+    snapshot = poll( observer, path, snapshot )
+    _, peakMemory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return ( cpuTime, peakMemory )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='FileContentObserver poll benchmark')
+    parser.add_argument('-n', '--polls', action='store', type=int, default=5000, help='Number of polls' )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpDir:
+        createDriverDir( tmpDir )
+        ## warm up
+        measure( False, tmpDir, 10 )
+
+        hashResult = measure( False, tmpDir, args.polls )
+        contentResult = measure( True, tmpDir, args.polls )
+
+    print( "mode       per-poll CPU [us]   per-poll allocation peak [B]" )
+    print( "hash       {:17.2f}   {:28}".format( hashResult[0] * 1000000, hashResult[1] ) )
+    print( "content    {:17.2f}   {:28}".format( contentResult[0] * 1000000, contentResult[1] ) )
+    print( "CPU time reduced by {:.1f}%".format( ( 1.0 - contentResult[0] / hashResult[0] ) * 100.0 ) )
+    print( "allocations reduced by {:.1f}%".format( ( 1.0 - contentResult[1] / hashResult[1] ) * 100.0 ) )
+
+
+if __name__ == '__main__':
+    main()
@@ -18,9 +18,13 @@
 
 
 import unittest
+import os
+import tempfile
 
 from testclevokeyboardcontrol.clevodrivermock import ClevoDriverMock
 
+from clevokeyboardcontrol.clevoio import TuxedoDriver, FilePath, Mode, DriverState
+
 
 class ClevoDriverTest(unittest.TestCase):
     def setUp(self):
@@ -42,3 +46,183 @@ class ClevoDriverTest(unittest.TestCase):
 
         brightness = driver.getBrightness()
         self.assertEqual(brightness, 222)
+
+    def test_setDriverState_reconcile(self):
+        driver = ClevoDriverMock()
+        driver.setBrightness( 222 )
+        driver.setColorLeft( 0, 255, 0 )
+        state = driver.readDriverState()
+
+        driver = StoreRecorderMock()
+        driver.setColorLeft( 0, 255, 0 )
+        driver.stored.clear()
+        report = driver.setDriverState( state, reconcile=True )
+
+        self.assertEqual( driver.stored, [ FilePath.BRIGHTNESS_PATH ] )
+        self.assertEqual( report, { FilePath.BRIGHTNESS_PATH: ( 0, 222 ) } )
+
+        report = driver.setDriverState( state, reconcile=True )
+        self.assertEqual( report, {} )
+
+    def test_setDriverState_currentState(self):
+        driver = StoreRecorderMock()
+        currentState = driver.readDriverState()
+        driver.reads = 0
+        state = currentState.replace( FilePath.BRIGHTNESS_PATH, 50 )
+        report = driver.setDriverState( state, reconcile=True, currentState=currentState )
+        self.assertEqual( driver.reads, 0 )
+        self.assertEqual( driver.stored, [ FilePath.BRIGHTNESS_PATH ] )
+        self.assertEqual( report, { FilePath.BRIGHTNESS_PATH: ( 0, 50 ) } )
+
+    def test_setDriverState_order(self):
+        driver = StoreRecorderMock()
+        state = DriverState( True, 10, Mode.Custom, 0xff0000, 0, 0 )
+        driver.setDriverState( state, reconcile=True )
+        self.assertEqual( driver.stored, [ FilePath.COLOR_LEFT_PATH,
+                                           FilePath.BRIGHTNESS_PATH, FilePath.STATE_PATH ] )
+
+        driver.stored.clear()
+        state = DriverState( False, 20, Mode.Custom, 0x00ff00, 0, 0 )
+        driver.setDriverState( state, reconcile=True )
+        self.assertEqual( driver.stored, [ FilePath.STATE_PATH,
+                                           FilePath.COLOR_LEFT_PATH, FilePath.BRIGHTNESS_PATH ] )
+
+    def test_shadowCache_elideWrite(self):
+        driver = ClevoDriverMock()
+        driver.setShadowCacheEnabled( True )
+        driver.setColorLeft( 0, 255, 0 )
+        driver.data[ FilePath.COLOR_LEFT_PATH ] = "00ff00"          ## driver's format
+        driver.setColorLeft( 0, 255, 0 )
+        driver.setBrightness( 100 )
+        driver.setBrightness( 100 )
+        self.assertEqual( driver.shadowCache.elidedWrites, 2 )
+
+    def test_shadowCache_read(self):
+        driver = ClevoDriverMock()
+        driver.setShadowCacheEnabled( True )
+        driver.setBrightness( 100 )
+        driver.data[ FilePath.BRIGHTNESS_PATH ] = "50"              ## external change
+        self.assertEqual( driver.getBrightness(), 100 )
+        self.assertEqual( driver.shadowCache.cacheHits, 1 )
+
+        driver.invalidateCache()
+        self.assertEqual( driver.getBrightness(), 50 )
+        self.assertEqual( driver.shadowCache.cacheHits, 1 )
+
+    def test_shadowCache_disabled(self):
+        driver = ClevoDriverMock()
+        driver.setBrightness( 100 )
+        driver.data[ FilePath.BRIGHTNESS_PATH ] = "50"
+        self.assertEqual( driver.getBrightness(), 50 )
+
+
+class DriverStateTest(unittest.TestCase):
+
+    def test_fields(self):
+        state = DriverState( True, 120, Mode.Wave, 0xff0000, 0x00ff00, 0x0000ff )
+        self.assertEqual( state.state, True )
+        self.assertEqual( state.brightness, 120 )
+        self.assertEqual( state.mode, Mode.Wave )
+        self.assertEqual( state.colorLeft, 0xff0000 )
+        self.assertEqual( state.colorCenter, 0x00ff00 )
+        self.assertEqual( state.colorRight, 0x0000ff )
+
+    def test_immutable(self):
+        state = DriverState()
+        with self.assertRaises( AttributeError ):
+            state.brightness = 10
+
+    def test_eq_hash(self):
+        state1 = DriverState( True, 120, Mode.Wave, 0xff0000, 0, 0 )
+        state2 = DriverState( True, 120, Mode.Wave, 0xff0000, 0, 0 )
+        self.assertEqual( state1, state2 )
+        self.assertEqual( hash(state1), hash(state2) )
+        self.assertNotEqual( state1, DriverState() )
+
+    def test_diff(self):
+        state1 = DriverState( True, 120, Mode.Wave, 0xff0000, 0, 0 )
+        state2 = state1.replace( FilePath.BRIGHTNESS_PATH, 10 ).replace( FilePath.COLOR_RIGHT_PATH, 0xffffff )
+        self.assertEqual( state1.diff( state1 ), [] )
+        self.assertEqual( state1.diff( state2 ), [ FilePath.BRIGHTNESS_PATH, FilePath.COLOR_RIGHT_PATH ] )
+        self.assertEqual( state2.brightness, 10 )
+
+    def test_bytes(self):
+        state = DriverState( True, 120, Mode.Wave, 0xff0000, 0x00ff00, 0x0000ff )
+        data = state.toBytes()
+        self.assertEqual( len(data), DriverState.BYTES_SIZE )
+        self.assertEqual( DriverState.fromBytes( data ), state )
+
+    def test_dict(self):
+        state = DriverState( True, 120, Mode.Wave, 0xff0000, 0x00ff00, 0x0000ff )
+        stateDict = state.toDict()
+        self.assertEqual( stateDict[ "COLOR_LEFT_PATH" ], "0xff0000" )
+        self.assertEqual( stateDict[ "MODE_PATH" ], "7" )
+        self.assertEqual( DriverState.fromDict( stateDict ), state )
+
+
+class StoreRecorderMock(ClevoDriverMock):
+
+    def __init__(self):
+        super().__init__()
+        self.stored = []
+        self.reads = 0
+
+    def _read(self, fileType: FilePath):
+        self.reads += 1
+        return super()._read( fileType )
+
+    def _store(self, fileType: FilePath, value: str):
+        self.stored.append( fileType )
+        super()._store( fileType, value )
+
+
+class TuxedoDriverTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.filePaths = dict()
+        for key in FilePath:
+            path = os.path.join( self.tmpDir.name, key.name.lower() )
+            with open( path, "w" ) as file:
+                file.write( "0\n" )
+            self.filePaths[ key ] = path
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        self.tmpDir.cleanup()
+        self.tmpDir = None
+
+    def createDriver(self, cachedIO):
+        driver = TuxedoDriver( cachedIO=cachedIO )
+        driver.filePaths = self.filePaths
+        return driver
+
+    def test_readWrite(self):
+        driver = self.createDriver( False )
+        driver.setBrightness( 120 )
+        driver.setMode( Mode.Wave )
+        self.assertEqual( driver.getBrightness(), 120 )
+        self.assertEqual( driver.getMode(), Mode.Wave )
+
+    def test_readWrite_cached(self):
+        driver = self.createDriver( True )
+        try:
+            driver.setBrightness( 120 )
+            driver.setColorLeft( 255, 0, 0 )
+            self.assertEqual( driver.getBrightness(), 120 )
+            self.assertEqual( driver.getColorLeft(), [ 255, 0, 0 ] )
+            self.assertEqual( len( driver.filePool.descriptors ), 2 )
+        finally:
+            driver.close()
+        self.assertEqual( len( driver.filePool.descriptors ), 0 )
+
+    def test_read_reopen(self):
+        driver = self.createDriver( True )
+        try:
+            driver.setBrightness( 120 )
+            fd = driver.filePool.descriptors[ self.filePaths[ FilePath.BRIGHTNESS_PATH ] ][0]
+            ## invalidate descriptor
+            os.close( fd )
+            self.assertEqual( driver.getBrightness(), 120 )
+        finally:
+            driver.close()
@@ -0,0 +1,127 @@
+#     ClevoKeyboardControl. Control of keyboard backlights.
+#
+#     Copyright (C) 2018  Arkadiusz Netczuk <dev.arnet@gmail.com>
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+import unittest
+import os
+import io
+import json
+import gzip
+import tempfile
+
+from testclevokeyboardcontrol.clevodrivermock import ClevoDriverMock
+
+from clevokeyboardcontrol.cli import runCommand
+from clevokeyboardcontrol.clevoio import DriverState, Mode
+from clevokeyboardcontrol.settings import IniSettings, loadDriverState, saveDriverState
+
+
+class CommandTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.settingsPath = os.path.join( self.tmpDir.name, "settings.ini" )
+        self.driver = ClevoDriverMock()
+        self.output = io.StringIO()
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        self.tmpDir.cleanup()
+
+    def execute(self, *args):
+        argv = list( args ) + [ "--settings", self.settingsPath ]
+        return runCommand( argv, self.driver, self.output )
+
+    def test_set(self):
+        exitCode = self.execute( "set", "--state", "on", "--brightness", "300", "--mode", "wave",
+                                 "--color-left", "#ff0000", "--color-right", "0000ff" )
+        self.assertEqual( exitCode, 0 )
+        state = self.driver.readDriverState()
+        self.assertEqual( state, DriverState( True, 255, Mode.Wave, 0xff0000, 0, 0x0000ff ) )
+        self.assertEqual( os.path.exists( self.settingsPath ), False )
+
+    def test_set_save(self):
+        exitCode = self.execute( "set", "--brightness", "10", "--save" )
+        self.assertEqual( exitCode, 0 )
+        state = loadDriverState( IniSettings( self.settingsPath ) )
+        self.assertEqual( state.brightness, 10 )
+
+    def test_set_invalid(self):
+        with self.assertRaises( SystemExit ):
+            self.execute( "set", "--color-left", "red" )
+
+    def test_get_json(self):
+        self.driver.setColorCenter( 0, 255, 0 )
+        self.driver.setBrightness( 120 )
+        exitCode = self.execute( "get", "--json" )
+        self.assertEqual( exitCode, 0 )
+        values = json.loads( self.output.getvalue() )
+        self.assertEqual( values, { "state": False, "brightness": 120, "mode": "Custom",
+                                    "colorLeft": "000000", "colorCenter": "00ff00", "colorRight": "000000" } )
+
+    def test_restore(self):
+        self.assertEqual( self.execute( "restore" ), 1 )
+
+        state = DriverState( True, 50, Mode.Breathe, 0x123456, 0, 0 )
+        settings = IniSettings( self.settingsPath )
+        saveDriverState( settings, state )
+        settings.sync()
+        self.assertEqual( self.execute( "restore" ), 0 )
+        self.assertEqual( self.driver.readDriverState(), state )
+
+    def test_logs(self):
+        logFile = os.path.join( self.tmpDir.name, "log.txt" )
+        with gzip.open( logFile + ".20200101-120000-000000.gz", "wt" ) as segmentFile:
+            segmentFile.write( "first\n" )
+        with open( logFile + ".20200102-120000-000000", "w" ) as segmentFile:
+            segmentFile.write( "second\n" )
+        with open( logFile, "w" ) as currentFile:
+            currentFile.write( "current\n" )
+        exitCode = self.execute( "logs", "--file", logFile )
+        self.assertEqual( exitCode, 0 )
+        self.assertEqual( self.output.getvalue(), "first\nsecond\ncurrent\n" )
+
+    def test_logs_invalid(self):
+        logFile = os.path.join( self.tmpDir.name, "logdir" )
+        os.makedirs( logFile )
+        exitCode = self.execute( "logs", "--file", logFile )
+        self.assertEqual( exitCode, 1 )
+
+    def test_profile(self):
+        self.driver.setBrightness( 50 )
+        self.assertEqual( self.execute( "profile", "store", "work" ), 0 )
+        self.driver.setBrightness( 5 )
+        self.assertEqual( self.execute( "profile", "store", "night" ), 0 )
+        self.assertEqual( self.execute( "profile", "store", "bad name" ), 1 )
+
+        self.assertEqual( self.execute( "profile", "apply", "work" ), 0 )
+        self.assertEqual( self.driver.getBrightness(), 50 )
+        self.assertEqual( self.execute( "profile", "apply", "missing" ), 1 )
+
+        self.assertEqual( self.execute( "profile", "list" ), 0 )
+        self.assertEqual( self.output.getvalue(), "  night\n* work\n" )
+
+        self.output = io.StringIO()
+        self.assertEqual( self.execute( "profile", "next", "--save" ), 0 )
+        self.assertEqual( self.output.getvalue(), "night\n" )
+        self.assertEqual( self.driver.getBrightness(), 5 )
+        state = loadDriverState( IniSettings( self.settingsPath ) )
+        self.assertEqual( state.brightness, 5 )
+
+        self.assertEqual( self.execute( "profile", "remove", "work" ), 0 )
+        self.assertEqual( self.execute( "profile", "remove", "work" ), 1 )
@@ -0,0 +1,76 @@
+#     ClevoKeyboardControl. Control of keyboard backlights.
+#
+#     Copyright (C) 2018  Arkadiusz Netczuk <dev.arnet@gmail.com>
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+import unittest
+import os
+import tempfile
+import threading
+
+from testclevokeyboardcontrol.clevodrivermock import ClevoDriverMock
+
+from clevokeyboardcontrol.settings import IniSettings
+from clevokeyboardcontrol.clevoio import DriverState, Mode
+from clevokeyboardcontrol.daemon import Daemon
+
+
+class DaemonTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.settings = IniSettings( os.path.join( self.tmpDir.name, "settings.ini" ) )
+        self.driver = ClevoDriverMock()
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        self.tmpDir.cleanup()
+
+    def storeConfig(self, state=None, restoreSuspend=False, turnLEDOff=False):
+        self.settings.beginGroup( "settingsWidget" )
+        self.settings.setValue( "restoreSuspend", restoreSuspend )
+        self.settings.setValue( "turnLEDOffOnScreenSaver", turnLEDOff )
+        self.settings.endGroup()
+        if state is not None:
+            self.settings.beginGroup( "DriverState" )
+            state.saveSettings( self.settings )
+            self.settings.endGroup()
+        self.settings.sync()
+
+    def test_restoreDriver(self):
+        state = DriverState( True, 120, Mode.Custom, 0xff0000, 0, 0 )
+        self.storeConfig( state )
+        daemon = Daemon( self.driver, self.settings )
+        daemon.restoreDriver()
+        self.assertEqual( self.driver.readDriverState(), state )
+
+    def test_restoreDriver_noState(self):
+        self.storeConfig()
+        daemon = Daemon( self.driver, self.settings )
+        daemon.restoreDriver()
+        self.assertEqual( self.driver.getBrightness(), 0 )
+
+    def test_run_stop(self):
+        state = DriverState( True, 50, Mode.Custom, 0x00ff00, 0, 0 )
+        self.storeConfig( state )
+        daemon = Daemon( self.driver, self.settings )
+        thread = threading.Thread( target=daemon.run )
+        thread.start()
+        daemon.stop()
+        thread.join( 5.0 )
+        self.assertFalse( thread.is_alive() )
+        self.assertEqual( self.driver.getBrightness(), 50 )
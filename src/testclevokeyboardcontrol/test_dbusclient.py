@@ -0,0 +1,141 @@
+#     ClevoKeyboardControl. Control of keyboard backlights.
+#
+#     Copyright (C) 2018  Arkadiusz Netczuk <dev.arnet@gmail.com>
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+import unittest
+
+from clevokeyboardcontrol import dbusclient
+from clevokeyboardcontrol.dbusclient import Marshaller, Unmarshaller, DBusConnection
+
+from testclevokeyboardcontrol.dbusdaemon import PrivateBus
+
+
+class DBusClientTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        pass
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        pass
+
+    def test_splitSignature(self):
+        self.assertEqual( dbusclient.splitSignature( "sa(yv)a{sv}b" ), [ "s", "a(yv)", "a{sv}", "b" ] )
+
+    def test_parseAddress(self):
+        self.assertEqual( dbusclient.parseAddress( "unix:path=/run/user/1000/bus" ), "/run/user/1000/bus" )
+        self.assertEqual( dbusclient.parseAddress( "tcp:host=x;unix:abstract=/tmp/dbus-a%2Cb,guid=1" ),
+                          "\0/tmp/dbus-a,b" )
+        self.assertRaises( dbusclient.DBusError, dbusclient.parseAddress, "tcp:host=localhost,port=1" )
+
+    def test_encodePathElement(self):
+        self.assertEqual( dbusclient.encodePathElement( "2" ), "_32" )
+        self.assertEqual( dbusclient.encodePathElement( "c2" ), "c2" )
+        self.assertEqual( dbusclient.encodePathElement( "a-b" ), "a_2db" )
+
+    def test_marshalling(self):
+        signature = "ybusa(yv)a{su}"
+        values = [ 7, True, 42, "text", [ ( 1, ( "s", "abc" ) ), ( 8, ( "g", "sb" ) ) ], { "key": 3 } ]
+        writer = Marshaller()
+        writer.putValues( signature, values )
+        reader = Unmarshaller( bytes( writer.data ) )
+        result = reader.getValues( signature )
+        self.assertEqual( result[:4], values[:4] )
+        self.assertEqual( result[4], [ ( 1, "abc" ), ( 8, "sb" ) ] )
+        self.assertEqual( result[5], { "key": 3 } )
+        self.assertEqual( reader.offset, len( writer.data ) )
+
+    def test_message(self):
+        data = dbusclient.buildMessage( dbusclient.SIGNAL, 5, { dbusclient.HEADER_PATH: "/a/b",
+                                                                dbusclient.HEADER_INTERFACE: "org.test",
+                                                                dbusclient.HEADER_MEMBER: "Changed" },
+                                        "b", [ True ] )
+        message, length = dbusclient.parseMessage( data + b"xx" )
+        self.assertEqual( length, len( data ) )
+        self.assertEqual( message.serial, 5 )
+        self.assertEqual( message.path, "/a/b" )
+        self.assertEqual( message.member, "Changed" )
+        self.assertEqual( message.body, [ True ] )
+        self.assertEqual( dbusclient.parseMessage( data[:-1] ), ( None, 0 ) )
+
+    def test_message_malformed(self):
+        data = dbusclient.buildMessage( dbusclient.SIGNAL, 5, { dbusclient.HEADER_PATH: "/a/b",
+                                                                dbusclient.HEADER_MEMBER: "Changed" },
+                                        "s", [ "value" ] )
+        ## length of string exceeding message
+        corrupted = bytearray( data )
+        corrupted[ -10 ] = 0xFF
+        self.assertRaises( dbusclient.DBusError, dbusclient.parseMessage, bytes( corrupted ) )
+        ## invalid signature in header
+        corrupted = data.replace( b"s\0", b"(\0", 1 )
+        self.assertRaises( dbusclient.DBusError, dbusclient.parseMessage, corrupted )
+        self.assertRaises( dbusclient.DBusError, dbusclient.parseMessage, b"x" * 16 )
+
+    def test_readMessages_malformed(self):
+        valid = dbusclient.buildMessage( dbusclient.SIGNAL, 5, { dbusclient.HEADER_MEMBER: "Changed" }, "s", [ "v" ] )
+        corrupted = bytearray( valid )
+        corrupted[ -6 ] = 0xFF
+        connection = DBusConnection( "unix:path=/nonexistent" )
+        connection.socket = SocketMock( bytes( corrupted ) + valid )
+        messages = connection.readMessages()
+        self.assertEqual( len( messages ), 1 )
+        self.assertEqual( messages[0].body, [ "v" ] )
+
+
+class SocketMock():
+
+    def __init__(self, data):
+        self.data = data
+
+    def recv(self, _):
+        data = self.data
+        self.data = b""
+        return data
+
+
+@unittest.skipUnless( PrivateBus.isAvailable(), "dbus-daemon not available" )
+class DBusConnectionTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        self.bus = PrivateBus()
+        self.bus.start()
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        self.bus.stop()
+        self.bus = None
+
+    def test_signal(self):
+        receiver = DBusConnection( self.bus.address )
+        receiver.connect()
+        matchSerial = receiver.addMatch( "type='signal',interface='org.test'" )
+        messages = []
+        while not [ item for item in messages if item.replySerial == matchSerial ]:
+            messages.extend( receiver.readMessages() )
+        self.assertTrue( receiver.uniqueName )
+
+        sender = DBusConnection( self.bus.address )
+        sender.connect()
+        sender.emitSignal( "/test", "org.test", "Changed", "s", [ "value" ] )
+
+        signals = []
+        while not signals:
+            signals = [ item for item in receiver.readMessages() if item.messageType == dbusclient.SIGNAL ]
+        sender.close()
+        receiver.close()
+        self.assertEqual( signals[0].member, "Changed" )
+        self.assertEqual( signals[0].body, [ "value" ] )
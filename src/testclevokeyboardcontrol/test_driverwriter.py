@@ -0,0 +1,89 @@
+#     ClevoKeyboardControl. Control of keyboard backlights.
+#
+#     Copyright (C) 2018  Arkadiusz Netczuk <dev.arnet@gmail.com>
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+import unittest
+import threading
+
+from clevokeyboardcontrol.driverwriter import DriverWriter
+
+
+class DriverWriterTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        self.written = []
+        self.batches = []
+        self.settled = threading.Event()
+        self.writer = DriverWriter( frameInterval=0.05 )
+        self.writer.setCallback( self._batchWritten )
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        self.writer.stop()
+        self.writer = None
+
+    def test_latestValueWins(self):
+        entered = threading.Event()
+        blocker = threading.Event()
+
+        def block():
+            entered.set()
+            blocker.wait()
+
+        self.writer.submit( "block", block )
+        self.writer.start()
+        ## writer's thread is blocked, so all submits are queued into single batch
+        self.assertTrue( entered.wait( 5.0 ) )
+        for value in range(100):
+            self.writer.submit( "brightness", self.written.append, value )
+        blocker.set()
+
+        self.assertTrue( self.settled.wait( 5.0 ) )
+        self.assertEqual( self.written, [ 99 ] )
+        self.assertEqual( self.batches, [ { "block", "brightness" } ] )
+
+    def test_stop_flush(self):
+        self.writer.start()
+        self.writer.submit( "brightness", self.written.append, 10 )
+        self.writer.submit( "mode", self.written.append, 2 )
+        self.writer.stop()
+        self.assertEqual( sorted( self.written ), [ 2, 10 ] )
+
+    def test_replace(self):
+        self.writer.submit( "brightness", self.written.append, 10 )
+        self.writer.submit( "mode", self.written.append, 2 )
+        self.writer.replace( "state", self.written.append, 99 )
+        self.writer.start()
+        self.writer.stop()
+        self.assertEqual( self.written, [ 99 ] )
+
+    def test_error(self):
+        errors = []
+        self.writer.setErrorCallback( errors.append )
+        self.writer.start()
+        self.writer.submit( "state", self._raise )
+        self.writer.submit( "mode", self.written.append, 2 )
+        self.assertTrue( self.settled.wait( 5.0 ) )
+        self.assertEqual( len( errors ), 1 )
+        self.assertEqual( self.written, [ 2 ] )
+
+    def _batchWritten(self, keys):
+        self.batches.append( keys )
+        self.settled.set()
+
+    def _raise(self):
+        raise PermissionError()
@@ -22,7 +22,12 @@ import unittest
 import clevokeyboardcontrol.logger as logger
 
 import logging
+import queue
 import io
+import time
+import os
+import gzip
+import tempfile
 
 
 class LoggerTest(unittest.TestCase):
@@ -57,3 +62,214 @@ class LoggerTest(unittest.TestCase):
         self.logger.info("\r\n\r\n\r\n")
         msg = self.buffer.getvalue()
         self.assertEqual(msg, "\r\n\r\n\r\n\n")
+
+
+class BoundedQueueHandlerTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        self.queue = queue.Queue( maxsize=2 )
+        self.handler = logger.BoundedQueueHandler( self.queue, blockTimeout=0.01 )
+        self.logger = logging.Logger(__name__)
+        self.logger.propagate = False
+        self.logger.setLevel( logging.DEBUG )
+        self.logger.addHandler( self.handler )
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        self.logger = None
+
+    def test_overflow(self):
+        self.logger.debug( "message %s", 1 )
+        self.logger.debug( "message %s", 2 )
+        self.logger.debug( "message %s", 3 )
+        self.logger.warning( "message %s", 4 )
+        self.assertEqual( self.handler.dropped, 2 )
+
+        self.queue.get_nowait()
+        self.queue.get_nowait()
+        self.logger.debug( "message %s", 5 )
+        self.assertEqual( self.handler.dropped, 0 )
+        records = [ self.queue.get_nowait().getMessage() for _ in range( 2 ) ]
+        self.assertEqual( records, [ "message 5", "logging queue overflow: 2 records dropped" ] )
+
+    def test_prepare_lazy(self):
+        self.logger.debug( "message %s %s", 1, "a" )
+        record = self.queue.get_nowait()
+        self.assertEqual( record.args, ( 1, "a" ) )
+        self.assertEqual( record.getMessage(), "message 1 a" )
+
+    def test_prepare_mutable(self):
+        data = [ 1 ]
+        self.logger.debug( "message %s", data )
+        data.append( 2 )
+        record = self.queue.get_nowait()
+        self.assertEqual( record.getMessage(), "message [1]" )
+
+
+class LogListenerTest(unittest.TestCase):
+
+    def test_flush(self):
+        buffer = io.StringIO()
+        target = logging.StreamHandler( buffer )
+        target.setFormatter( logging.Formatter( "%(threadName)s %(message)s" ) )
+        listener = logger.LogListener( queue.Queue( maxsize=100 ), target )
+        testLogger = logging.Logger(__name__)
+        testLogger.addHandler( listener.queueHandler )
+        listener.start()
+        for i in range( 50 ):
+            testLogger.warning( "message %s", i )
+        listener.stop()
+        lines = buffer.getvalue().splitlines()
+        self.assertEqual( len( lines ), 50 )
+        self.assertEqual( lines[-1], "MainThread message 49" )
+
+    def test_rateFilter(self):
+        buffer = io.StringIO()
+        target = logging.StreamHandler( buffer )
+        listener = logger.LogListener( queue.Queue( maxsize=100 ), target )
+        listener.setRateFilter( logger.RateLimitFilter( { "": ( 0.05, 1 ) } ) )
+        testLogger = logging.Logger(__name__)
+        testLogger.addHandler( listener.queueHandler )
+        listener.start()
+        for i in range( 3 ):
+            testLogger.info( "message %s", i )
+        time.sleep( 0.2 )
+        lines = buffer.getvalue().splitlines()
+        listener.stop()
+        self.assertEqual( lines, [ "message 0", "message 2 [repeated 2 times in last 0s]" ] )
+
+
+class RateLimitFilterTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        self.time = 0.0
+        self.filter = logger.RateLimitFilter( { "watcher": ( 10.0, 2 ) }, clock=lambda: self.time )
+        self.buffer = io.StringIO()
+        handler = logging.StreamHandler( self.buffer )
+        handler.addFilter( self.filter )
+        self.root = logging.Logger( "test" )
+        self.root.propagate = False
+        self.root.setLevel( logging.DEBUG )
+        self.root.addHandler( handler )
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        self.root = None
+
+    def logEvents(self, testLogger, count):
+        for i in range( count ):
+            testLogger.debug( "event %s", i )
+
+    def test_burst(self):
+        watcherLogger = logging.Logger( "watcher.device" )
+        watcherLogger.handlers = self.root.handlers
+        self.logEvents( watcherLogger, 5 )
+        self.assertEqual( self.buffer.getvalue().splitlines(), [ "event 0", "event 1" ] )
+
+        self.time += 10.0
+        self.logEvents( watcherLogger, 1 )
+        self.assertEqual( self.buffer.getvalue().splitlines()[-1], "event 0 [repeated 3 times in last 10s]" )
+
+    def test_flush(self):
+        watcherLogger = logging.Logger( "watcher.device" )
+        watcherLogger.handlers = self.root.handlers
+        self.logEvents( watcherLogger, 5 )
+        self.assertEqual( self.filter.flush(), [] )
+        self.assertAlmostEqual( self.filter.flushDelay(), 10.0 )
+
+        summaries = self.filter.flush( force=True )
+        self.assertEqual( [ record.getMessage() for record in summaries ], [ "event 4 [repeated 3 times in last 10s]" ] )
+        self.assertEqual( self.filter.flush( force=True ), [] )
+        self.assertIsNone( self.filter.flushDelay() )
+
+        ## summary passes filter
+        watcherLogger.handle( summaries[0] )
+        self.assertEqual( self.buffer.getvalue().splitlines()[-1], "event 4 [repeated 3 times in last 10s]" )
+
+        self.logEvents( watcherLogger, 1 )
+        self.time += 10.0
+        self.assertEqual( [ record.getMessage() for record in self.filter.flush() ], [ "event 0 [repeated 1 times in last 10s]" ] )
+        self.assertEqual( self.filter.sites, {} )
+
+    def test_callSites(self):
+        watcherLogger = logging.Logger( "watcher" )
+        watcherLogger.handlers = self.root.handlers
+        self.logEvents( watcherLogger, 3 )
+        watcherLogger.debug( "other site" )
+        self.assertEqual( self.buffer.getvalue().splitlines(), [ "event 0", "event 1", "other site" ] )
+
+    def test_notLimited(self):
+        otherLogger = logging.Logger( "other" )
+        otherLogger.handlers = self.root.handlers
+        self.logEvents( otherLogger, 5 )
+        watcherLogger = logging.Logger( "watcher" )
+        watcherLogger.handlers = self.root.handlers
+        for _ in range( 3 ):
+            watcherLogger.warning( "warning" )
+        self.assertEqual( len( self.buffer.getvalue().splitlines() ), 8 )
+
+    def test_findRule(self):
+        self.filter.setRule( "", 1.0, 1 )
+        self.assertEqual( self.filter.findRule( "watcher.device.power" ), ( 10.0, 2 ) )
+        self.assertEqual( self.filter.findRule( "other" ), ( 1.0, 1 ) )
+        self.filter.removeRule( "" )
+        self.assertEqual( self.filter.findRule( "other" ), None )
+
+
+class CompressingRotatingFileHandlerTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.logFile = os.path.join( self.tmpDir.name, "log.txt" )
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        self.tmpDir.cleanup()
+
+    def writeRecords(self, handler, count):
+        for index in range( count ):
+            record = logging.LogRecord( "test", logging.INFO, __file__, 0, "record %s %s", ( index, "x" * 50 ), None )
+            handler.handle( record )
+
+    def test_rollover(self):
+        handler = logger.CompressingRotatingFileHandler( self.logFile, maxBytes=1000, totalBytes=100000 )
+        self.writeRecords( handler, 50 )
+        handler.close()
+        segments = logger.listLogSegments( self.logFile )
+        self.assertGreater( len( segments ), 1 )
+        for segment in segments:
+            self.assertTrue( segment.endswith( ".gz" ) )
+        with gzip.open( segments[0], "rt" ) as segmentFile:
+            self.assertTrue( segmentFile.readline().startswith( "record 0 " ) )
+
+    def test_totalBytes(self):
+        handler = logger.CompressingRotatingFileHandler( self.logFile, maxBytes=1000, totalBytes=200 )
+        self.writeRecords( handler, 200 )
+        handler.close()
+        segments = logger.listLogSegments( self.logFile )
+        totalSize = sum( os.path.getsize( segment ) for segment in segments )
+        self.assertLessEqual( totalSize, 200 )
+        self.assertTrue( os.path.exists( self.logFile ) )
+
+    def test_leftoverSegment(self):
+        segment = self.logFile + ".20200101-120000-000000"
+        with open( segment, "w" ) as segmentFile:
+            segmentFile.write( "old record\n" )
+        handler = logger.CompressingRotatingFileHandler( self.logFile )
+        handler.close()
+        self.assertEqual( logger.listLogSegments( self.logFile ), [ segment + ".gz" ] )
+
+    def test_leftoverTemporary(self):
+        tmpFile = self.logFile + ".20200101-120000-000000.gz.tmp"
+        with open( tmpFile, "w" ) as segmentFile:
+            segmentFile.write( "partial" )
+        handler = logger.CompressingRotatingFileHandler( self.logFile )
+        self.assertEqual( os.path.exists( tmpFile ), False )
+        handler.close()
+
+    def test_lazyThread(self):
+        handler = logger.CompressingRotatingFileHandler( self.logFile, maxBytes=1000 )
+        self.assertEqual( handler.compressThread, None )
+        self.writeRecords( handler, 50 )
+        self.assertNotEqual( handler.compressThread, None )
+        handler.close()
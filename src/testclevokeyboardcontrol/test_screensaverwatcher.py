@@ -0,0 +1,155 @@
+#     ClevoKeyboardControl. Control of keyboard backlights.
+#
+#     Copyright (C) 2018  Arkadiusz Netczuk <dev.arnet@gmail.com>
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+import unittest
+import threading
+import os
+import tempfile
+
+from clevokeyboardcontrol.screensaverwatcher import SessionLockWatcher, ScreenSaverWatcher
+from clevokeyboardcontrol import dbusclient
+from clevokeyboardcontrol.dbusclient import DBusConnection
+
+from testclevokeyboardcontrol.dbusdaemon import PrivateBus
+
+
+SESSION_PATH = "/org/freedesktop/login1/session/_32"
+
+
+@unittest.skipUnless( PrivateBus.isAvailable(), "dbus-daemon not available" )
+class SessionLockWatcherTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        self.bus = PrivateBus()
+        self.bus.start()
+        self.sender = DBusConnection( self.bus.address )
+        self.sender.connect()
+        self.states = []
+        self.changed = threading.Event()
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        self.sender.close()
+        self.bus.stop()
+        self.bus = None
+
+    def _stateChanged(self, active):
+        self.states.append( active )
+        self.changed.set()
+
+    def _createWatcher(self):
+        watcher = SessionLockWatcher( self.bus.address, self.bus.address, SESSION_PATH )
+        watcher.setCallback( self._stateChanged )
+        self.assertTrue( watcher.connect() )
+        watcher.start()
+        self.assertTrue( watcher.ready.wait( 5.0 ) )
+        return watcher
+
+    def _waitState(self, count):
+        while len( self.states ) < count:
+            self.assertTrue( self.changed.wait( 5.0 ) )
+            self.changed.clear()
+
+    def test_screenSaver(self):
+        watcher = self._createWatcher()
+        try:
+            self.sender.emitSignal( "/org/freedesktop/ScreenSaver", "org.freedesktop.ScreenSaver", "ActiveChanged",
+                                    "b", [ True ] )
+            self._waitState( 1 )
+            self.sender.emitSignal( "/org/freedesktop/ScreenSaver", "org.freedesktop.ScreenSaver", "ActiveChanged",
+                                    "b", [ False ] )
+            self._waitState( 2 )
+            self.assertEqual( self.states, [ True, False ] )
+        finally:
+            watcher.stop()
+            watcher.join( 5.0 )
+        self.assertFalse( watcher.is_alive() )
+
+    def test_sessionLock(self):
+        watcher = self._createWatcher()
+        try:
+            ## other session
+            self.sender.emitSignal( "/org/freedesktop/login1/session/_33", "org.freedesktop.login1.Session", "Lock" )
+            self.sender.emitSignal( SESSION_PATH, "org.freedesktop.login1.Session", "Lock" )
+            self._waitState( 1 )
+            ## screen saver activated while locked -- state not changed
+            self.sender.emitSignal( "/org/xfce/ScreenSaver", "org.xfce.ScreenSaver", "ActiveChanged", "b", [ True ] )
+            self.sender.emitSignal( SESSION_PATH, "org.freedesktop.login1.Session", "Unlock" )
+            self.sender.emitSignal( "/org/xfce/ScreenSaver", "org.xfce.ScreenSaver", "ActiveChanged", "b", [ False ] )
+            self._waitState( 2 )
+            self.assertEqual( self.states, [ True, False ] )
+        finally:
+            watcher.stop()
+
+    def test_noBus(self):
+        watcher = SessionLockWatcher( "unix:path=/nonexistent/bus", "unix:path=/nonexistent/bus" )
+        self.assertFalse( watcher.connect() )
+        watcher.stop()
+
+    def test_screenSaverWatcher(self):
+        detector = ScreenSaverWatcher( sessionAddress=self.bus.address, systemAddress=self.bus.address )
+        detector.setCallback( self._stateChanged )
+        try:
+            self.assertIsNotNone( detector.sessionWatcher )
+            self.assertEqual( len( detector.watchers ), 0 )
+            self.assertTrue( detector.sessionWatcher.ready.wait( 5.0 ) )
+            self.sender.emitSignal( "/org/freedesktop/ScreenSaver", "org.freedesktop.ScreenSaver", "ActiveChanged",
+                                    "b", [ True ] )
+            self._waitState( 1 )
+            self.assertFalse( detector.isLEDOn )
+        finally:
+            detector.stop()
+
+    def test_screenSaverWatcher_service(self):
+        serial = self.sender.callMethod( dbusclient.BUS_NAME, dbusclient.BUS_PATH, dbusclient.BUS_INTERFACE,
+                                         "RequestName", "su", [ "org.freedesktop.ScreenSaver", 0 ] )
+        while not [ item for item in self.sender.readMessages() if item.replySerial == serial ]:
+            pass
+        with tempfile.TemporaryDirectory() as backlightDir:
+            self._createBacklight( backlightDir )
+            detector = ScreenSaverWatcher( sessionAddress=self.bus.address, systemAddress=self.bus.address,
+                                           backlightDir=backlightDir )
+            detector.stop()
+        self.assertEqual( detector.sessionWatcher.screenSaverService, "org.freedesktop.ScreenSaver" )
+        ## backlight not needed
+        self.assertEqual( len( detector.watchers ), 0 )
+
+    def test_screenSaverWatcher_noService(self):
+        with tempfile.TemporaryDirectory() as backlightDir:
+            self._createBacklight( backlightDir )
+            detector = ScreenSaverWatcher( sessionAddress=self.bus.address, systemAddress=self.bus.address,
+                                           backlightDir=backlightDir )
+            detector.setCallback( self._stateChanged )
+            try:
+                self.assertEqual( detector.sessionWatcher.screenSaverService, None )
+                ## both sources are watched
+                self.assertIsNotNone( detector.sessionWatcher )
+                self.assertEqual( len( detector.watchers ), 1 )
+                self.assertTrue( detector.isLEDOn )
+                ## screen turned off
+                detector.watchers[0].blPower = False
+                detector._sysfsChanged( 0 )
+                self.assertEqual( self.states, [ True ] )
+            finally:
+                detector.stop()
+
+    def _createBacklight(self, backlightDir):
+        deviceDir = os.path.join( backlightDir, "intel_backlight" )
+        os.makedirs( deviceDir )
+        with open( os.path.join( deviceDir, "bl_power" ), "w" ) as powerFile:
+            powerFile.write( "0\n" )
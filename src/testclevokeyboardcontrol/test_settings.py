@@ -0,0 +1,108 @@
+#     ClevoKeyboardControl. Control of keyboard backlights.
+#
+#     Copyright (C) 2018  Arkadiusz Netczuk <dev.arnet@gmail.com>
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+import unittest
+import os
+import tempfile
+
+from clevokeyboardcontrol.settings import IniSettings, unquote
+from clevokeyboardcontrol.settings import loadProfiles, saveProfile, removeProfile, findProfile, isValidProfileName
+from clevokeyboardcontrol.clevoio import DriverState, Mode
+
+
+class IniSettingsTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.filePath = os.path.join( self.tmpDir.name, "settings.ini" )
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        self.tmpDir.cleanup()
+
+    def test_missingFile(self):
+        settings = IniSettings( self.filePath )
+        self.assertEqual( settings.allKeys(), [] )
+        self.assertEqual( settings.value( "key", 5, type=int ), 5 )
+
+    def test_readQSettingsFile(self):
+        with open( self.filePath, "w", encoding="utf-8" ) as settingsFile:
+            settingsFile.write( "[General]\nversion=3\n\n"
+                                "[settingsWidget]\nrestoreStart=false\ntrayIcon=\"a, b\"\n" )
+        settings = IniSettings( self.filePath )
+        self.assertEqual( settings.value( "version", type=int ), 3 )
+        settings.beginGroup( "settingsWidget" )
+        self.assertFalse( settings.value( "restoreStart", True, type=bool ) )
+        self.assertEqual( settings.value( "trayIcon" ), "a, b" )
+        settings.endGroup()
+        self.assertEqual( sorted( settings.allKeys() ),
+                          [ "settingsWidget/restoreStart", "settingsWidget/trayIcon", "version" ] )
+
+    def test_sync(self):
+        settings = IniSettings( self.filePath )
+        settings.setValue( "settingsWidget/restoreSuspend", True )
+        settings.setValue( "counter", 7 )
+        settings.sync()
+
+        settings = IniSettings( self.filePath )
+        self.assertTrue( settings.value( "settingsWidget/restoreSuspend", False, type=bool ) )
+        self.assertEqual( settings.value( "counter", type=int ), 7 )
+        settings.remove( "counter" )
+        self.assertEqual( settings.value( "counter" ), None )
+
+    def test_driverState(self):
+        state = DriverState( True, 120, Mode.Custom, 0xff0000, 0x00ff00, 0x0000ff )
+        settings = IniSettings( self.filePath )
+        settings.beginGroup( "DriverState" )
+        self.assertEqual( DriverState.loadSettings( settings ), None )
+        state.saveSettings( settings )
+        settings.endGroup()
+        settings.sync()
+
+        settings = IniSettings( self.filePath )
+        settings.beginGroup( "DriverState" )
+        self.assertEqual( DriverState.loadSettings( settings ), state )
+
+    def test_profiles(self):
+        work = DriverState( True, 120, Mode.Custom, 0xffffff, 0xffffff, 0xffffff )
+        night = DriverState( True, 10, Mode.Custom, 0xff0000, 0xff0000, 0xff0000 )
+        settings = IniSettings( self.filePath )
+        saveProfile( settings, "work", work )
+        saveProfile( settings, "night", night )
+        settings.setValue( "Profiles/broken", "zz" )
+        settings.sync()
+
+        settings = IniSettings( self.filePath )
+        self.assertEqual( settings.value( "Profiles/work" ), work.toBytes().hex() )
+        profiles = loadProfiles( settings )
+        self.assertEqual( profiles, { "work": work, "night": night } )
+        self.assertEqual( findProfile( profiles, night ), "night" )
+        self.assertEqual( findProfile( profiles, DriverState() ), None )
+        removeProfile( settings, "work" )
+        self.assertEqual( loadProfiles( settings ), { "night": night } )
+
+    def test_isValidProfileName(self):
+        self.assertTrue( isValidProfileName( "gaming-2_b" ) )
+        self.assertFalse( isValidProfileName( "" ) )
+        self.assertFalse( isValidProfileName( "a/b" ) )
+        self.assertFalse( isValidProfileName( "a b" ) )
+
+    def test_unquote(self):
+        self.assertEqual( unquote( '"a \\"b\\""' ), 'a "b"' )
+        self.assertEqual( unquote( 'abc' ), 'abc' )
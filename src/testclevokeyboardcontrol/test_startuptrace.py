@@ -0,0 +1,129 @@
+#     ClevoKeyboardControl. Control of keyboard backlights.
+#
+#     Copyright (C) 2018  Arkadiusz Netczuk <dev.arnet@gmail.com>
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+import unittest
+import os
+import json
+import logging
+import tempfile
+
+from clevokeyboardcontrol.startuptrace import StartupTracer
+
+
+class FakeClock():
+
+    def __init__(self):
+        self.time = 100.0
+
+    def __call__(self):
+        self.time += 0.001
+        return self.time
+
+
+class RecordHandler( logging.Handler ):
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append( record )
+
+
+class StartupTracerTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        self.tracer = StartupTracer( clock=FakeClock() )
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        pass
+
+    def test_disabled(self):
+        with self.tracer.span( "phase" ):
+            pass
+        self.tracer.mark( "event" )
+        self.assertEqual( self.tracer.spans, [] )
+
+    def test_nested(self):
+        self.tracer.start()
+        with self.tracer.span( "outer" ):
+            with self.tracer.span( "inner" ):
+                pass
+        self.tracer.mark( "event" )
+        spans = self.tracer.finish()
+
+        self.assertEqual( [ ( item.name, item.depth ) for item in spans ], [ ( "outer", 0 ), ( "inner", 1 ), ( "event", 0 ) ] )
+        outer, inner, event = spans
+        self.assertLessEqual( outer.start, inner.start )
+        self.assertGreaterEqual( outer.end, inner.end )
+        self.assertTrue( event.isInstant() )
+
+        with self.tracer.span( "after finish" ):
+            pass
+        self.assertEqual( len( self.tracer.spans ), 3 )
+
+    def test_begin_end(self):
+        self.tracer.start()
+        record = self.tracer.begin( "async" )
+        settled = []
+        self.tracer.whenSettled( lambda: settled.append( True ) )
+        self.assertEqual( settled, [] )
+        self.tracer.end( record )
+        self.assertEqual( settled, [ True ] )
+        self.assertGreater( record.duration(), 0.0 )
+        ## already settled
+        self.tracer.whenSettled( lambda: settled.append( True ) )
+        self.assertEqual( settled, [ True, True ] )
+        self.tracer.finish()
+        self.assertIsNone( self.tracer.begin( "disabled" ) )
+
+    def test_logSummary(self):
+        logger = logging.getLogger( "startuptrace_test" )
+        handler = RecordHandler()
+        logger.addHandler( handler )
+        logger.setLevel( logging.INFO )
+        try:
+            self.tracer.start()
+            with self.tracer.span( "imports" ):
+                pass
+            self.tracer.finish()
+            self.tracer.logSummary( logger )
+        finally:
+            logger.removeHandler( handler )
+        self.assertEqual( len( handler.records ), 1 )
+        record = handler.records[0]
+        self.assertIn( "imports=", record.getMessage() )
+        self.assertEqual( [ item["name"] for item in record.startupSpans ], [ "imports" ] )
+
+    def test_writeChromeTrace(self):
+        self.tracer.start()
+        with self.tracer.span( "phase" ):
+            pass
+        self.tracer.mark( "shown" )
+        self.tracer.finish()
+        with tempfile.TemporaryDirectory() as tmpDir:
+            tracePath = os.path.join( tmpDir, "trace.json" )
+            self.tracer.writeChromeTrace( tracePath )
+            with open( tracePath, "r", encoding="utf-8" ) as traceFile:
+                trace = json.load( traceFile )
+        events = trace[ "traceEvents" ]
+        self.assertEqual( [ event["ph"] for event in events ], [ "X", "i" ] )
+        self.assertGreater( events[0]["dur"], 0 )
+        self.assertEqual( events[0]["name"], "phase" )
@@ -0,0 +1,104 @@
+#     ClevoKeyboardControl. Control of keyboard backlights.
+#
+#     Copyright (C) 2018  Arkadiusz Netczuk <dev.arnet@gmail.com>
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+import unittest
+import threading
+
+from clevokeyboardcontrol.suspend import SuspendDetector, SuspendThread, TimerFD
+
+
+class SuspendDetectorTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        self.boottime = 1000.0
+        self.monotonic = 1000.0
+        self.resumes = []
+        self.detector = SuspendDetector( interval=0.05, boottime=self._boottime, monotonic=self._monotonic )
+        self.detector.setCallback( self.resumes.append )
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        self.detector.stop()
+        self.detector = None
+
+    def _boottime(self):
+        return self.boottime
+
+    def _monotonic(self):
+        return self.monotonic
+
+    def _advance(self, runTime, suspendTime=0.0):
+        self.monotonic += runTime
+        self.boottime += runTime + suspendTime
+
+    def test_check(self):
+        self.detector.start()
+        self._advance( 300.0 )
+        self.assertFalse( self.detector.check() )
+        self._advance( 10.0, 3600.0 )
+        self.assertTrue( self.detector.check() )
+        ## reported once
+        self._advance( 300.0 )
+        self.assertFalse( self.detector.check() )
+        self.assertEqual( self.resumes, [ 3600.0 ] )
+
+    def test_wallClockIndependent(self):
+        self.detector.start()
+        ## both clocks advance -- no suspend
+        self._advance( 7200.0 )
+        self.assertFalse( self.detector.check() )
+        self.assertEqual( self.resumes, [] )
+
+    def test_defaultInterval(self):
+        ## timer expires after resume anyway -- no frequent idle wakeups
+        self.assertGreaterEqual( SuspendDetector().interval, 60.0 )
+
+    def test_timer(self):
+        timer = TimerFD.create()
+        if timer is None:
+            self.skipTest( "timerfd not available" )
+        timer.close()
+        thread = SuspendThread( self.detector )
+        resumed = threading.Event()
+        thread.setCallback( lambda duration: resumed.set() )
+        thread.start()
+        try:
+            while self.detector.fileno() is None:
+                threading.Event().wait( 0.01 )
+            self._advance( 1.0, 60.0 )
+            self.assertTrue( resumed.wait( 5.0 ) )
+        finally:
+            thread.stop()
+            thread.join( 5.0 )
+        self.assertFalse( thread.is_alive() )
+        self.assertIsNone( self.detector.fileno() )
+
+
+class TimerFDTest(unittest.TestCase):
+
+    def test_read(self):
+        timer = TimerFD.create()
+        if timer is None:
+            self.skipTest( "timerfd not available" )
+        try:
+            self.assertEqual( timer.read(), 0 )
+            timer.setInterval( 0.01 )
+            threading.Event().wait( 0.05 )
+            self.assertGreater( timer.read(), 0 )
+        finally:
+            timer.close()
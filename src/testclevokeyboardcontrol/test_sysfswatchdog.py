@@ -18,8 +18,17 @@
 
 
 import unittest
+import os
+import errno
+import tempfile
+import threading
+import time
 
-from clevokeyboardcontrol.sysfswatchdog import SysFSWatcher
+from watchdog.utils.dirsnapshot import DirectorySnapshot, DirectorySnapshotDiff
+
+from clevokeyboardcontrol.sysfswatchdog import SysFSWatcher, SysFSObserver, WatchService, listAttributes
+from clevokeyboardcontrol.sysfspolling import FileContentObserver, ContentStatResult
+from clevokeyboardcontrol.sysfswatchdog import Handler, ContentModifiedEvent, PollScheduler
 
 
 class SysFSWatcherTest(unittest.TestCase):
@@ -34,3 +43,452 @@ class SysFSWatcherTest(unittest.TestCase):
     def test_SysFSWatcher(self):
         watcher = SysFSWatcher("SSaverThread")
         watcher.watch( ".", False )
+        watcher.stop()
+
+
+class WatchServiceTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        self.tmpDirs = [ tempfile.TemporaryDirectory() for _ in range(4) ]
+        for tmpDir in self.tmpDirs:
+            writeFile( os.path.join( tmpDir.name, "bl_power" ), "0\n" )
+        self.service = WatchService( SysFSObserver( pollInterval=0.05 ) )
+        self.changes = []
+        self.changed = threading.Event()
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        self.service.shutdown( 5.0 )
+        for tmpDir in self.tmpDirs:
+            tmpDir.cleanup()
+        self.tmpDirs = None
+
+    def _changed(self, changes):
+        self.changes.append( changes )
+        self.changed.set()
+
+    def test_sharedThread(self):
+        threadsBefore = threading.active_count()
+        watchers = []
+        for tmpDir in self.tmpDirs:
+            watcher = SysFSWatcher( service=self.service )
+            watcher.setCallback( self._changed )
+            watcher.watch( tmpDir.name, False )
+            watchers.append( watcher )
+        self.assertEqual( threading.active_count(), threadsBefore + 1 )
+
+        filePath = os.path.join( self.tmpDirs[2].name, "bl_power" )
+        writeFile( filePath, "4\n" )
+        self.assertTrue( self.changed.wait( 5.0 ) )
+        self.assertEqual( self.changes, [ { filePath: b"4\n" } ] )
+
+    def test_unsubscribe(self):
+        watcher = SysFSWatcher( service=self.service )
+        watcher.setCallback( self._changed )
+        watcher.watch( self.tmpDirs[0].name, False )
+        watcher.stop()
+        self.assertEqual( len(self.service.subscriptions), 0 )
+
+        writeFile( os.path.join( self.tmpDirs[0].name, "bl_power" ), "4\n" )
+        self.assertFalse( self.changed.wait( 0.3 ) )
+
+    def test_shutdown(self):
+        watcher = SysFSWatcher( service=self.service )
+        watcher.watch( self.tmpDirs[0].name, False )
+        observer = self.service.observer
+        self.service.shutdown( 5.0 )
+        self.assertFalse( observer.is_alive() )
+        self.assertEqual( len(observer._attributes), 0 )
+        ## stopping watcher after shutdown is allowed
+        watcher.stop()
+        self.assertRaises( RuntimeError, watcher.watch, self.tmpDirs[1].name, False )
+
+    def test_instance(self):
+        service = WatchService.instance()
+        self.assertIs( WatchService.instance(), service )
+        WatchService.shutdownInstance()
+        self.assertTrue( service.closed )
+        self.assertIsNot( WatchService.instance(), service )
+        WatchService.shutdownInstance()
+
+
+class SysFSObserverTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.filePath = os.path.join( self.tmpDir.name, "brightness" )
+        writeFile( self.filePath, "100\n" )
+        self.changed = threading.Event()
+        self.changes = dict()
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        self.tmpDir.cleanup()
+        self.tmpDir = None
+
+    def _changed(self, changes):
+        self.changes.update( changes )
+        self.changed.set()
+
+    def test_listAttributes(self):
+        os.mkdir( os.path.join( self.tmpDir.name, "power" ) )
+        writeFile( os.path.join( self.tmpDir.name, "power", "control" ), "auto\n" )
+        os.symlink( self.filePath, os.path.join( self.tmpDir.name, "link" ) )
+
+        files = listAttributes( self.tmpDir.name, False )
+        self.assertEqual( files, [ self.filePath ] )
+
+        files = listAttributes( self.tmpDir.name, True )
+        self.assertEqual( len(files), 2 )
+
+    def test_contentChanged(self):
+        watcher = SysFSWatcher()
+        watcher.setCallback( self._changed )
+        watcher.watch( self.tmpDir.name, False )
+        try:
+            writeFile( self.filePath, "200\n" )
+            self.assertTrue( self.changed.wait( 5.0 ) )
+            self.assertEqual( self.changes, { self.filePath: b"200\n" } )
+        finally:
+            watcher.stop()
+
+    def test_contentNotChanged(self):
+        service = WatchService( SysFSObserver( pollInterval=0.05 ) )
+        watcher = SysFSWatcher( service=service )
+        watcher.setCallback( self._changed )
+        watcher.watch( self.tmpDir.name, False )
+        try:
+            writeFile( self.filePath, "100\n" )
+            self.assertFalse( self.changed.wait( 0.3 ) )
+        finally:
+            service.shutdown()
+
+    def test_schedule_files(self):
+        writeFile( os.path.join( self.tmpDir.name, "uevent" ), "DRIVER=x\n" )
+        observer = SysFSObserver()
+        attributes = observer.schedule( None, self.tmpDir.name, files=[ "brightness", "missing" ] )
+        self.assertEqual( len(observer._attributes), 1 )
+        self.assertEqual( attributes[0].path, self.filePath )
+        observer.stop()
+
+    def test_pollStats(self):
+        observer = SysFSObserver( pollInterval=0.05 )
+        observer.schedule( None, self.tmpDir.name )
+        stats = observer.pollStats()
+        self.assertEqual( list( stats.keys() ), [ self.filePath ] )
+        self.assertEqual( stats[ self.filePath ][ "pollCount" ], 0 )
+        observer.setPaused( True )
+        self.assertIsNone( observer._pollTimeout() )
+        observer.stop()
+
+    def test_readError_reopen(self):
+        handler = Handler()
+        handler.callback = self._changed
+        observer = SysFSObserver( pollInterval=0.05 )
+        attributes = observer.schedule( handler, self.tmpDir.name )
+        attribute = attributes[0]
+
+        def failedRefresh( buffer ):
+            raise OSError( errno.ENODEV, "No such device" )
+
+        attribute.refresh = failedRefresh
+        self.assertFalse( observer._checkAttribute( attribute ) )
+        self.assertEqual( observer._attributes, {} )
+        self.assertEqual( observer._broken, [ attribute ] )
+        self.assertEqual( observer.pollStats()[ self.filePath ][ "failCount" ], 1 )
+        del attribute.refresh
+
+        writeFile( self.filePath, "200\n" )
+        time.sleep( 0.1 )
+        observer._pollAttributes()
+        self.assertEqual( observer._broken, [] )
+        self.assertEqual( list( observer._attributes.values() ), [ attribute ] )
+        self.assertEqual( self.changes, { self.filePath: b"200\n" } )
+        observer.stop()
+
+    def test_coalescing_observer(self):
+        observer = SysFSObserver( pollInterval=0.05 )
+        service = WatchService( observer )
+        watcher = SysFSWatcher( service=service )
+        threads = []
+
+        def changed( changes ):
+            threads.append( threading.current_thread() )
+            self._changed( changes )
+
+        watcher.setCallback( changed )
+        watcher.setCoalescing( 0.1 )
+        watcher.watch( self.tmpDir.name, False )
+        try:
+            writeFile( self.filePath, "200\n" )
+            self.assertTrue( self.changed.wait( 5.0 ) )
+            self.assertEqual( self.changes, { self.filePath: b"200\n" } )
+            ## trailing edge delivered by observer's thread, not by timer thread
+            self.assertEqual( threads, [ observer ] )
+        finally:
+            service.shutdown()
+
+    def test_pollStats_concurrent(self):
+        for index in range( 20 ):
+            writeFile( os.path.join( self.tmpDir.name, "attr%s" % index ), "0\n" )
+        observer = SysFSObserver( pollInterval=0.05 )
+        observer.start()
+        errors = []
+        stopped = threading.Event()
+
+        def readStats():
+            try:
+                while stopped.is_set() is False:
+                    observer.pollStats()
+                    observer.touch()
+            except Exception as exc:       # pylint: disable=W0703
+                errors.append( exc )
+
+        reader = threading.Thread( target=readStats )
+        reader.start()
+        try:
+            for _ in range( 20 ):
+                watch = observer.schedule( None, self.tmpDir.name )
+                observer.unschedule( watch )
+        finally:
+            stopped.set()
+            reader.join()
+            observer.stop()
+            observer.join( 5.0 )
+        self.assertEqual( errors, [] )
+
+    def test_stop_closeFiles(self):
+        observer = SysFSObserver()
+        observer.schedule( None, self.tmpDir.name )
+        observer.start()
+        observer.stop()
+        observer.join( 5.0 )
+        self.assertFalse( observer.is_alive() )
+        self.assertEqual( len(observer._attributes), 0 )
+
+
+class HandlerTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        self.changes = []
+        self.handler = Handler()
+        self.handler.callback = self.changes.append
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        self.handler = None
+
+    def test_selfWrite_suppressed(self):
+        self.handler.expectWrite( "/brightness", "100" )
+        self.handler.dispatch( ContentModifiedEvent( "/brightness", b"100\n" ) )
+        self.assertEqual( self.changes, [] )
+        ## pending write consumed
+        self.handler.dispatch( ContentModifiedEvent( "/brightness", b"100\n" ) )
+        self.assertEqual( len(self.changes), 1 )
+
+    def test_externalWrite(self):
+        self.handler.expectWrite( "/brightness", "100" )
+        self.handler.dispatch( ContentModifiedEvent( "/brightness", b"50\n" ) )
+        self.assertEqual( self.changes, [ { "/brightness": b"50\n" } ] )
+
+    def test_olderWrites_superseded(self):
+        self.handler.expectWrite( "/brightness", "10" )
+        self.handler.expectWrite( "/brightness", "20" )
+        self.handler.expectWrite( "/brightness", "30" )
+        self.handler.dispatch( ContentModifiedEvent( "/brightness", b"20\n" ) )
+        self.handler.dispatch( ContentModifiedEvent( "/brightness", b"10\n" ) )
+        self.handler.dispatch( ContentModifiedEvent( "/brightness", b"30\n" ) )
+        self.assertEqual( self.changes, [ { "/brightness": b"10\n" } ] )
+
+    def test_normalizer(self):
+        self.handler.setValueNormalizer( lambda path, value: int( value, 16 ) )
+        self.handler.expectWrite( "/color_left", "0xff00" )
+        self.handler.dispatch( ContentModifiedEvent( "/color_left", b"00ff00\n" ) )
+        self.assertEqual( self.changes, [] )
+
+    def test_coalescing_trailing(self):
+        self.handler.setCoalescing( 0.1 )
+        self.handler.dispatch( ContentModifiedEvent( "/color_left", b"ff\n" ) )
+        self.handler.dispatch( ContentModifiedEvent( "/color_center", b"ff\n" ) )
+        self.handler.dispatch( ContentModifiedEvent( "/color_left", b"aa\n" ) )
+        self.assertEqual( self.changes, [] )
+        time.sleep( 0.3 )
+        self.assertEqual( self.changes, [ { "/color_left": b"aa\n", "/color_center": b"ff\n" } ] )
+
+    def test_coalescing_leading(self):
+        self.handler.setCoalescing( 0.1, leading=True, trailing=True )
+        self.handler.dispatch( ContentModifiedEvent( "/color_left", b"ff\n" ) )
+        self.assertEqual( self.changes, [ { "/color_left": b"ff\n" } ] )
+        self.handler.dispatch( ContentModifiedEvent( "/color_center", b"ff\n" ) )
+        self.handler.dispatch( ContentModifiedEvent( "/color_right", b"ff\n" ) )
+        time.sleep( 0.3 )
+        self.assertEqual( len(self.changes), 2 )
+        self.assertEqual( self.changes[1], { "/color_center": b"ff\n", "/color_right": b"ff\n" } )
+
+    def test_coalescing_leadingOnly(self):
+        self.handler.setCoalescing( 0.1, leading=True, trailing=False )
+        self.handler.dispatch( ContentModifiedEvent( "/color_left", b"ff\n" ) )
+        self.handler.dispatch( ContentModifiedEvent( "/color_center", b"ff\n" ) )
+        time.sleep( 0.3 )
+        self.assertEqual( self.changes, [ { "/color_left": b"ff\n" } ] )
+
+    def test_coalescing_listener(self):
+        opened = []
+        self.handler.setWindowListener( lambda: opened.append( True ) )
+        self.handler.setCoalescing( 0.05 )
+        self.handler.dispatch( ContentModifiedEvent( "/color_left", b"ff\n" ) )
+        self.handler.dispatch( ContentModifiedEvent( "/color_center", b"ff\n" ) )
+        self.assertEqual( opened, [ True ] )
+        self.assertIsNone( self.handler.windowTimer )
+        self.handler.flushWindow()
+        self.assertEqual( self.changes, [] )
+        time.sleep( self.handler.getWindowDeadline() - time.monotonic() + 0.01 )
+        self.handler.flushWindow()
+        self.assertEqual( self.changes, [ { "/color_left": b"ff\n", "/color_center": b"ff\n" } ] )
+        self.assertIsNone( self.handler.getWindowDeadline() )
+
+    def test_coalescing_cancel(self):
+        self.handler.setCoalescing( 0.1 )
+        self.handler.dispatch( ContentModifiedEvent( "/color_left", b"ff\n" ) )
+        self.handler.cancel()
+        time.sleep( 0.3 )
+        self.assertEqual( self.changes, [] )
+
+
+class FileContentObserverTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.filePath = os.path.join( self.tmpDir.name, "brightness" )
+        writeFile( self.filePath, "100\n" )
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        self.tmpDir.cleanup()
+        self.tmpDir = None
+
+    def test_stat_contentMode(self):
+        observer = FileContentObserver( contentMode=True )
+        result = observer.stat( self.filePath )
+        self.assertIsInstance( result, ContentStatResult )
+        self.assertEqual( result.st_mtime, b"100\n" )
+
+    def test_stat_directory(self):
+        observer = FileContentObserver( contentMode=True )
+        result = observer.stat( self.tmpDir.name )
+        self.assertIsInstance( result, os.stat_result )
+
+    def test_diff_contentMode(self):
+        observer = FileContentObserver( contentMode=True )
+        refSnapshot = DirectorySnapshot( self.tmpDir.name, recursive=False, stat=observer.stat )
+        writeFile( self.filePath, "200\n" )
+        snapshot = DirectorySnapshot( self.tmpDir.name, recursive=False, stat=observer.stat )
+        diff = DirectorySnapshotDiff( refSnapshot, snapshot )
+        self.assertEqual( diff.files_modified, [ self.filePath ] )
+
+    def test_listdir_allowedFiles(self):
+        writeFile( os.path.join( self.tmpDir.name, "uevent" ), "DRIVER=x\n" )
+        observer = FileContentObserver( contentMode=True )
+        observer.allowedFiles[ self.tmpDir.name ] = set( [ self.filePath ] )
+        snapshot = DirectorySnapshot( self.tmpDir.name, recursive=False, stat=observer.stat, listdir=observer.listdir )
+        self.assertEqual( sorted( snapshot.paths ), [ self.tmpDir.name, self.filePath ] )
+
+    def test_adaptivePolling(self):
+        changed = threading.Event()
+        service = WatchService( FileContentObserver( contentMode=True ) )
+        watcher = SysFSWatcher( service=service )
+        watcher.setCallback( lambda changes: changed.set() )
+        watcher.watch( self.tmpDir.name, False )
+        try:
+            writeFile( self.filePath, "200\n" )
+            self.assertTrue( changed.wait( 5.0 ) )
+            stats = service.pollStats()[ self.tmpDir.name ]
+            self.assertGreater( stats["pollCount"], 0 )
+            self.assertEqual( stats["interval"], PollScheduler.FAST_INTERVAL )
+
+            watcher.setPaused( True )
+            time.sleep( 0.2 )
+            pollCount = service.pollStats()[ self.tmpDir.name ]["pollCount"]
+            time.sleep( 0.3 )
+            self.assertEqual( service.pollStats()[ self.tmpDir.name ]["pollCount"], pollCount )
+        finally:
+            service.shutdown( 5.0 )
+
+
+class PollSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        self.currTime = 100.0
+        self.scheduler = PollScheduler( fastInterval=0.1, maxInterval=1.0, hotPeriod=1.0, clock=self._clock )
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        self.scheduler = None
+
+    def _clock(self):
+        return self.currTime
+
+    def _pollDue(self, changed=False):
+        self.currTime = max( self.currTime, self.scheduler.nextPollTime() )
+        self.scheduler.polled( changed )
+
+    def test_hot(self):
+        self.assertAlmostEqual( self.scheduler.delay(), 0.1 )
+        self._pollDue()
+        self.assertAlmostEqual( self.scheduler.interval, 0.1 )
+
+    def test_backoff(self):
+        for _ in range(10):
+            self._pollDue()
+        ## hot period passed
+        self._pollDue()
+        self.assertAlmostEqual( self.scheduler.interval, 0.2 )
+        self._pollDue()
+        self.assertAlmostEqual( self.scheduler.interval, 0.4 )
+        for _ in range(5):
+            self._pollDue()
+        self.assertAlmostEqual( self.scheduler.interval, 1.0 )
+        self.assertEqual( self.scheduler.stats()["pollCount"], 17 )
+
+    def test_change(self):
+        self.currTime += 10.0
+        self.scheduler.polled( False )
+        self.assertAlmostEqual( self.scheduler.interval, 0.2 )
+        self._pollDue( True )
+        self.assertAlmostEqual( self.scheduler.interval, 0.1 )
+        self.assertEqual( self.scheduler.changeCount, 1 )
+
+    def test_touch(self):
+        self.currTime += 10.0
+        for _ in range(5):
+            self._pollDue()
+        self.assertAlmostEqual( self.scheduler.interval, 1.0 )
+        self.scheduler.touch()
+        self.assertAlmostEqual( self.scheduler.interval, 0.1 )
+        self.assertAlmostEqual( self.scheduler.delay(), 0.1 )
+
+    def test_failed(self):
+        self.currTime += 10.0
+        self.scheduler.failed()
+        self.assertAlmostEqual( self.scheduler.interval, 0.1 )
+        self.currTime += 0.1
+        self.scheduler.failed()
+        self.assertAlmostEqual( self.scheduler.interval, 0.2 )
+        self._pollDue( True )
+        self.assertAlmostEqual( self.scheduler.interval, 0.1 )
+        self.assertEqual( self.scheduler.failCount, 0 )
+
+    def test_paused(self):
+        self.scheduler.setPaused( True )
+        self.assertIsNone( self.scheduler.delay() )
+        self.assertFalse( self.scheduler.isDue() )
+        self.scheduler.setPaused( False )
+        self.assertAlmostEqual( self.scheduler.delay(), 0.1 )
+
+
+def writeFile( path, content ):
+    ## overwrite content in place like sysfs store does (no truncation before write)
+    mode = "r+" if os.path.exists( path ) else "w"
+    with open( path, mode ) as file:
+        file.write( content )
+        file.truncate()
@@ -24,12 +24,15 @@ src_dir=$SCRIPT_DIR/../src
 ## E501 line too long (80 > 79 characters)
 ## W391 blank line at end of file
 ## D    all docstyle checks
+## generated modules (UI and resources) are not checked
+exclude_dirs=.git,__pycache__,generated
+
 ignore_errors=E115,E126,E201,E202,E221,E241,E262,E265,E266,E402,E501,W391,D
 
 
 echo "running pycodestyle"
 echo "to ignore warning inline add comment at the end of line: # noqa"
-pycodestyle --show-source --statistics --count --ignore=$ignore_errors $src_dir
+pycodestyle --show-source --statistics --count --exclude=$exclude_dirs --ignore=$ignore_errors $src_dir
 exit_code=$?
 
 if [ $exit_code -ne 0 ]; then
@@ -45,7 +48,7 @@ ignore_errors=$ignore_errors,F401
 
 echo "running flake8"
 echo "to ignore warning for one line put following comment in end of line: # noqa: <warning-code>"
-flake8 --show-source --statistics --count --ignore=$ignore_errors $src_dir
+flake8 --show-source --statistics --count --exclude=$exclude_dirs --ignore=$ignore_errors $src_dir
 exit_code=$?
 
 if [ $exit_code -ne 0 ]; then